@@ -0,0 +1,175 @@
+"""
+Benchmark the binary prediction protocol against the HTTP API: unary latency, throughput
+under concurrency and a large batch, with both servers running locally on the same model
+
+Usage: python benchmarks/bench_binary_server.py [--requests N] [--concurrency N] [--batch-rows N]
+"""
+import argparse
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.api.binary_server import BinaryPredictionClient
+
+HTTP_PORT = 18000
+BINARY_PORT = 18001
+ROW = [5.1, 3.5, 1.4, 0.2]
+
+
+def start_servers():
+    """Both servers as subprocesses; returns them once they accept requests"""
+    env = dict(os.environ, BINARY_HOST="127.0.0.1", BINARY_PORT=str(BINARY_PORT))
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "src.api.main:app", "--host", "127.0.0.1",
+                          "--port", str(HTTP_PORT), "--log-level", "warning"], cwd=ROOT, env=env,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+        subprocess.Popen([sys.executable, "start_binary_server.py"], cwd=ROOT, env=env,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+    ]
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{HTTP_PORT}/health").raise_for_status()
+            asyncio.run(_probe_binary())
+            return processes
+        except Exception:
+            time.sleep(0.5)
+    stop_servers(processes)
+    raise RuntimeError("Servers did not start within 120s")
+
+
+async def _probe_binary():
+    client = await BinaryPredictionClient.connect(port=BINARY_PORT)
+    await client.predict(ROW)
+    await client.close()
+
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def percentiles(latencies):
+    p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+    return p50, p99
+
+
+async def http_unary(requests):
+    latencies = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{HTTP_PORT}") as client:
+        payload = dict(zip(("sepal_length", "sepal_width", "petal_length", "petal_width"), ROW))
+        for _ in range(requests):
+            start = time.perf_counter()
+            (await client.post("/predict", json=payload)).raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def binary_unary(requests):
+    latencies = []
+    client = await BinaryPredictionClient.connect(port=BINARY_PORT)
+    for _ in range(requests):
+        start = time.perf_counter()
+        await client.predict(ROW)
+        latencies.append(time.perf_counter() - start)
+    await client.close()
+    return latencies
+
+
+async def http_throughput(requests, concurrency):
+    payload = dict(zip(("sepal_length", "sepal_width", "petal_length", "petal_width"), ROW))
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{HTTP_PORT}", limits=limits) as client:
+        async def worker(n):
+            for _ in range(n):
+                (await client.post("/predict", json=payload)).raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        return (requests // concurrency * concurrency) / (time.perf_counter() - start)
+
+
+async def binary_throughput(requests, concurrency):
+    clients = [await BinaryPredictionClient.connect(port=BINARY_PORT) for _ in range(concurrency)]
+
+    async def worker(client, n):
+        for _ in range(n):
+            await client.predict(ROW)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(c, requests // concurrency) for c in clients))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+    return (requests // concurrency * concurrency) / elapsed
+
+
+async def http_batch(X, repeats):
+    buffer = io.BytesIO()
+    np.save(buffer, X)
+    body = buffer.getvalue()
+    latencies = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{HTTP_PORT}") as client:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            response = await client.post("/predict/batch", content=body,
+                                         headers={"Content-Type": "application/x-npy"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def binary_batch(X, repeats):
+    latencies = []
+    client = await BinaryPredictionClient.connect(port=BINARY_PORT)
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await client.predict_batch(X)
+        latencies.append(time.perf_counter() - start)
+    await client.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    X = np.random.default_rng(0).uniform([4.3, 2.0, 1.0, 0.1], [7.9, 4.4, 6.9, 2.5], size=(args.batch_rows, 4))
+    processes = start_servers()
+    try:
+        rows = []
+        for name, http, binary in (
+            ("unary latency", http_unary(args.requests), binary_unary(args.requests)),
+            (f"batch of {args.batch_rows} rows", http_batch(X, 50), binary_batch(X, 50)),
+        ):
+            http_p50, http_p99 = percentiles(asyncio.run(http))
+            binary_p50, binary_p99 = percentiles(asyncio.run(binary))
+            rows.append(f"{name:28s} p50 {http_p50:7.2f} / {binary_p50:7.2f} ms  "
+                        f"p99 {http_p99:7.2f} / {binary_p99:7.2f} ms  ({http_p50 / binary_p50:4.1f}x)")
+        http_rps = asyncio.run(http_throughput(args.requests, args.concurrency))
+        binary_rps = asyncio.run(binary_throughput(args.requests, args.concurrency))
+        rows.append(f"{f'throughput, {args.concurrency} clients':28s} {http_rps:9.0f} / {binary_rps:9.0f} req/s"
+                    f"{'':22s}({binary_rps / http_rps:4.1f}x)")
+    finally:
+        stop_servers(processes)
+
+    print("HTTP / binary")
+    for row in rows:
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
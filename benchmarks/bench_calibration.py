@@ -0,0 +1,63 @@
+"""
+Benchmark SVC probability calibration: the internal 5-fold Platt scaling (probability=True)
+against one fit plus held-out calibration, as ModelTrainer does, on synthetic data of several sizes
+
+Usage: python benchmarks/bench_calibration.py [--sizes N [N ...]]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.perf_regression import synthetic_iris
+from src.models.calibration import CalibratedModel, expected_calibration_error
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 1500, 6000])
+    parser.add_argument("--calibration-size", type=float, default=0.2)
+    args = parser.parse_args()
+    # SVC(probability=True) is deprecated in recent scikit-learn; it is the baseline measured here
+    warnings.filterwarnings("ignore", category=FutureWarning)
+
+    print(f"{'rows':>7s} {'internal (s)':>13s} {'held-out (s)':>13s} {'speedup':>8s} "
+          f"{'ECE internal':>13s} {'ECE held-out':>13s}")
+    for n_rows in args.sizes:
+        df, feature_names, _ = synthetic_iris(n_rows)
+        X_train, X_test, y_train, y_test = train_test_split(
+            df[feature_names].to_numpy(), df["target"].to_numpy(), test_size=0.2, stratify=df["target"], random_state=42
+        )
+        scaler = StandardScaler().fit(X_train)
+        X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+
+        internal, internal_seconds = timed(lambda: SVC(random_state=42, probability=True).fit(X_train, y_train))
+
+        def held_out():
+            X_fit, X_cal, y_fit, y_cal = train_test_split(
+                X_train, y_train, test_size=args.calibration_size, stratify=y_train, random_state=42
+            )
+            return CalibratedModel(SVC(random_state=42).fit(X_fit, y_fit)).fit(X_cal, y_cal)
+
+        calibrated, held_out_seconds = timed(held_out)
+        print(f"{n_rows:7d} {internal_seconds:13.3f} {held_out_seconds:13.3f} "
+              f"{internal_seconds / held_out_seconds:7.1f}x "
+              f"{expected_calibration_error(y_test, internal.predict_proba(X_test)):13.4f} "
+              f"{expected_calibration_error(y_test, calibrated.predict_proba(X_test)):13.4f}")
+
+
+if __name__ == "__main__":
+    main()
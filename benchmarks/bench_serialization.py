@@ -0,0 +1,82 @@
+"""
+Benchmark /predict response serialization: the previous Pydantic + FastAPI encoder path
+against the lean encoder in each response format
+
+Usage: python benchmarks/bench_serialization.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.serialization import PredictionEncoder, orjson
+
+TARGET_NAMES = ['setosa', 'versicolor', 'virginica']
+
+
+class LegacyPredictionResponse(BaseModel):
+    prediction: str
+    probability: float
+    all_probabilities: dict
+    timestamp: str
+
+
+def legacy_serialize(class_index, proba):
+    """What /predict used to do: build the model, let FastAPI re-validate and encode it"""
+    all_probabilities = {TARGET_NAMES[i]: float(p) for i, p in enumerate(proba)}
+    response = LegacyPredictionResponse(
+        prediction=TARGET_NAMES[class_index],
+        probability=float(proba[class_index]),
+        all_probabilities=all_probabilities,
+        timestamp=datetime.now().isoformat(),
+    )
+    validated = LegacyPredictionResponse.model_validate(response.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def lean_serialize(encoder, response_format, class_index, proba):
+    all_probabilities = encoder.probabilities(proba)
+    return encoder.encode(
+        response_format, class_index, proba, all_probabilities, datetime.now().isoformat()
+    ).body
+
+
+def time_per_call(fn, iterations):
+    for _ in range(min(iterations, 1000)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    encoder = PredictionEncoder(TARGET_NAMES)
+    proba = np.array([0.9721, 0.0160, 0.0119])
+
+    results = {"legacy (pydantic + jsonable_encoder)": time_per_call(lambda: legacy_serialize(0, proba), args.iterations)}
+    for response_format in ("json", "array", "binary"):
+        results[f"lean {response_format}"] = time_per_call(
+            lambda: lean_serialize(encoder, response_format, 0, proba), args.iterations
+        )
+
+    print(f"orjson: {'yes' if orjson is not None else 'no (stdlib json fallback)'}")
+    baseline = results["legacy (pydantic + jsonable_encoder)"]
+    for name, micros in results.items():
+        print(f"{name:40s} {micros:8.2f} us/response  ({baseline / micros:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Performance regression suite: wall time, peak RSS and Python allocations of each pipeline
+stage on synthetic Iris-like data of several sizes, checked against stored baselines
+
+Stages, each measured in a fresh process so peak RSS belongs to that stage alone:
+
+- preprocess: IrisDataProcessor.preprocess_data (split + scaling)
+- train: ModelTrainer.train_all_models, with MLflow writes held until it returns
+- load[model]: load_serving_bundle of each trained model, as the API loads it at startup
+- predict[model]: single-row /predict requests through the FastAPI app serving that model
+
+Wall time is the median over repeated runs; allocations are the tracemalloc peak of one
+extra run. A metric regresses when it exceeds its baseline by the relative tolerance plus
+a small absolute floor (timer and allocator noise). Baselines are machine-specific:
+record them with --update-baseline on the machine that runs the check.
+
+Usage: python benchmarks/perf_regression.py [--update-baseline] [--quick] [--baseline PATH]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "perf_baselines.json")
+PREPROCESS_SIZES = (1_000, 100_000, 1_000_000)
+MODEL_SIZES = (300, 1_500, 6_000)
+QUICK_PREPROCESS_SIZES = (1_000, 100_000)
+QUICK_MODEL_SIZES = (300,)
+MODEL_NAMES = ("logistic_regression", "random_forest", "svm")
+PREDICT_REQUESTS = 200
+REPEATS = {"preprocess": 5, "train": 1, "load": 5, "predict": 3}
+# metric: (relative tolerance, absolute floor)
+TOLERANCES = {
+    "wall_seconds": (0.5, 0.01),
+    "peak_rss_mb": (0.2, 10.0),
+    "alloc_peak_mb": (0.2, 1.0),
+}
+
+
+def synthetic_iris(n_rows, random_state=0):
+    """Iris-shaped DataFrame of n_rows drawn from per-class Gaussians fitted to the real data"""
+    import pandas as pd
+    from sklearn.datasets import load_iris
+
+    iris = load_iris()
+    rng = np.random.default_rng(random_state)
+    y = rng.integers(0, 3, size=n_rows)
+    X = np.empty((n_rows, iris.data.shape[1]))
+    for label in range(3):
+        rows = iris.data[iris.target == label]
+        X[y == label] = rng.multivariate_normal(rows.mean(axis=0), np.cov(rows, rowvar=False), size=(y == label).sum())
+    df = pd.DataFrame(np.clip(X, 0.1, 9.9).round(1), columns=iris.feature_names)
+    df["target"] = y
+    df["target_name"] = df["target"].map(dict(enumerate(iris.target_names)))
+    return df, iris.feature_names, iris.target_names
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(run, repeats):
+    """Metrics of a zero-argument callable: median wall time, then one run under tracemalloc"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "wall_seconds": statistics.median(timings),
+        "peak_rss_mb": peak_rss_mb(),
+        "alloc_peak_mb": alloc_peak / (1024 * 1024),
+    }
+
+
+def run_preprocess(n_rows, workdir, repeats):
+    from src.data.data_loader import IrisDataProcessor
+
+    df, feature_names, _ = synthetic_iris(n_rows)
+    return measure(lambda: IrisDataProcessor().preprocess_data(df, feature_names), repeats)
+
+
+def run_train(n_rows, workdir, repeats):
+    """Measure train_all_models, then save each model and the split for the load/predict stages"""
+    from src.data.data_loader import IrisDataProcessor
+    from src.models.bundle import export_bundle
+    from src.models.ood import OODScorer
+    from src.models.train import ModelTrainer
+
+    df, feature_names, target_names = synthetic_iris(n_rows)
+    processor = IrisDataProcessor()
+    X_train, X_test, y_train, y_test = processor.preprocess_data(df, feature_names)
+    # One trainer per run (measure adds a traced run): its tracker logs the fitted models in
+    # the background, so the next run must not refit them. Built here, outside the timing
+    trainers = [ModelTrainer(experiment_name="perf_regression") for _ in range(repeats + 1)]
+    pending = list(trainers)
+    results = {}
+
+    def train():
+        trainer = pending.pop(0)
+        # Background MLflow writes would compete with training for the CPU
+        with trainer.tracker.quiet():
+            results.update(trainer.train_all_models(X_train, y_train, X_test, y_test))
+
+    metrics = measure(train, repeats)
+    for trainer in trainers:
+        trainer.tracker.close()
+
+    processor.save_data(X_train, X_test, y_train, y_test, data_dir=os.path.join(workdir, "data"))
+    ood = OODScorer.fit(X_train, y_train)
+    for model_name, result in results.items():
+        models_dir = os.path.join(workdir, "models", model_name)
+        trainers[-1].save_model(result["model"], "best_model", models_dir, processor.scaler, list(target_names),
+                                ood, model_type=model_name)
+        export_bundle(result["model"], processor.scaler, model_name, list(target_names),
+                      path=os.path.join(models_dir, "serving_bundle.joblib"), ood=ood)
+    return metrics
+
+
+def serving_paths(workdir, model_name):
+    models_dir = os.path.join(workdir, "models", model_name)
+    return {
+        "MODEL_BUNDLE_PATH": os.path.join(models_dir, "serving_bundle.joblib"),
+        "ARTIFACT_PATH": os.path.join(models_dir, "serving_artifact"),
+        "MODEL_PATH": os.path.join(models_dir, "best_model_model.pkl"),
+        "OOD_PATH": os.path.join(models_dir, "ood_scorer.npz"),
+        "SCALER_PATH": os.path.join(workdir, "data", "scaler.pkl"),
+        "NEIGHBORS_PATH": os.path.join(workdir, "data", "neighbors"),
+    }
+
+
+def run_load(model_name, workdir, repeats):
+    from src.models.bundle import load_serving_bundle
+
+    paths = serving_paths(workdir, model_name)
+    return measure(lambda: load_serving_bundle(paths["MODEL_BUNDLE_PATH"], paths["MODEL_PATH"], paths["SCALER_PATH"],
+                                               None, paths["ARTIFACT_PATH"], paths["OOD_PATH"]), repeats)
+
+
+def run_predict(model_name, workdir, repeats):
+    # The app reads its model paths at import and writes logs/ relative to the working directory
+    os.environ.update(serving_paths(workdir, model_name))
+    os.chdir(workdir)
+    from fastapi.testclient import TestClient
+    from src.api.main import app
+
+    df, feature_names, _ = synthetic_iris(PREDICT_REQUESTS, random_state=1)
+    keys = ("sepal_length", "sepal_width", "petal_length", "petal_width")
+    payloads = [dict(zip(keys, map(float, row))) for row in df[feature_names].to_numpy()]
+
+    with TestClient(app) as client:
+        def predict():
+            for payload in payloads:
+                client.post("/predict", json=payload).raise_for_status()
+
+        return measure(predict, repeats)
+
+
+def run_case(case, workdir, repeats):
+    """Metrics for one case id, e.g. "preprocess/1000" or "predict[svm]/1500" """
+    stage, n_rows = case.split("/")
+    if stage == "preprocess":
+        return run_preprocess(int(n_rows), workdir, repeats)
+    if stage == "train":
+        return run_train(int(n_rows), workdir, repeats)
+    name, model_name = stage.rstrip("]").split("[")
+    return {"load": run_load, "predict": run_predict}[name](model_name, workdir, repeats)
+
+
+def cases(quick=False):
+    """Case ids in run order; each size's train case saves what its load/predict cases use"""
+    preprocess_sizes, model_sizes = (QUICK_PREPROCESS_SIZES, QUICK_MODEL_SIZES) if quick else \
+        (PREPROCESS_SIZES, MODEL_SIZES)
+    ids = [f"preprocess/{n}" for n in preprocess_sizes]
+    for n in model_sizes:
+        ids.append(f"train/{n}")
+        ids += [f"load[{m}]/{n}" for m in MODEL_NAMES]
+        ids += [f"predict[{m}]/{n}" for m in MODEL_NAMES]
+    return ids
+
+
+def run_in_subprocess(case, workdir):
+    stage = case.split("[")[0].split("/")[0]
+    output = os.path.join(workdir, "result.json")
+    command = [sys.executable, os.path.abspath(__file__), "--case", case, "--workdir", workdir,
+               "--repeats", str(REPEATS[stage]), "--output", output]
+    env = dict(os.environ, MLFLOW_TRACKING_URI=f"sqlite:///{os.path.join(workdir, 'mlflow.db')}")
+    completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{case} failed:\n{completed.stderr[-3000:]}")
+    with open(output) as f:
+        return json.load(f)
+
+
+def machine():
+    return {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()}
+
+
+def compare(results, baseline, tolerances=TOLERANCES):
+    """(regressions, rows): regressions lists "case metric" strings; rows hold every comparison"""
+    regressions, rows = [], []
+    for case, metrics in results.items():
+        reference = baseline.get(case)
+        for metric, value in metrics.items():
+            if reference is None or metric not in reference:
+                rows.append((case, metric, value, None, "new"))
+                continue
+            relative, floor = tolerances[metric]
+            limit = reference[metric] * (1 + relative) + floor
+            status = "ok" if value <= limit else "REGRESSION"
+            if value > limit:
+                regressions.append(f"{case} {metric}")
+            rows.append((case, metric, value, reference[metric], status))
+    return regressions, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="record these results as the baseline")
+    parser.add_argument("--quick", action="store_true", help="smallest sizes only")
+    # Internal: measure one case in this process
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--repeats", type=int, default=3, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        metrics = run_case(args.case, args.workdir, args.repeats)
+        with open(args.output, "w") as f:
+            json.dump(metrics, f)
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        baseline = stored["results"]
+        if stored.get("machine") != machine() and not args.update_baseline:
+            print(f"Note: baseline recorded on {stored.get('machine')}; this is {machine()}")
+
+    workroot = tempfile.mkdtemp(prefix="perf_regression_")
+    results = {}
+    try:
+        for case in cases(args.quick):
+            n_rows = case.split("/")[1]
+            workdir = os.path.join(workroot, "preprocess" if case.startswith("preprocess") else n_rows)
+            os.makedirs(workdir, exist_ok=True)
+            results[case] = run_in_subprocess(case, workdir)
+            print(f"measured {case:32s} {results[case]['wall_seconds']:9.4f}s", flush=True)
+    finally:
+        shutil.rmtree(workroot, ignore_errors=True)
+
+    regressions, rows = compare(results, baseline)
+    print(f"\n{'case':32s} {'metric':14s} {'current':>10s} {'baseline':>10s}")
+    for case, metric, value, reference, status in rows:
+        reference_text = f"{reference:10.4f}" if reference is not None else f"{'-':>10s}"
+        print(f"{case:32s} {metric:14s} {value:10.4f} {reference_text}  {status}")
+
+    if args.update_baseline:
+        merged = dict(baseline, **results)
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": machine(), "tolerances": TOLERANCES, "results": merged}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; record one with --update-baseline")
+        return 0
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Admission control: bounded concurrency, a short priority queue, per-client rate limits
+and load shedding
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.api.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Probes and scrapes bypass admission entirely; queued work is granted interactive first
+EXEMPT_PATHS = ("/health", "/live", "/ready", "/metrics")
+BULK_PATHS = ("/predict/batch", "/predict/stream")
+LANE_PRIORITIES = {"interactive": 0, "bulk": 1}
+
+QUEUE_WAIT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+shed_counter = Counter(
+    "iris_admission_shed_total",
+    "Requests rejected by admission control",
+    ["reason", "lane"],
+)
+queue_wait_histogram = Histogram(
+    "iris_admission_queue_wait_seconds",
+    "Time admitted requests waited for a concurrency slot",
+    ["lane"],
+    buckets=QUEUE_WAIT_BUCKETS,
+)
+in_flight_gauge = Gauge(
+    "iris_admission_in_flight", "Requests holding a concurrency slot"
+)
+queue_depth_gauge = Gauge(
+    "iris_admission_queue_depth", "Requests waiting for a concurrency slot"
+)
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; carries the HTTP status and a Retry-After hint"""
+
+    def __init__(self, reason, status_code=503, retry_after=1.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, holding at most ``burst``"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "clock")
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.clock = clock
+        self.updated = clock()
+
+    def take(self, n=1):
+        """Seconds until ``n`` tokens are available; 0 means they were taken"""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= n:
+            self.tokens -= n
+            return 0.0
+        return (n - self.tokens) / self.rate
+
+
+class ClientRateLimiter:
+    """Per-client token buckets for the ``max_clients`` most recently seen clients"""
+
+    def __init__(self, rate, burst=None, max_clients=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.max_clients = max_clients
+        self.clock = clock
+        self.buckets = OrderedDict()
+
+    def check(self, client):
+        """Seconds the client must wait; 0 admits the request"""
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = self.buckets[client] = TokenBucket(
+                self.rate, self.burst, self.clock
+            )
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client)
+        return bucket.take()
+
+
+class AdmissionController:
+    """At most ``max_concurrency`` requests in flight, up to ``max_queue`` more waiting
+
+    Waiters are granted slots by lane priority, then arrival order. A request is shed
+    with a 503 when the queue is full or it has waited ``queue_timeout`` seconds; the
+    bulk lane may only fill ``bulk_queue_share`` of the queue, so it is shed first. All
+    methods run on the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=64,
+        max_queue=256,
+        queue_timeout=1.0,
+        bulk_queue_share=0.5,
+        clock=time.monotonic,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.bulk_queue_limit = int(max_queue * bulk_queue_share)
+        self.clock = clock
+        self.in_flight = 0
+        self.queued = 0
+        self.shed_total = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrency=int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64")),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "256")),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "1000")) / 1000,
+        )
+
+    def shed(self, reason, lane, status_code=503, retry_after=None):
+        self.shed_total += 1
+        shed_counter.labels(reason=reason, lane=lane).inc()
+        raise Overloaded(
+            reason,
+            status_code,
+            self.queue_timeout if retry_after is None else retry_after,
+        )
+
+    def _update_gauges(self):
+        in_flight_gauge.set(self.in_flight)
+        queue_depth_gauge.set(self.queued)
+
+    async def acquire(self, lane="interactive"):
+        """Wait for a slot; returns the queue wait in seconds or raises Overloaded"""
+        if self.in_flight < self.max_concurrency and not self.queued:
+            self.in_flight += 1
+            self._update_gauges()
+            queue_wait_histogram.labels(lane=lane).observe(0.0)
+            return 0.0
+
+        limit = self.bulk_queue_limit if lane == "bulk" else self.max_queue
+        if self.queued >= limit:
+            self.shed("queue_full", lane)
+
+        enqueued_at = self.clock()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters,
+            (LANE_PRIORITIES.get(lane, 0), next(self._sequence), enqueued_at, future),
+        )
+        self.queued += 1
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.queued -= 1
+            self._update_gauges()
+            self.shed("queue_timeout", lane)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the client went away
+                self.release()
+            else:
+                self.queued -= 1
+                self._update_gauges()
+            raise
+
+        waited = self.clock() - enqueued_at
+        queue_wait_histogram.labels(lane=lane).observe(waited)
+        return waited
+
+    def release(self):
+        """Hand the slot to the next live waiter, or free it"""
+        while self._waiters:
+            future = heapq.heappop(self._waiters)[3]
+            if not future.done():
+                future.set_result(None)
+                self.queued -= 1
+                self._update_gauges()
+                return
+        self.in_flight -= 1
+        self._update_gauges()
+
+    def queue_delay(self):
+        """Age in seconds of the oldest request still waiting for a slot"""
+        live = [entry for entry in self._waiters if not entry[3].done()]
+        if len(live) < len(self._waiters):
+            heapq.heapify(live)
+            self._waiters = live
+        if not live:
+            return 0.0
+        return self.clock() - min(entry[2] for entry in live)
+
+    def saturation(self):
+        """(in flight + queued) / max_concurrency; above 1 means requests queue"""
+        return (self.in_flight + self.queued) / self.max_concurrency
+
+    def status(self):
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "saturation": self.saturation(),
+            "queue_delay_ms": self.queue_delay() * 1000,
+            "shed_total": self.shed_total,
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying rate limits and admission control ahead of the app
+
+    Exempt paths (probes and metrics) skip both, so they stay responsive under overload.
+    Clients are identified by the ``X-Client-ID`` header, else by address. WebSocket
+    sessions are long-lived and pass through; each streamed row is still bounded by the
+    stream's batching.
+    """
+
+    def __init__(
+        self,
+        app,
+        controller,
+        rate_limiter=None,
+        exempt_paths=EXEMPT_PATHS,
+        bulk_paths=BULK_PATHS,
+    ):
+        self.app = app
+        self.controller = controller
+        self.rate_limiter = rate_limiter
+        self.exempt_paths = frozenset(exempt_paths)
+        self.bulk_paths = frozenset(bulk_paths)
+
+    def _client_id(self, scope):
+        for name, value in scope.get("headers", ()):
+            if name == b"x-client-id":
+                return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _reject(self, send, error):
+        body = dumps({"detail": f"Request shed: {error.reason}"})
+        await send(
+            {
+                "type": "http.response.start",
+                "status": error.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (
+                        b"retry-after",
+                        str(max(1, int(round(error.retry_after)))).encode(),
+                    ),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        lane = "bulk" if scope["path"] in self.bulk_paths else "interactive"
+        try:
+            if self.rate_limiter is not None:
+                retry_after = self.rate_limiter.check(self._client_id(scope))
+                if retry_after:
+                    self.controller.shed(
+                        "rate_limited", lane, status_code=429, retry_after=retry_after
+                    )
+            await self.controller.acquire(lane)
+        except Overloaded as error:
+            await self._reject(send, error)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+
+def rate_limiter_from_env():
+    """Client limiter from RATE_LIMIT_RPS and RATE_LIMIT_BURST; None when unset or 0"""
+    rate = float(os.getenv("RATE_LIMIT_RPS", "0"))
+    if rate <= 0:
+        return None
+    burst = os.getenv("RATE_LIMIT_BURST")
+    return ClientRateLimiter(rate, int(burst) if burst else None)
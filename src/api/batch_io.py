@@ -0,0 +1,196 @@
+"""
+Batch scoring I/O: parse NumPy, Arrow IPC and CSV bodies straight into a float matrix,
+validate it vectorized and stream results back in the request's format
+"""
+
+import io
+
+import numpy as np
+
+# Parsing and validation live with the data layer so offline scoring can share them
+from src.data.feature_io import (
+    FEATURE_KEYS,
+    FEATURE_MAX,
+    FEATURE_MIN,
+    BatchFormatError,
+    UnsupportedFormatError,
+    import_arrow,
+    parse_features,
+    validate_feature_matrix,
+)
+
+NPY_MEDIA_TYPE = "application/x-npy"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+CSV_MEDIA_TYPE = "text/csv"
+
+CONTENT_TYPE_FORMATS = {
+    NPY_MEDIA_TYPE: "npy",
+    "application/octet-stream": "npy",
+    ARROW_STREAM_MEDIA_TYPE: "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    CSV_MEDIA_TYPE: "csv",
+    "application/csv": "csv",
+}
+FORMAT_MEDIA_TYPES = {
+    "npy": NPY_MEDIA_TYPE,
+    "arrow": ARROW_STREAM_MEDIA_TYPE,
+    "csv": CSV_MEDIA_TYPE,
+}
+
+# Rows encoded per streamed chunk
+STREAM_CHUNK_ROWS = 10000
+
+
+def _chunks(n_rows, chunk_rows):
+    for start in range(0, n_rows, chunk_rows):
+        yield start, min(start + chunk_rows, n_rows)
+
+
+def _extra_columns(ood_scores, prediction_ids):
+    """(name, values) of the optional trailing columns: prediction_id, then ood_score"""
+    columns = []
+    if prediction_ids is not None:
+        columns.append(("prediction_id", np.asarray(prediction_ids, dtype=np.int64)))
+    if ood_scores is not None:
+        columns.append(("ood_score", np.asarray(ood_scores, dtype=np.float64)))
+    return columns
+
+
+def stream_npy(
+    class_indices,
+    proba,
+    target_names,
+    chunk_rows=STREAM_CHUNK_ROWS,
+    ood_scores=None,
+    prediction_ids=None,
+):
+    """float64 matrix of [class_index, p_0, ..., p_n-1(, prediction_id)(, ood_score)]"""
+    n_classes = proba.shape[1]
+    extra = _extra_columns(ood_scores, prediction_ids)
+    n_rows, n_cols = proba.shape[0], n_classes + 1 + len(extra)
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        header,
+        {
+            "descr": np.lib.format.dtype_to_descr(np.dtype("<f8")),
+            "fortran_order": False,
+            "shape": (n_rows, n_cols),
+        },
+    )
+    yield header.getvalue()
+
+    for start, end in _chunks(n_rows, chunk_rows):
+        block = np.empty((end - start, n_cols), dtype="<f8")
+        block[:, 0] = class_indices[start:end]
+        block[:, 1 : n_classes + 1] = proba[start:end]
+        for offset, (_, values) in enumerate(extra, start=n_classes + 1):
+            block[:, offset] = values[start:end]
+        yield block.tobytes()
+
+
+def stream_csv(
+    class_indices,
+    proba,
+    target_names,
+    chunk_rows=STREAM_CHUNK_ROWS,
+    ood_scores=None,
+    prediction_ids=None,
+):
+    """prediction,probability,probability_<class>...(,prediction_id)(,ood_score) rows"""
+    names = np.asarray(target_names, dtype=object)
+    n_classes = proba.shape[1]
+    extra = _extra_columns(ood_scores, prediction_ids)
+    n_cols = n_classes + 2 + len(extra)
+    fmt = (
+        ["%s"]
+        + ["%.10g"] * (n_classes + 1)
+        + ["%d" if name == "prediction_id" else "%.10g" for name, _ in extra]
+    )
+    header = ",".join(
+        ["prediction", "probability"]
+        + [f"probability_{name}" for name in target_names]
+        + [name for name, _ in extra]
+    )
+    yield (header + "\n").encode()
+
+    for start, end in _chunks(proba.shape[0], chunk_rows):
+        block_indices = class_indices[start:end]
+        rows = np.empty((end - start, n_cols), dtype=object)
+        rows[:, 0] = names[block_indices]
+        rows[:, 1] = proba[start:end][np.arange(end - start), block_indices]
+        rows[:, 2 : n_classes + 2] = proba[start:end]
+        for offset, (_, values) in enumerate(extra, start=n_classes + 2):
+            rows[:, offset] = values[start:end]
+        text = io.StringIO()
+        np.savetxt(text, rows, delimiter=",", fmt=fmt)
+        yield text.getvalue().encode()
+
+
+def stream_arrow(
+    class_indices,
+    proba,
+    target_names,
+    chunk_rows=STREAM_CHUNK_ROWS,
+    ood_scores=None,
+    prediction_ids=None,
+):
+    """Arrow IPC stream of prediction, class_index, probabilities (and extra columns)"""
+    pa = import_arrow()
+    names = pa.array(list(target_names))
+    extra = _extra_columns(ood_scores, prediction_ids)
+    schema = pa.schema(
+        [("prediction", pa.string()), ("class_index", pa.uint8())]
+        + [(f"probability_{name}", pa.float64()) for name in target_names]
+        + [
+            (name, pa.int64() if name == "prediction_id" else pa.float64())
+            for name, _ in extra
+        ]
+    )
+
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield drain()
+    for start, end in _chunks(proba.shape[0], chunk_rows):
+        block_indices = pa.array(class_indices[start:end].astype(np.uint8))
+        columns = [names.take(block_indices), block_indices] + [
+            pa.array(proba[start:end, i]) for i in range(proba.shape[1])
+        ]
+        columns += [pa.array(values[start:end]) for _, values in extra]
+        writer.write_batch(pa.record_batch(columns, schema=schema))
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+ENCODERS = {"npy": stream_npy, "csv": stream_csv, "arrow": stream_arrow}
+
+
+def stream_results(
+    batch_format,
+    class_indices,
+    proba,
+    target_names,
+    chunk_rows=STREAM_CHUNK_ROWS,
+    ood_scores=None,
+    prediction_ids=None,
+):
+    """Chunked encoder for the request's format
+
+    ``prediction_ids`` (the logged row ids, for /feedback) and ``ood_scores`` add
+    trailing columns in that order.
+    """
+    return ENCODERS[batch_format](
+        np.asarray(class_indices),
+        proba,
+        target_names,
+        chunk_rows,
+        ood_scores,
+        prediction_ids,
+    )
@@ -0,0 +1,423 @@
+"""
+Length-prefixed binary prediction protocol over TCP, sharing the FastAPI app's model
+runtime
+
+Every message is a frame: a little-endian uint32 length, then that many bytes holding a
+uint8 message type, a uint32 request id and the body. Requests:
+
+- PREDICT: one row, four float64 features
+- PREDICT_BATCH: uint32 row count, then the rows as row-major float64
+- STREAM: same body as PREDICT_BATCH; clients send STREAM frames continuously on one
+  connection and read results as they arrive (bidirectional streaming)
+
+Each request gets one reply with the same id, in request order on its connection. A
+RESULT holds the uint32 row count and uint8 class count, then uint8 class indices,
+float64 probabilities (row-major), float64 OOD scores (NaN without a scorer) and int64
+prediction ids for /feedback (0 when the rows were not logged). An ERROR holds a UTF-8
+message.
+
+Requests from all connections are queued together; the batcher scores whatever is
+waiting (up to max_batch rows) in one model call, so concurrent callers share batches.
+"""
+
+import asyncio
+import logging
+import struct
+import time
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.api.batch_io import FEATURE_KEYS, validate_feature_matrix
+
+logger = logging.getLogger(__name__)
+
+PREDICT = 0x01
+PREDICT_BATCH = 0x02
+STREAM = 0x03
+RESULT = 0x80
+ERROR = 0xFF
+REQUEST_KINDS = {PREDICT: "predict", PREDICT_BATCH: "batch", STREAM: "stream"}
+
+LENGTH = struct.Struct("<I")
+HEADER = struct.Struct("<BI")
+ROW_COUNT = struct.Struct("<I")
+RESULT_HEADER = struct.Struct("<IB")
+N_FEATURES = len(FEATURE_KEYS)
+MAX_FRAME_BYTES = 1 << 24
+
+binary_requests_counter = Counter(
+    "iris_binary_requests_total", "Binary protocol requests", ["kind", "outcome"]
+)
+binary_batch_histogram = Histogram(
+    "iris_binary_batch_rows",
+    "Rows scored per binary protocol model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096),
+)
+binary_connections_gauge = Gauge(
+    "iris_binary_connections", "Open binary protocol connections"
+)
+
+
+class RequestError(Exception):
+    """A request that is answered with an ERROR frame"""
+
+
+def encode_frame(kind, request_id, body=b""):
+    return LENGTH.pack(HEADER.size + len(body)) + HEADER.pack(kind, request_id) + body
+
+
+def encode_rows(kind, request_id, X):
+    """Request frame for a (n, 4) feature matrix; PREDICT takes exactly one row"""
+    X = np.ascontiguousarray(X, dtype="<f8").reshape(-1, N_FEATURES)
+    if kind == PREDICT:
+        return encode_frame(kind, request_id, X.tobytes())
+    return encode_frame(kind, request_id, ROW_COUNT.pack(len(X)) + X.tobytes())
+
+
+def decode_rows(kind, body):
+    """(n, 4) float64 matrix from a request body"""
+    if kind == PREDICT:
+        n_rows, offset = 1, 0
+    else:
+        if len(body) < ROW_COUNT.size:
+            raise RequestError("Missing row count")
+        (n_rows,), offset = ROW_COUNT.unpack_from(body), ROW_COUNT.size
+    if n_rows == 0:
+        raise RequestError("Empty batch")
+    if len(body) - offset != n_rows * N_FEATURES * 8:
+        raise RequestError(f"Expected {n_rows} rows of {N_FEATURES} float64 features")
+    return np.frombuffer(body, dtype="<f8", offset=offset).reshape(n_rows, N_FEATURES)
+
+
+def encode_result(request_id, class_indices, proba, ood_scores, prediction_ids):
+    n_rows, n_classes = proba.shape
+    body = b"".join(
+        (
+            RESULT_HEADER.pack(n_rows, n_classes),
+            np.asarray(class_indices, dtype=np.uint8).tobytes(),
+            np.ascontiguousarray(proba, dtype="<f8").tobytes(),
+            np.ascontiguousarray(ood_scores, dtype="<f8").tobytes(),
+            np.ascontiguousarray(prediction_ids, dtype="<i8").tobytes(),
+        )
+    )
+    return encode_frame(RESULT, request_id, body)
+
+
+def decode_result(body):
+    """(class_indices, proba, ood_scores, prediction_ids) from a RESULT body"""
+    n_rows, n_classes = RESULT_HEADER.unpack_from(body)
+    offset = RESULT_HEADER.size
+    class_indices = np.frombuffer(body, dtype=np.uint8, count=n_rows, offset=offset)
+    offset += n_rows
+    proba = np.frombuffer(
+        body, dtype="<f8", count=n_rows * n_classes, offset=offset
+    ).reshape(n_rows, n_classes)
+    offset += proba.nbytes
+    ood_scores = np.frombuffer(body, dtype="<f8", count=n_rows, offset=offset)
+    offset += ood_scores.nbytes
+    return (
+        class_indices,
+        proba,
+        ood_scores,
+        np.frombuffer(body, dtype="<i8", count=n_rows, offset=offset),
+    )
+
+
+async def read_frame(reader):
+    """(kind, request_id, body), or None when the peer closed the connection"""
+    try:
+        (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    except asyncio.IncompleteReadError:
+        return None
+    if length < HEADER.size or length > MAX_FRAME_BYTES:
+        raise RequestError(
+            f"Frame length {length} outside [{HEADER.size}, {MAX_FRAME_BYTES}]"
+        )
+    payload = await reader.readexactly(length)
+    kind, request_id = HEADER.unpack_from(payload)
+    return kind, request_id, payload[HEADER.size :]
+
+
+class BinaryPredictionServer:
+    """Binary protocol server with the scoring and bookkeeping hooks of PredictionStream
+
+    ``score_batch`` maps raw rows to (class_indices, proba), ``on_batch`` records
+    metrics and logs predictions (returning an awaitable of the row ids, or None), and
+    ``score_ood`` (optional) returns (scores, flags).
+    Each connection keeps at most ``max_pending`` unanswered requests; beyond that the
+    server stops reading from it, which pushes back on the client. ``max_delay`` lets
+    the batcher wait for more rows; by default it only takes what is already queued.
+    """
+
+    def __init__(
+        self,
+        score_batch,
+        on_batch,
+        score_ood=None,
+        max_batch=256,
+        max_delay=0.0,
+        max_pending=1024,
+    ):
+        self.score_batch = score_batch
+        self.on_batch = on_batch
+        self.score_ood = score_ood
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.queue = None
+        self.batcher = None
+        self.resolving = set()
+
+    async def start(self, host="0.0.0.0", port=8001):
+        """Start the batcher and listen; returns the asyncio.Server"""
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self._run_batcher())
+        server = await asyncio.start_server(self._handle, host, port)
+        addresses = ", ".join(str(s.getsockname()) for s in server.sockets)
+        logger.info(f"Binary prediction server listening on {addresses}")
+        return server
+
+    async def stop(self):
+        if self.batcher is not None:
+            self.batcher.cancel()
+
+    def _submit(self, kind, body):
+        """Future of (class_indices, proba, ood_scores, prediction_ids) for a request"""
+        future = asyncio.get_running_loop().create_future()
+        if kind not in REQUEST_KINDS:
+            future.set_exception(RequestError(f"Unknown message type {kind}"))
+            return future
+        try:
+            X = decode_rows(kind, body)
+            errors = validate_feature_matrix(X)
+            if errors:
+                raise RequestError(f"Invalid rows: {errors}")
+        except RequestError as e:
+            future.set_exception(e)
+            return future
+        self.queue.put_nowait((X, future))
+        return future
+
+    async def _next_batch(self):
+        batch = [await self.queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_delay
+        while rows < self.max_batch:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def _run_batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            batch = [(X, future) for X, future in batch if not future.done()]
+            if not batch:
+                continue
+            X = batch[0][0] if len(batch) == 1 else np.vstack([X for X, _ in batch])
+            try:
+                start = time.perf_counter()
+                if len(X) > self.max_batch:
+                    # Large batches are scored off the event loop, like /predict/batch
+                    class_indices, proba = await loop.run_in_executor(
+                        None, self.score_batch, X
+                    )
+                else:
+                    class_indices, proba = self.score_batch(X)
+                logged = self.on_batch(
+                    X, class_indices, proba, time.perf_counter() - start
+                )
+                ood_scores, _ = (
+                    self.score_ood(X) if self.score_ood is not None else (None, None)
+                )
+                if ood_scores is None:
+                    ood_scores = np.full(len(X), np.nan)
+            except Exception as e:
+                logger.error(f"Error making binary protocol prediction: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(
+                            RequestError(f"Prediction error: {str(e)}")
+                        )
+                continue
+
+            binary_batch_histogram.observe(len(X))
+            # The batcher moves on while the rows are logged; replies wait for the ids
+            task = asyncio.create_task(
+                self._resolve(batch, class_indices, proba, ood_scores, logged)
+            )
+            self.resolving.add(task)
+            task.add_done_callback(self.resolving.discard)
+
+    async def _resolve(self, batch, class_indices, proba, ood_scores, logged):
+        """Hand each request its slice of the batch once the row ids are known"""
+        prediction_ids = None
+        if logged is not None:
+            try:
+                prediction_ids = await logged
+            except Exception as e:
+                logger.error(f"Error logging binary protocol batch: {str(e)}")
+        if prediction_ids is None:
+            prediction_ids = np.zeros(len(proba), dtype=np.int64)
+
+        offset = 0
+        for rows, future in batch:
+            end = offset + len(rows)
+            if not future.done():
+                future.set_result(
+                    (
+                        class_indices[offset:end],
+                        proba[offset:end],
+                        ood_scores[offset:end],
+                        prediction_ids[offset:end],
+                    )
+                )
+            offset = end
+
+    async def _respond(self, pending, writer):
+        """Write replies in request order, flushing when no further reply is ready"""
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            kind, request_id, future = item
+            try:
+                writer.write(encode_result(request_id, *await future))
+                binary_requests_counter.labels(
+                    kind=REQUEST_KINDS[kind], outcome="success"
+                ).inc()
+            except RequestError as e:
+                writer.write(encode_frame(ERROR, request_id, str(e).encode()))
+                binary_requests_counter.labels(
+                    kind=REQUEST_KINDS.get(kind, "unknown"), outcome="error"
+                ).inc()
+            if pending.empty():
+                await writer.drain()
+
+    async def _handle(self, reader, writer):
+        pending = asyncio.Queue(maxsize=self.max_pending)
+        responder = asyncio.create_task(self._respond(pending, writer))
+        binary_connections_gauge.inc()
+        try:
+            while True:
+                try:
+                    frame = await read_frame(reader)
+                except RequestError as e:
+                    # No resync after a bad length: report it and close the connection
+                    writer.write(encode_frame(ERROR, 0, str(e).encode()))
+                    break
+                if frame is None:
+                    break
+                kind, request_id, body = frame
+                await pending.put((kind, request_id, self._submit(kind, body)))
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.info(f"Binary protocol connection closed: {type(e).__name__}")
+        finally:
+            await pending.put(None)
+            try:
+                await responder
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+            binary_connections_gauge.dec()
+
+
+class BinaryPredictionClient:
+    """asyncio client: one request at a time per call, or a pipelined stream"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8001):
+        return cls(*await asyncio.open_connection(host, port))
+
+    def _request_id(self):
+        self.next_id = (self.next_id + 1) & 0xFFFFFFFF
+        return self.next_id
+
+    async def _reply(self, request_id):
+        frame = await read_frame(self.reader)
+        if frame is None:
+            raise ConnectionError("Server closed the connection")
+        kind, reply_id, body = frame
+        if kind == ERROR:
+            raise RequestError(body.decode())
+        if reply_id != request_id:
+            raise RequestError(f"Reply {reply_id} does not match request {request_id}")
+        return decode_result(body)
+
+    async def _call(self, kind, X):
+        async with self.lock:
+            request_id = self._request_id()
+            self.writer.write(encode_rows(kind, request_id, X))
+            await self.writer.drain()
+            return await self._reply(request_id)
+
+    async def predict(self, row):
+        """(class_index, proba, ood_score, prediction_id) for one four-feature row"""
+        class_indices, proba, ood_scores, prediction_ids = await self._call(
+            PREDICT, row
+        )
+        return (
+            int(class_indices[0]),
+            proba[0],
+            float(ood_scores[0]),
+            int(prediction_ids[0]),
+        )
+
+    async def predict_batch(self, X):
+        return await self._call(PREDICT_BATCH, X)
+
+    async def stream(self, batches):
+        """Stream each (n, 4) array of an (async) iterable; yields results in order"""
+        async with self.lock:
+            request_ids = asyncio.Queue()
+
+            async def send():
+                if hasattr(batches, "__aiter__"):
+                    async for X in batches:
+                        await send_one(X)
+                else:
+                    for X in batches:
+                        await send_one(X)
+                await request_ids.put(None)
+
+            async def send_one(X):
+                request_id = self._request_id()
+                self.writer.write(encode_rows(STREAM, request_id, X))
+                await request_ids.put(request_id)
+                await self.writer.drain()
+
+            sender = asyncio.create_task(send())
+            try:
+                while True:
+                    request_id = await request_ids.get()
+                    if request_id is None:
+                        break
+                    yield await self._reply(request_id)
+                await sender
+            finally:
+                sender.cancel()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
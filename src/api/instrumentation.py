@@ -0,0 +1,222 @@
+"""
+Hot-path latency instrumentation: per-stage timing spans and a sampled request profiler
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import time
+from collections import deque
+from datetime import datetime
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_STAGES = (
+    "parse",
+    "scale",
+    "inference",
+    "db_log",
+    "respond",
+    "serialize",
+    "send",
+)
+
+# Sub-millisecond resolution for inference, up to a quarter second for I/O stages
+STAGE_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+)
+
+stage_histogram = Histogram(
+    "iris_prediction_stage_seconds",
+    "Time spent in each prediction stage",
+    ["stage", "model_version"],
+    buckets=STAGE_BUCKETS,
+)
+
+
+class SketchedStage:
+    """Stage observer feeding both the histogram child and a sliding quantile sketch"""
+
+    __slots__ = ("_histogram", "_sketch")
+
+    def __init__(self, histogram, sketch):
+        self._histogram = histogram
+        self._sketch = sketch
+
+    def observe(self, value):
+        self._histogram.observe(value)
+        self._sketch.add(value)
+
+
+def bind_stage_histograms(model_version, stages=PREDICTION_STAGES, quantiles=None):
+    """Pre-bind histogram children for a model version so requests skip label resolution
+
+    With a QuantileTracker each stage is also added to the ``stage:<name>`` sketch.
+    """
+    children = {
+        stage: stage_histogram.labels(stage=stage, model_version=model_version)
+        for stage in stages
+    }
+    if quantiles is not None:
+        children = {
+            stage: SketchedStage(child, quantiles.sketch(f"stage:{stage}"))
+            for stage, child in children.items()
+        }
+    return children
+
+
+class StageTimer:
+    """Consecutive timing spans within one request"""
+
+    __slots__ = ("_children", "_last")
+
+    def __init__(self, children, start=None):
+        self._children = children
+        self._last = start if start is not None else time.perf_counter()
+
+    def mark(self, stage):
+        """Close the span started at the previous mark and observe it under stage"""
+        now = time.perf_counter()
+        self._children[stage].observe(now - self._last)
+        self._last = now
+        return now
+
+
+class StageTimingMiddleware:
+    """ASGI middleware timing request parsing and response hand-off around a handler
+
+    The handler reads ``request_start`` from the request state and writes
+    ``handler_end`` and its bound ``stage_children`` back; the middleware then observes
+    the time from ``handler_end`` to the response start as the send stage.
+    """
+
+    def __init__(self, app, paths=("/predict",)):
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        state["request_start"] = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                handler_end = state.get("handler_end")
+                if handler_end is not None:
+                    state["stage_children"]["send"].observe(
+                        time.perf_counter() - handler_end
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class RequestProfiler:
+    """Sampled cProfile of requests slower than a threshold, toggleable at runtime"""
+
+    def __init__(
+        self,
+        enabled=False,
+        sample_rate=0.01,
+        slow_threshold_ms=50.0,
+        output_dir="logs/profiles",
+        max_recent=20,
+    ):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self.output_dir = output_dir
+        self.recent = deque(maxlen=max_recent)
+        self._active = False
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.getenv("PROFILER_ENABLED", "false").lower() == "true",
+            sample_rate=float(os.getenv("PROFILER_SAMPLE_RATE", "0.01")),
+            slow_threshold_ms=float(os.getenv("PROFILER_SLOW_MS", "50")),
+        )
+
+    def configure(self, enabled=None, sample_rate=None, slow_threshold_ms=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if slow_threshold_ms is not None:
+            self.slow_threshold_ms = slow_threshold_ms
+        logger.info(f"Request profiler configured: {self.status()}")
+
+    def start(self):
+        """Return an enabled profiler for a sampled request, or None"""
+        if not self.enabled or self._active or random.random() >= self.sample_rate:
+            return None
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def stop(self, profile, elapsed_seconds, label="predict"):
+        """Disable the profiler and dump it when the request was slow"""
+        profile.disable()
+        self._active = False
+
+        elapsed_ms = elapsed_seconds * 1000
+        if elapsed_ms < self.slow_threshold_ms:
+            return None
+
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            path = os.path.join(
+                self.output_dir, f"{label}_{timestamp}_{elapsed_ms:.0f}ms.prof"
+            )
+            profile.dump_stats(path)
+
+            summary = io.StringIO()
+            pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(
+                15
+            )
+            self.recent.append(
+                {
+                    "path": path,
+                    "elapsed_ms": round(elapsed_ms, 3),
+                    "timestamp": datetime.now().isoformat(),
+                    "summary": summary.getvalue(),
+                }
+            )
+            logger.warning(
+                f"Slow {label} request profiled ({elapsed_ms:.1f} ms): {path}"
+            )
+            return path
+        except Exception as e:
+            logger.error(f"Error dumping request profile: {str(e)}")
+            return None
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "output_dir": self.output_dir,
+        }
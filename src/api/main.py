@@ -1,81 +1,235 @@
 """
 FastAPI application for Iris classification
 """
-from fastapi import FastAPI, HTTPException
+
+import time
+
+# Taken before the other imports so the startup report covers the whole cold start
+_import_started_at = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket
 from pydantic import BaseModel, Field
-import joblib
 import numpy as np
 import logging
 import os
 from datetime import datetime
 import json
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
-from fastapi.responses import Response
+from prometheus_client import Gauge, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from fastapi.responses import Response, StreamingResponse
+import asyncio
 import sqlite3
 import sys
+from typing import List, Optional
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/api.log'),
-        logging.StreamHandler()
-    ]
+from src.api.startup import (
+    StartupProfiler,
+    WarmupRunner,
+    DEFERRED_IMPORTS,
+    load_warmup_rows,
+)
+from src.api.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    rate_limiter_from_env,
+)
+from src.api.instrumentation import (
+    RequestProfiler,
+    StageTimer,
+    StageTimingMiddleware,
+    bind_stage_histograms,
 )
+from src.monitoring.feedback import ensure_feedback_columns, store_feedback
+from src.monitoring.monitor import (
+    FEATURE_COLUMNS,
+    ModelMonitor,
+    PerformanceMonitor,
+    run_background_monitoring,
+)
+from src.monitoring.sketch import QuantileTracker
+from src.monitoring.slo import SLOBurnRateCollector, SLOEvaluator
+from src.monitoring.logging_setup import setup_logging, REQUEST_LOGGER_NAME
+from src.api.serialization import PredictionEncoder, RESPONSE_FORMATS, dumps
+from src.api.streaming import (
+    NDJSON_MEDIA_TYPE,
+    DuplexStreamingResponse,
+    PredictionStream,
+    iter_ndjson_lines,
+)
+from src.api.batch_io import (
+    BatchFormatError,
+    UnsupportedFormatError,
+    CONTENT_TYPE_FORMATS,
+    FORMAT_MEDIA_TYPES,
+    FEATURE_MIN,
+    FEATURE_MAX,
+    parse_features,
+    stream_results,
+    validate_feature_matrix,
+)
+
+# Reports this module's imports, then the deferred imports and phases run at startup
+startup_profiler = StartupProfiler(started_at=_import_started_at)
+
+# Setup logging: queued, JSON-structured, rotated and sampled (see LOG_* settings)
+setup_logging()
 logger = logging.getLogger(__name__)
+request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
 
 # Create logs directory
-os.makedirs('logs', exist_ok=True)
+os.makedirs("logs", exist_ok=True)
 
-# Prometheus metrics
-prediction_counter = Counter('iris_predictions_total', 'Total number of predictions made')
-prediction_histogram = Histogram('iris_prediction_duration_seconds', 'Time spent on predictions')
+# Prometheus metrics: the monitor owns the prediction metrics; all use the default
+# registry
+# Sliding-window quantile sketches: SKETCH_BUCKETS intervals of SKETCH_BUCKET_SECONDS
+quantile_tracker = QuantileTracker(
+    bucket_seconds=float(os.getenv("SKETCH_BUCKET_SECONDS", "30")),
+    n_buckets=int(os.getenv("SKETCH_BUCKETS", "120")),
+    relative_accuracy=float(os.getenv("SKETCH_RELATIVE_ACCURACY", "0.01")),
+)
+slo_evaluator = SLOEvaluator.from_env(quantile_tracker)
+REGISTRY.register(SLOBurnRateCollector(slo_evaluator))
+model_monitor = ModelMonitor(
+    buffer_size=int(os.getenv("PREDICTION_BUFFER_SIZE", "10000")),
+    quantiles=quantile_tracker,
+    feedback_bucket_seconds=float(os.getenv("FEEDBACK_BUCKET_SECONDS", "60")),
+    feedback_buckets=int(os.getenv("FEEDBACK_BUCKETS", "60")),
+)
+performance_monitor = PerformanceMonitor()
+MONITORING_INTERVAL = int(os.getenv("MONITORING_INTERVAL", "300"))
+warmup_gauge = Gauge(
+    "iris_model_warmup_seconds", "Time spent warming up the model before readiness"
+)
 
 app = FastAPI(
     title="Iris Classification API",
     description="A machine learning API for classifying Iris flowers",
-    version="1.0.0"
+    version="1.0.0",
 )
+app.add_middleware(StageTimingMiddleware, paths=("/predict",))
+# Added last so it runs outermost: shed requests never reach the timing middleware
+admission_controller = AdmissionController.from_env()
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=admission_controller,
+    rate_limiter=rate_limiter_from_env(),
+)
+READY_MAX_QUEUE_DELAY_MS = float(os.getenv("READY_MAX_QUEUE_DELAY_MS", "250"))
+
+request_profiler = RequestProfiler.from_env()
+
 
 # Pydantic models for request/response validation
 class IrisFeatures(BaseModel):
-    sepal_length: float = Field(..., ge=0, le=10, description="Sepal length in cm")
-    sepal_width: float = Field(..., ge=0, le=10, description="Sepal width in cm") 
-    petal_length: float = Field(..., ge=0, le=10, description="Petal length in cm")
-    petal_width: float = Field(..., ge=0, le=10, description="Petal width in cm")
-    
+    sepal_length: float = Field(
+        ..., ge=FEATURE_MIN, le=FEATURE_MAX, description="Sepal length in cm"
+    )
+    sepal_width: float = Field(
+        ..., ge=FEATURE_MIN, le=FEATURE_MAX, description="Sepal width in cm"
+    )
+    petal_length: float = Field(
+        ..., ge=FEATURE_MIN, le=FEATURE_MAX, description="Petal length in cm"
+    )
+    petal_width: float = Field(
+        ..., ge=FEATURE_MIN, le=FEATURE_MAX, description="Petal width in cm"
+    )
+
     class Config:
         schema_extra = {
             "example": {
                 "sepal_length": 5.1,
                 "sepal_width": 3.5,
                 "petal_length": 1.4,
-                "petal_width": 0.2
+                "petal_width": 0.2,
             }
         }
 
+
+class ClassProbabilities(BaseModel):
+    setosa: float
+    versicolor: float
+    virginica: float
+
+
 class PredictionResponse(BaseModel):
     prediction: str
     probability: float
-    all_probabilities: dict
+    all_probabilities: ClassProbabilities
     timestamp: str
+    prediction_id: Optional[int] = None
+    ood_score: Optional[float] = None
+    ood: Optional[bool] = None
+
+
+class FeedbackItem(BaseModel):
+    prediction_id: int = Field(..., ge=1)
+    true_label: str
+
+
+class FeedbackRequest(BaseModel):
+    labels: List[FeedbackItem] = Field(..., min_length=1, max_length=10000)
+
+
+class ExplainRequest(BaseModel):
+    samples: List[IrisFeatures] = Field(..., min_length=1, max_length=1000)
+    all_classes: bool = False
+
+
+class NeighborsRequest(BaseModel):
+    samples: List[IrisFeatures] = Field(..., min_length=1, max_length=1000)
+    k: int = Field(5, ge=1, le=100)
+
 
 class HealthResponse(BaseModel):
     status: str
     timestamp: str
     model_loaded: bool
 
+
+class ProfilerConfig(BaseModel):
+    enabled: bool = None
+    sample_rate: float = Field(None, ge=0, le=1)
+    slow_threshold_ms: float = Field(None, ge=0)
+
+
+class ReadinessResponse(BaseModel):
+    status: str
+    timestamp: str
+    model_version: str
+    warmup: dict
+
+
 # Global variables
 model = None
 scaler = None
-target_names = ['setosa', 'versicolor', 'virginica']
+bundle = None
+prediction_encoder = None
+stage_children = None
+neighbor_index = None
+explainer = None
+monitoring_task = None
+model_ready = False
+warmup_stats = {}
+target_names = ["setosa", "versicolor", "virginica"]
+
+BUNDLE_PATH = os.getenv("MODEL_BUNDLE_PATH", "models/serving_bundle.joblib")
+ARTIFACT_PATH = os.getenv("ARTIFACT_PATH", "models/serving_artifact")
+STREAM_MAX_BATCH = int(os.getenv("STREAM_MAX_BATCH", "256"))
+STREAM_MAX_DELAY_MS = float(os.getenv("STREAM_MAX_DELAY_MS", "5"))
+# The binary server batches whatever is queued; a delay buys bigger batches
+BINARY_MAX_DELAY_MS = float(os.getenv("BINARY_MAX_DELAY_MS", "0"))
+MODEL_PATH = os.getenv("MODEL_PATH", "models/best_model_model.pkl")
+OOD_PATH = os.getenv("OOD_PATH", "models/ood_scorer.npz")
+NEIGHBORS_PATH = os.getenv("NEIGHBORS_PATH", "data/neighbors")
+SCALER_PATH = os.getenv("SCALER_PATH", "data/scaler.pkl")
+# Training rows Shapley explanations are computed against; cost grows linearly with it
+EXPLAIN_BACKGROUND_SIZE = int(os.getenv("EXPLAIN_BACKGROUND_SIZE", "32"))
+
 
 def init_database():
     """Initialize SQLite database for logging predictions"""
-    conn = sqlite3.connect('logs/predictions.db')
+    conn = sqlite3.connect("logs/predictions.db")
     cursor = conn.cursor()
-    cursor.execute('''
+    cursor.execute("""
         CREATE TABLE IF NOT EXISTS predictions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             timestamp TEXT,
@@ -85,65 +239,275 @@ def init_database():
             petal_width REAL,
             prediction TEXT,
             probability REAL,
-            all_probabilities TEXT
+            all_probabilities TEXT,
+            true_label TEXT,
+            feedback_timestamp TEXT
         )
-    ''')
+    """)
+    ensure_feedback_columns(conn)
     conn.commit()
     conn.close()
 
+
 def load_model_and_scaler():
-    """Load the trained model and scaler"""
-    global model, scaler
-    
+    """Load the serving bundle, falling back to the separate model and scaler pickles"""
+    global model, scaler, bundle, target_names, stage_children, prediction_encoder
+    from src.models.bundle import load_serving_bundle
+
     try:
-        model_path = "models/best_model_model.pkl"
-        scaler_path = "data/scaler.pkl"
-        
-        if os.path.exists(model_path) and os.path.exists(scaler_path):
-            model = joblib.load(model_path)
-            scaler = joblib.load(scaler_path)
-            logger.info("Model and scaler loaded successfully")
-            return True
-        else:
-            logger.error(f"Model or scaler files not found: {model_path}, {scaler_path}")
-            return False
+        bundle = load_serving_bundle(
+            BUNDLE_PATH, MODEL_PATH, SCALER_PATH, target_names, ARTIFACT_PATH, OOD_PATH
+        )
+        if bundle.ood is None:
+            bundle.ood = fit_ood_from_training_data()
+        model = bundle.model
+        scaler = bundle.scaler
+        target_names = bundle.target_names
+        stage_children = bind_stage_histograms(
+            bundle.version, quantiles=quantile_tracker
+        )
+        prediction_encoder = PredictionEncoder(target_names)
+        model_monitor.bind_classes(target_names)
+        model_monitor.load_feedback()
+        logger.info(f"Model bundle {bundle.version} loaded successfully")
+        return True
     except Exception as e:
         logger.error(f"Error loading model: {str(e)}")
         return False
 
-def log_prediction(features: IrisFeatures, prediction: str, probability: float, all_probs: dict):
-    """Log prediction to database"""
+
+def fit_ood_from_training_data(data_dir="data"):
+    """OOD scorer for models saved without one, fitted from the processed split"""
+    from src.models.ood import OODScorer
+
     try:
-        conn = sqlite3.connect('logs/predictions.db')
+        scorer = OODScorer.fit(
+            np.load(os.path.join(data_dir, "X_train.npy")),
+            np.load(os.path.join(data_dir, "y_train.npy")),
+        )
+        logger.info("OOD scorer fitted from the processed training split")
+        return scorer
+    except Exception as e:
+        logger.warning(f"Serving without OOD scores: {str(e)}")
+        return None
+
+
+def load_neighbor_index(data_dir="data"):
+    """Memory-map the similar-specimen index, or build it from the processed split"""
+    global neighbor_index
+    from src.data.neighbors import NeighborIndex
+
+    try:
+        if os.path.exists(os.path.join(NEIGHBORS_PATH, "manifest.json")):
+            neighbor_index = NeighborIndex.load(NEIGHBORS_PATH)
+        else:
+            import joblib
+
+            neighbor_index = NeighborIndex.build(
+                np.load(os.path.join(data_dir, "X_train.npy")),
+                np.load(os.path.join(data_dir, "y_train.npy")),
+                joblib.load(os.path.join(data_dir, "scaler.pkl")),
+            )
+        logger.info(f"Neighbor index of {len(neighbor_index)} specimens loaded")
+    except Exception as e:
+        neighbor_index = None
+        logger.warning(f"Serving without the neighbor index: {str(e)}")
+
+
+def load_explainer(data_dir="data"):
+    """Precompute the loaded model's explainer against a sample of the training split"""
+    global explainer
+    from src.models.explain import explainer_for, sample_background
+
+    try:
+        background_path = os.path.join(data_dir, "X_train.npy")
+        background = None
+        if os.path.exists(background_path):
+            background = sample_background(
+                np.load(background_path), size=EXPLAIN_BACKGROUND_SIZE
+            )
+        explainer = explainer_for(bundle, background)
+    except Exception as e:
+        explainer = None
+        logger.warning(f"Serving without explanations: {str(e)}")
+
+
+def explain_rows(X, all_classes=False):
+    """Prediction plus per-feature contributions for each raw feature row"""
+    X_scaled = bundle.transform(X)
+    class_indices, proba = bundle.model.predict(X_scaled), bundle.model.predict_proba(
+        X_scaled
+    )
+    base_values, contributions = explainer.explain(X_scaled)
+
+    def describe(row, class_index):
+        return {
+            "base_value": float(base_values[row, class_index]),
+            "contributions": dict(
+                zip(FEATURE_COLUMNS, contributions[row, class_index].tolist())
+            ),
+        }
+
+    results = []
+    for row, class_index in enumerate(class_indices.tolist()):
+        result = {
+            "prediction": target_names[class_index],
+            "probability": float(proba[row, class_index]),
+        }
+        result.update(describe(row, class_index))
+        if all_classes:
+            result["classes"] = {
+                name: describe(row, i) for i, name in enumerate(target_names)
+            }
+        results.append(result)
+    return results
+
+
+def score_ood(X):
+    """(scores, flags) of raw rows, recorded by the monitor; both None with no scorer"""
+    scores = bundle.ood_scores(X)
+    if scores is None:
+        return None, None
+    model_monitor.record_ood(scores, bundle.ood.threshold)
+    return scores, bundle.ood.flags(scores)
+
+
+def log_prediction(
+    features: IrisFeatures,
+    prediction: str,
+    probability: float,
+    all_probs: dict,
+    timestamp: str = None,
+):
+    """Log prediction to database; returns the row id, or None when logging failed"""
+    try:
+        conn = sqlite3.connect("logs/predictions.db")
         cursor = conn.cursor()
-        cursor.execute('''
+        cursor.execute(
+            """
             INSERT INTO predictions 
             (timestamp, sepal_length, sepal_width, petal_length, petal_width, 
              prediction, probability, all_probabilities)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            datetime.now().isoformat(),
-            features.sepal_length,
-            features.sepal_width,
-            features.petal_length,
-            features.petal_width,
-            prediction,
-            probability,
-            json.dumps(all_probs)
-        ))
+        """,
+            (
+                timestamp or datetime.now().isoformat(),
+                features.sepal_length,
+                features.sepal_width,
+                features.petal_length,
+                features.petal_width,
+                prediction,
+                probability,
+                json.dumps(all_probs),
+            ),
+        )
         conn.commit()
         conn.close()
-        logger.info(f"Prediction logged: {prediction}")
+        logger.debug("Prediction logged: %s", prediction)
+        return cursor.lastrowid
     except Exception as e:
         logger.error(f"Error logging prediction: {str(e)}")
+        return None
+
+
+def warm_up_model():
+    """Run representative inferences until latency settles, then mark the API ready"""
+    global model_ready, warmup_stats
+
+    try:
+        with startup_profiler.phase("warmup"):
+            warmup_stats = WarmupRunner().run(bundle.predict, load_warmup_rows())
+        warmup_gauge.set(warmup_stats["duration_seconds"])
+        model_ready = True
+        logger.info(f"Model warm-up finished: {warmup_stats}")
+    except Exception as e:
+        logger.error(f"Error warming up model: {str(e)}")
+
+    startup_profiler.mark_complete()
+    startup_profiler.log_report()
+
+
+def log_predictions_batch(X, class_indices, proba, timestamp):
+    """Log a scored batch in one transaction; returns the row ids, or None on failure"""
+    try:
+        names = [target_names[i] for i in class_indices.tolist()]
+        rows = (
+            (
+                timestamp,
+                *features,
+                name,
+                row_proba[idx],
+                dumps(dict(zip(target_names, row_proba))).decode(),
+            )
+            for features, name, idx, row_proba in zip(
+                X.tolist(), names, class_indices.tolist(), proba.tolist()
+            )
+        )
+        conn = sqlite3.connect("logs/predictions.db")
+        try:
+            # Hold the write lock for the whole batch so its AUTOINCREMENT ids are
+            # contiguous and end at last_insert_rowid()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                """
+                INSERT INTO predictions 
+                (timestamp, sepal_length, sepal_width, petal_length, petal_width, 
+                 prediction, probability, all_probabilities)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                rows,
+            )
+            (last_id,) = conn.execute("SELECT last_insert_rowid()").fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+        logger.debug("Batch of %d predictions logged", len(names))
+        return np.arange(last_id - len(names) + 1, last_id + 1, dtype=np.int64)
+    except Exception as e:
+        logger.error(f"Error logging batch predictions: {str(e)}")
+        return None
+
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize the application"""
-    init_database()
-    model_loaded = load_model_and_scaler()
-    if not model_loaded:
+    global monitoring_task
+
+    for module_name in DEFERRED_IMPORTS:
+        startup_profiler.import_module(module_name)
+
+    with startup_profiler.phase("init_database"):
+        init_database()
+
+    with startup_profiler.phase("model_load"):
+        model_loaded = load_model_and_scaler()
+
+    with startup_profiler.phase("neighbor_index"):
+        load_neighbor_index()
+
+    if model_loaded:
+        with startup_profiler.phase("explainer"):
+            load_explainer()
+
+    monitoring_task = asyncio.create_task(
+        run_background_monitoring(model_monitor, interval=MONITORING_INTERVAL)
+    )
+
+    if model_loaded:
+        # Warm up off the event loop so /live answers while /ready is still 503
+        asyncio.get_running_loop().run_in_executor(None, warm_up_model)
+    else:
         logger.warning("Starting API without loaded model")
+        startup_profiler.mark_complete()
+        startup_profiler.log_report()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks"""
+    if monitoring_task is not None:
+        monitoring_task.cancel()
+
 
 @app.get("/", response_model=dict)
 async def root():
@@ -152,95 +516,585 @@ async def root():
         "message": "Iris Classification API",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
     }
 
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
     return HealthResponse(
-        status="healthy",
+        status=performance_monitor.get_health_status(admission_controller.status())[
+            "status"
+        ],
+        timestamp=datetime.now().isoformat(),
+        model_loaded=model is not None and scaler is not None,
+    )
+
+
+@app.get("/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/ready", response_model=ReadinessResponse)
+async def readiness_check():
+    """Readiness probe: the model is loaded and warm-up latency has settled"""
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    if not model_ready:
+        raise HTTPException(status_code=503, detail="Model warming up")
+    queue_delay_ms = admission_controller.queue_delay() * 1000
+    if queue_delay_ms > READY_MAX_QUEUE_DELAY_MS:
+        # Take this instance out of rotation until its queue drains
+        raise HTTPException(
+            status_code=503, detail=f"Queueing delay {queue_delay_ms:.0f} ms"
+        )
+
+    return ReadinessResponse(
+        status="ready",
         timestamp=datetime.now().isoformat(),
-        model_loaded=model is not None and scaler is not None
+        model_version=bundle.version,
+        warmup=warmup_stats,
     )
 
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict(features: IrisFeatures):
-    """Make a prediction on Iris features"""
+async def predict(
+    features: IrisFeatures,
+    request: Request,
+    response_format: str = Query(
+        "json", alias="format", pattern=f"^({'|'.join(RESPONSE_FORMATS)})$"
+    ),
+):
+    """Make a prediction on Iris features
+
+    ``format=array`` returns ``[class_index, p_0, p_1, p_2]`` and ``format=binary`` a
+    packed little-endian uint8 class index followed by float64 probabilities.
+    """
     if model is None or scaler is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
-    
-    with prediction_histogram.time():
-        try:
-            # Prepare input data
-            input_data = np.array([[
+
+    # The timing middleware stamps arrival, so "parse" covers decode and validation
+    request_start = getattr(request.state, "request_start", None) or time.perf_counter()
+    timer = StageTimer(stage_children, request_start)
+    handler_start = timer.mark("parse")
+    profile = request_profiler.start()
+
+    try:
+        # Prepare input data
+        input_data = np.array(
+            [
+                [
+                    features.sepal_length,
+                    features.sepal_width,
+                    features.petal_length,
+                    features.petal_width,
+                ]
+            ]
+        )
+
+        # Scale the input
+        input_scaled = bundle.transform(input_data)
+        timer.mark("scale")
+
+        # Make prediction
+        prediction_idx = model.predict(input_scaled)[0]
+        prediction_proba = model.predict_proba(input_scaled)[0]
+        ood_score = is_ood = None
+        if bundle.ood is not None:
+            scores = bundle.ood.score(input_scaled)
+            model_monitor.record_ood(scores, bundle.ood.threshold)
+            ood_score = scores.item()
+            is_ood = ood_score > bundle.ood.threshold
+        timer.mark("inference")
+
+        # Convert to readable format
+        class_index = int(prediction_idx)
+        prediction = target_names[class_index]
+        all_probabilities = prediction_encoder.probabilities(prediction_proba)
+        probability = all_probabilities[prediction]
+        timestamp = datetime.now().isoformat()
+
+        # Log the prediction
+        prediction_id = log_prediction(
+            features, prediction, probability, all_probabilities, timestamp
+        )
+        timer.mark("db_log")
+
+        # Update metrics
+        model_monitor.record_prediction(
+            class_index,
+            probability,
+            time.perf_counter() - handler_start,
+            input_data[0],
+            prediction_proba,
+        )
+        performance_monitor.log_request(success=True)
+
+        request_logger.info(
+            "Prediction made",
+            extra={
+                "prediction": prediction,
+                "confidence": probability,
+                "model_version": bundle.version,
+            },
+        )
+
+        timer.mark("respond")
+
+        # Render the body here so FastAPI does not re-validate and re-encode it
+        response = prediction_encoder.encode(
+            response_format,
+            class_index,
+            prediction_proba,
+            all_probabilities,
+            timestamp,
+            prediction_id,
+            ood_score,
+            is_ood,
+        )
+
+        # Hand over to the middleware, which times the response hand-off
+        request.state.stage_children = stage_children
+        request.state.handler_end = timer.mark("serialize")
+        quantile_tracker.add("request", request.state.handler_end - request_start)
+        return response
+
+    except Exception as e:
+        performance_monitor.log_request(success=False)
+        logger.error(f"Error making prediction: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    finally:
+        if profile is not None:
+            request_profiler.stop(profile, time.perf_counter() - request_start)
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """Score a batch sent as .npy, Arrow IPC or CSV; results stream back in that format
+
+    The body is parsed straight into a float matrix and checked against the IrisFeatures
+    bounds in one vectorized pass. Each result row holds the predicted class and the
+    per-class probabilities.
+    """
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    batch_format = CONTENT_TYPE_FORMATS.get(content_type)
+    if batch_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported content type '{content_type}'; "
+            f"use one of {sorted(CONTENT_TYPE_FORMATS)}",
+        )
+
+    try:
+        X = parse_features(batch_format, await request.body())
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except BatchFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(X) == 0:
+        raise HTTPException(status_code=400, detail="Empty batch")
+    errors = validate_feature_matrix(X)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+    try:
+        # Large batches are scored off the event loop
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        class_indices, proba = await loop.run_in_executor(None, bundle.predict, X)
+        latency = time.perf_counter() - start
+        ood_scores, _ = score_ood(X)
+
+        prediction_ids = await loop.run_in_executor(
+            None,
+            log_predictions_batch,
+            X,
+            class_indices,
+            proba,
+            datetime.now().isoformat(),
+        )
+        model_monitor.record_batch(class_indices, latency, X, proba)
+        performance_monitor.log_request(success=True)
+        request_logger.info(
+            "Batch prediction made",
+            extra={
+                "rows": len(X),
+                "format": batch_format,
+                "model_version": bundle.version,
+            },
+        )
+    except Exception as e:
+        performance_monitor.log_request(success=False)
+        logger.error(f"Error making batch prediction: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+    return StreamingResponse(
+        stream_results(
+            batch_format,
+            class_indices,
+            proba,
+            target_names,
+            ood_scores=ood_scores,
+            prediction_ids=prediction_ids,
+        ),
+        media_type=FORMAT_MEDIA_TYPES[batch_format],
+        headers=(
+            None
+            if ood_scores is None
+            else {"X-OOD-Threshold": repr(bundle.ood.threshold)}
+        ),
+    )
+
+
+def record_stream_batch(X, class_indices, proba, latency):
+    """Stream micro-batch bookkeeping: metrics inline, logging in the executor
+
+    Returns the executor future of the logged row ids, which the streams await before
+    sending results so each one carries its ``prediction_id``.
+    """
+    model_monitor.record_batch(class_indices, latency, X, proba)
+    return asyncio.get_running_loop().run_in_executor(
+        None, log_predictions_batch, X, class_indices, proba, datetime.now().isoformat()
+    )
+
+
+def open_prediction_stream(transport):
+    """PredictionStream scoring with the loaded bundle"""
+    return PredictionStream(
+        score_batch=bundle.predict,
+        on_batch=record_stream_batch,
+        score_ood=score_ood,
+        encoder=prediction_encoder,
+        transport=transport,
+        max_batch=STREAM_MAX_BATCH,
+        max_delay=STREAM_MAX_DELAY_MS / 1000,
+    )
+
+
+def create_binary_server():
+    """BinaryPredictionServer scoring and logging like the stream endpoints"""
+    from src.api.binary_server import BinaryPredictionServer
+
+    return BinaryPredictionServer(
+        score_batch=lambda X: bundle.predict(X),
+        on_batch=record_stream_batch,
+        score_ood=score_ood,
+        max_batch=STREAM_MAX_BATCH,
+        max_delay=BINARY_MAX_DELAY_MS / 1000,
+    )
+
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """Chunked NDJSON stream: one JSON row per line in, one result per line out"""
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    stream = open_prediction_stream("ndjson")
+
+    async def result_lines():
+        async for results in stream.iter_results(iter_ndjson_lines(request.stream())):
+            yield b"".join(dumps(result) + b"\n" for result in results)
+
+    return DuplexStreamingResponse(result_lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@app.websocket("/ws/predict")
+async def predict_websocket(websocket: WebSocket):
+    """WebSocket stream: each message holds NDJSON rows; each reply is a JSON array"""
+    await websocket.accept()
+    if bundle is None:
+        await websocket.close(code=1013, reason="Model not loaded")
+        return
+
+    async def incoming_lines():
+        while True:
+            message = await websocket.receive_text()
+            for line in message.splitlines():
+                if line.strip():
+                    yield line
+
+    try:
+        async for results in open_prediction_stream("websocket").iter_results(
+            incoming_lines()
+        ):
+            await websocket.send_text(dumps(results).decode())
+        await websocket.close()
+    except Exception as e:
+        logger.info(f"Prediction WebSocket closed: {type(e).__name__}")
+
+
+@app.get("/startup")
+async def get_startup_profile():
+    """Startup profile: deferred import, model load and warm-up timings"""
+    return startup_profiler.report()
+
+
+@app.get("/debug/profiler")
+async def get_profiler_status():
+    """Request profiler settings and the most recent slow-request profiles"""
+    return {**request_profiler.status(), "recent": list(request_profiler.recent)}
+
+
+@app.post("/debug/profiler")
+async def configure_profiler(config: ProfilerConfig):
+    """Toggle the sampled request profiler at runtime"""
+    request_profiler.configure(
+        enabled=config.enabled,
+        sample_rate=config.sample_rate,
+        slow_threshold_ms=config.slow_threshold_ms,
+    )
+    return request_profiler.status()
+
+
+def explanation_header():
+    return {
+        "method": explainer.method,
+        "output": explainer.output,
+        "model_version": bundle.version,
+    }
+
+
+@app.post("/explain")
+async def explain(features: IrisFeatures, all_classes: bool = Query(False)):
+    """Why the model predicts what it does for one sample
+
+    Base value plus the per-feature contributions gives the explained output: logits for
+    logistic regression, the forest's probabilities for tree ensembles and the served
+    probabilities (exact Shapley values) otherwise.
+    """
+    if bundle is None or explainer is None:
+        raise HTTPException(status_code=503, detail="Model or explainer not loaded")
+
+    X = np.array(
+        [
+            [
                 features.sepal_length,
                 features.sepal_width,
                 features.petal_length,
-                features.petal_width
-            ]])
-            
-            # Scale the input
-            input_scaled = scaler.transform(input_data)
-            
-            # Make prediction
-            prediction_idx = model.predict(input_scaled)[0]
-            prediction_proba = model.predict_proba(input_scaled)[0]
-            
-            # Convert to readable format
-            prediction = target_names[prediction_idx]
-            probability = float(prediction_proba[prediction_idx])
-            
-            all_probabilities = {
-                target_names[i]: float(prob) 
-                for i, prob in enumerate(prediction_proba)
+                features.petal_width,
+            ]
+        ]
+    )
+    result = explain_rows(X, all_classes)[0]
+    return {**explanation_header(), **result}
+
+
+@app.post("/explain/batch")
+async def explain_batch(query: ExplainRequest):
+    """Explanations for up to 1000 samples, computed in one vectorized pass"""
+    if bundle is None or explainer is None:
+        raise HTTPException(status_code=503, detail="Model or explainer not loaded")
+
+    X = np.array(
+        [
+            [s.sepal_length, s.sepal_width, s.petal_length, s.petal_width]
+            for s in query.samples
+        ]
+    )
+    # Shapley explanations evaluate every coalition; keep the event loop free
+    results = await asyncio.get_running_loop().run_in_executor(
+        None, explain_rows, X, query.all_classes
+    )
+    return {**explanation_header(), "results": results}
+
+
+@app.post("/neighbors")
+async def similar_specimens(query: NeighborsRequest):
+    """The k closest labelled training specimens per sample, with the model's prediction
+
+    Distances are Euclidean in the scaled feature space the model sees; specimens are
+    reported in centimetres.
+    """
+    if bundle is None or neighbor_index is None:
+        raise HTTPException(
+            status_code=503, detail="Model or neighbor index not loaded"
+        )
+
+    X = np.array(
+        [
+            [s.sepal_length, s.sepal_width, s.petal_length, s.petal_width]
+            for s in query.samples
+        ]
+    )
+
+    def search():
+        class_indices, proba = bundle.predict(X)
+        distances, indices = neighbor_index.query(bundle.transform(X), query.k)
+        return class_indices, proba, distances, indices
+
+    # Large batches scan many leaves; keep the event loop free meanwhile
+    class_indices, proba, distances, indices = (
+        await asyncio.get_running_loop().run_in_executor(None, search)
+    )
+
+    labels = neighbor_index.labels
+    row_ids = neighbor_index.row_ids
+    raw = neighbor_index.raw_features
+    results = []
+    for class_index, row_proba, row_distances, row_indices in zip(
+        class_indices.tolist(), proba, distances.tolist(), indices.tolist()
+    ):
+        neighbors = []
+        for distance, position in zip(row_distances, row_indices):
+            neighbor = {
+                "index": int(row_ids[position]),
+                "distance": distance,
+                "label": target_names[int(labels[position])],
             }
-            
-            # Log the prediction
-            log_prediction(features, prediction, probability, all_probabilities)
-            
-            # Update metrics
-            prediction_counter.inc()
-            
-            logger.info(f"Prediction made: {prediction} (confidence: {probability:.4f})")
-            
-            return PredictionResponse(
-                prediction=prediction,
-                probability=probability,
-                all_probabilities=all_probabilities,
-                timestamp=datetime.now().isoformat()
-            )
-            
-        except Exception as e:
-            logger.error(f"Error making prediction: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+            if raw is not None:
+                neighbor.update(zip(FEATURE_COLUMNS, raw[position].tolist()))
+            neighbors.append(neighbor)
+        results.append(
+            {
+                "prediction": target_names[class_index],
+                "probability": float(row_proba[class_index]),
+                "neighbor_agreement": sum(
+                    n["label"] == target_names[class_index] for n in neighbors
+                )
+                / len(neighbors),
+                "neighbors": neighbors,
+            }
+        )
+    return {"k": query.k, "results": results}
+
+
+@app.get("/monitoring/status")
+async def get_monitoring_status():
+    """API health counters, admission state and the latest monitoring cycle"""
+    admission = admission_controller.status()
+    return {
+        "performance": performance_monitor.get_health_status(admission),
+        "admission": admission,
+        "last_cycle": model_monitor.last_cycle,
+    }
+
+
+@app.post("/feedback")
+async def submit_feedback(feedback: FeedbackRequest):
+    """Attach true labels to logged predictions by id and update the online accuracy
+
+    Labels for unknown ids or classes are reported back; predictions that already have a
+    label keep it, so retried uploads are not counted twice.
+    """
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    class_index = {name: i for i, name in enumerate(target_names)}
+    invalid_labels = sorted(
+        {
+            item.true_label
+            for item in feedback.labels
+            if item.true_label not in class_index
+        }
+    )
+    labels_by_id = {
+        item.prediction_id: item.true_label
+        for item in feedback.labels
+        if item.true_label in class_index
+    }
+
+    try:
+        loop = asyncio.get_running_loop()
+        matched, not_found, duplicates = await loop.run_in_executor(
+            None, store_feedback, "logs/predictions.db", labels_by_id
+        )
+    except Exception as e:
+        logger.error(f"Error storing feedback: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Feedback error: {str(e)}")
+
+    # Predictions logged under another class list cannot be placed in this matrix
+    matched = [row for row in matched if row[1] in class_index]
+    if matched:
+        model_monitor.record_feedback(
+            [class_index[predicted] for _, predicted, _ in matched],
+            [class_index[actual] for _, _, actual in matched],
+        )
+
+    return {
+        "accepted": len(matched),
+        "not_found": not_found,
+        "duplicates": duplicates,
+        "invalid_labels": invalid_labels,
+        "accuracy": model_monitor.feedback.accuracy(),
+    }
+
+
+@app.get("/feedback/stats")
+async def get_feedback_stats(window_seconds: float = Query(None, gt=0)):
+    """Windowed confusion matrix, accuracy and per-class precision/recall"""
+    return model_monitor.feedback_stats(window_seconds)
+
+
+@app.get("/monitoring/live")
+async def get_live_monitoring(window_seconds: float = Query(300, gt=0)):
+    """Statistics and short-window drift from the in-memory prediction buffer"""
+    return {
+        "window": model_monitor.live_stats(window_seconds),
+        "buffer": model_monitor.live_stats(),
+        "drift": model_monitor.check_recent_drift(window_seconds),
+        "ood": model_monitor.ood_stats(window_seconds),
+    }
+
+
+@app.get("/slo")
+async def get_slo(window_seconds: List[float] = Query([60, 300, 3600])):
+    """Sketch p50/p99/p999 of each stage, latency and confidence, with SLO burn rates"""
+    return {
+        "relative_accuracy": quantile_tracker.relative_accuracy,
+        "horizon_seconds": quantile_tracker.bucket_seconds * quantile_tracker.n_buckets,
+        "quantiles": {
+            f"{seconds:g}s": quantile_tracker.summary(seconds)
+            for seconds in window_seconds
+        },
+        "slos": slo_evaluator.evaluate(),
+    }
+
 
 @app.get("/metrics")
 async def get_metrics():
     """Prometheus metrics endpoint"""
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
+
 @app.get("/predictions/history")
 async def get_prediction_history(limit: int = 100):
-    """Get recent prediction history"""
+    """Get recent prediction history, newest first
+
+    Always read from SQLite: only the database has the row ids that POST /feedback takes
+    and the labels attached since. Walking the id primary key backwards reads just the
+    returned rows.
+    """
     try:
-        conn = sqlite3.connect('logs/predictions.db')
+        conn = sqlite3.connect("logs/predictions.db")
         cursor = conn.cursor()
-        cursor.execute('''
+        cursor.execute(
+            """
             SELECT * FROM predictions 
-            ORDER BY timestamp DESC 
+            ORDER BY id DESC 
             LIMIT ?
-        ''', (limit,))
-        
+        """,
+            (limit,),
+        )
+
         columns = [description[0] for description in cursor.description]
         results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
+
         conn.close()
         return {"history": results, "count": len(results)}
     except Exception as e:
         logger.error(f"Error retrieving prediction history: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving history")
 
+
 if __name__ == "__main__":
     import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,98 @@
+"""
+Lean response serialization for /predict
+"""
+
+import json
+import struct
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BINARY_MEDIA_TYPE = "application/x-iris-prediction"
+RESPONSE_FORMATS = ("json", "array", "binary")
+
+
+def dumps(content):
+    """Serialize to JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson, bypassing FastAPI's encoder"""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
+
+
+class PredictionEncoder:
+    """Build /predict bodies with class-name keys resolved once per model
+
+    json:   {"prediction", "probability", "all_probabilities", "timestamp"}, plus
+    "prediction_id"
+            when the prediction was logged and "ood_score"/"ood" when the bundle scores
+            OOD
+    array:  [class_index, p_0, ..., p_n-1]
+    binary: little-endian uint8 class index followed by n float64 probabilities
+
+    Every format carries the logged prediction's id in the ``X-Prediction-ID`` header
+    and the OOD score in ``X-OOD-Score``.
+    """
+
+    def __init__(self, target_names):
+        self.target_names = tuple(target_names)
+        self._binary = struct.Struct(f"<B{len(self.target_names)}d")
+
+    def probabilities(self, proba):
+        """Class name -> probability for one row of predict_proba output"""
+        return dict(zip(self.target_names, proba.tolist()))
+
+    def encode(
+        self,
+        response_format,
+        class_index,
+        proba,
+        all_probabilities,
+        timestamp,
+        prediction_id=None,
+        ood_score=None,
+        is_ood=None,
+    ):
+        """Render the response for the requested format"""
+        headers = {}
+        if prediction_id is not None:
+            headers["X-Prediction-ID"] = str(prediction_id)
+        if ood_score is not None:
+            headers["X-OOD-Score"] = repr(ood_score)
+        if response_format == "array":
+            return FastJSONResponse([class_index, *proba.tolist()], headers=headers)
+        if response_format == "binary":
+            return Response(
+                self._binary.pack(class_index, *proba.tolist()),
+                media_type=BINARY_MEDIA_TYPE,
+                headers=headers,
+            )
+        body = {
+            "prediction": self.target_names[class_index],
+            "probability": all_probabilities[self.target_names[class_index]],
+            "all_probabilities": all_probabilities,
+            "timestamp": timestamp,
+        }
+        if prediction_id is not None:
+            body["prediction_id"] = prediction_id
+        if ood_score is not None:
+            body["ood_score"] = ood_score
+            body["ood"] = is_ood
+        return FastJSONResponse(body, headers=headers)
+
+    def decode_binary(self, body):
+        """Client-side helper: (class_index, probabilities) from a binary body"""
+        class_index, *proba = self._binary.unpack(body)
+        return class_index, proba
@@ -0,0 +1,158 @@
+"""
+Startup profiling and model warm-up for the API process
+"""
+
+import importlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Heavy modules kept out of the API import path and loaded during startup instead
+DEFERRED_IMPORTS = ("joblib", "sklearn", "src.models.bundle")
+
+FEATURE_KEYS = ("sepal_length", "sepal_width", "petal_length", "petal_width")
+WARMUP_DATA_PATH = os.getenv("WARMUP_DATA_PATH", "test_data.json")
+WARMUP_BATCH_SIZES = tuple(
+    int(size)
+    for size in os.getenv("WARMUP_BATCH_SIZES", "1,8,64").split(",")
+    if size.strip()
+)
+
+
+class StartupProfiler:
+    """Record import, load and warm-up timings for the startup report"""
+
+    def __init__(self, started_at=None):
+        # started_at, a perf_counter reading taken before the caller's own imports,
+        # starts the report there; the time until now is the "module_imports" phase
+        now = time.perf_counter()
+        self.created_at = now if started_at is None else started_at
+        self.imports = {}
+        self.phases = {}
+        if started_at is not None:
+            self.phases["module_imports"] = now - started_at
+        self.completed_at = None
+
+    def import_module(self, name):
+        """Import a module and record how long it took"""
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        self.imports[name] = time.perf_counter() - start
+        return module
+
+    @contextmanager
+    def phase(self, name):
+        """Time a named startup phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def mark_complete(self):
+        self.completed_at = time.perf_counter()
+
+    def report(self):
+        """Startup timings in milliseconds"""
+        total = None
+        if self.completed_at is not None:
+            total = (self.completed_at - self.created_at) * 1000
+        return {
+            "imports_ms": {
+                name: round(t * 1000, 3) for name, t in self.imports.items()
+            },
+            "phases_ms": {name: round(t * 1000, 3) for name, t in self.phases.items()},
+            "total_ms": round(total, 3) if total is not None else None,
+            "generated_at": datetime.now().isoformat(),
+        }
+
+    def log_report(self):
+        report = self.report()
+        logger.info(f"Startup profile: {report}")
+        return report
+
+
+def load_warmup_rows(path=WARMUP_DATA_PATH):
+    """Representative rows: the bundle probe rows plus any rows in test_data.json"""
+    from src.models.bundle import PROBE_INPUT
+
+    rows = [PROBE_INPUT]
+    try:
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            records = data if isinstance(data, list) else [data]
+            rows.append(
+                np.array(
+                    [[record[key] for key in FEATURE_KEYS] for record in records],
+                    dtype=float,
+                )
+            )
+    except Exception as e:
+        logger.warning(f"Could not read warm-up data from {path}: {str(e)}")
+    return np.vstack(rows)
+
+
+class WarmupRunner:
+    """Run inference rounds per batch size until round p99 latency stops moving"""
+
+    def __init__(
+        self,
+        batch_sizes=WARMUP_BATCH_SIZES,
+        round_size=100,
+        min_rounds=3,
+        max_rounds=10,
+        tolerance=0.1,
+    ):
+        self.batch_sizes = batch_sizes
+        self.round_size = round_size
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.tolerance = tolerance
+
+    def _round_p99(self, predict_fn, batch):
+        timings = np.empty(self.round_size)
+        for i in range(self.round_size):
+            start = time.perf_counter()
+            predict_fn(batch)
+            timings[i] = time.perf_counter() - start
+        return float(np.percentile(timings, 99))
+
+    def run(self, predict_fn, rows):
+        """Warm up predict_fn on tiled copies of rows; returns per-batch-size stats"""
+        start = time.perf_counter()
+        results = {}
+
+        for batch_size in self.batch_sizes:
+            batch = np.resize(rows, (batch_size, rows.shape[1]))
+            previous_p99 = None
+            stable = False
+
+            for rounds in range(1, self.max_rounds + 1):
+                p99 = self._round_p99(predict_fn, batch)
+                if (
+                    previous_p99 is not None
+                    and rounds >= self.min_rounds
+                    and abs(p99 - previous_p99) <= self.tolerance * previous_p99
+                ):
+                    stable = True
+                    break
+                previous_p99 = p99
+
+            results[batch_size] = {
+                "rounds": rounds,
+                "p99_ms": round(p99 * 1000, 4),
+                "stable": stable,
+            }
+
+        return {
+            "batch_sizes": results,
+            "duration_seconds": time.perf_counter() - start,
+        }
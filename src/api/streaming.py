@@ -0,0 +1,267 @@
+"""
+Long-lived prediction streams: rows flow in over NDJSON or WebSocket, are micro-batched,
+scored together and flow back out in order
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+import numpy as np
+from fastapi.responses import StreamingResponse
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.api.batch_io import (
+    FEATURE_KEYS,
+    FEATURE_MAX,
+    FEATURE_MIN,
+    validate_feature_matrix,
+)
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_TRANSPORTS = ("ndjson", "websocket")
+
+stream_rows_counter = Counter(
+    "iris_stream_rows_total",
+    "Rows received on prediction streams",
+    ["transport", "outcome"],
+)
+stream_batch_histogram = Histogram(
+    "iris_stream_batch_size",
+    "Rows scored per stream micro-batch",
+    ["transport"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024),
+)
+stream_active_gauge = Gauge(
+    "iris_stream_active", "Open prediction streams", ["transport"]
+)
+
+_END = object()
+
+
+class StreamMetrics:
+    """Metric children bound once per transport"""
+
+    def __init__(self, transport):
+        self.scored = stream_rows_counter.labels(transport=transport, outcome="scored")
+        self.rejected = stream_rows_counter.labels(
+            transport=transport, outcome="rejected"
+        )
+        self.batch_size = stream_batch_histogram.labels(transport=transport)
+        self.active = stream_active_gauge.labels(transport=transport)
+
+
+STREAM_METRICS = {
+    transport: StreamMetrics(transport) for transport in STREAM_TRANSPORTS
+}
+
+
+def parse_row(line):
+    """(id, features, error) for one JSON row: an object of the features or 4 numbers"""
+    try:
+        row = _loads(line)
+        if isinstance(row, dict):
+            return row.get("id"), [float(row[key]) for key in FEATURE_KEYS], None
+        if isinstance(row, list) and len(row) == len(FEATURE_KEYS):
+            return None, [float(value) for value in row], None
+        return (
+            None,
+            None,
+            f"Expected an object with {', '.join(FEATURE_KEYS)} or a 4-number array",
+        )
+    except (ValueError, TypeError, KeyError) as e:
+        return None, None, f"Invalid row: {str(e)}"
+
+
+async def iter_ndjson_lines(byte_chunks):
+    """Split an async stream of byte chunks into non-empty lines"""
+    buffer = b""
+    async for chunk in byte_chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that leaves receive() to the body iterator
+
+    StreamingResponse normally listens for the client disconnect while streaming, which
+    competes with a body iterator that is still reading the request. Here the iterator
+    owns the request stream and sees the disconnect itself.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class PredictionStream:
+    """Micro-batching scorer for one stream
+
+    A reader task parses incoming rows into a bounded queue; when the queue is full the
+    reader stops pulling from the connection, which pushes back on the client. The
+    scorer drains up to max_batch rows, waiting at most max_delay for a batch to fill,
+    scores them in one call and yields the results in arrival order. ``on_batch`` may
+    return an awaitable of the rows' logged ids, which fill each result's
+    ``prediction_id``. With ``score_ood`` (rows -> (scores, flags)) each result also
+    carries ``ood_score`` and ``ood``.
+    """
+
+    def __init__(
+        self,
+        score_batch,
+        on_batch,
+        encoder,
+        transport="ndjson",
+        max_batch=256,
+        max_delay=0.005,
+        max_pending=1024,
+        score_ood=None,
+    ):
+        self.score_batch = score_batch
+        self.on_batch = on_batch
+        self.score_ood = score_ood
+        self.encoder = encoder
+        self.metrics = STREAM_METRICS[transport]
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+
+    async def _read(self, lines, queue):
+        seq = 0
+        try:
+            async for line in lines:
+                await queue.put((seq, *parse_row(line)))
+                seq += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Client disconnects end the stream like a normal close
+            logger.info(f"Prediction stream input closed: {type(e).__name__}")
+        await queue.put(_END)
+
+    async def _next_batch(self, queue):
+        """Up to max_batch rows; returns (rows, ended)"""
+        item = await queue.get()
+        if item is _END:
+            return [], True
+
+        batch = [item]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _END:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _score(self, batch):
+        """Result dicts for a batch, in arrival order"""
+        results = [None] * len(batch)
+        positions, rows = [], []
+        for position, (seq, row_id, features, error) in enumerate(batch):
+            if error is None:
+                positions.append(position)
+                rows.append(features)
+            else:
+                results[position] = {"seq": seq, "id": row_id, "error": error}
+
+        if rows:
+            X = np.array(rows, dtype=np.float64)
+            invalid = {
+                error["row"]
+                for error in validate_feature_matrix(X, max_reported=len(X))
+            }
+            valid = [i for i in range(len(X)) if i not in invalid]
+            for i in invalid:
+                seq, row_id = batch[positions[i]][:2]
+                results[positions[i]] = {
+                    "seq": seq,
+                    "id": row_id,
+                    "error": "Features must be finite and within "
+                    f"[{FEATURE_MIN:g}, {FEATURE_MAX:g}]",
+                }
+
+            if valid:
+                X_valid = X[valid]
+                start = time.perf_counter()
+                class_indices, proba = self.score_batch(X_valid)
+                logged = self.on_batch(
+                    X_valid, class_indices, proba, time.perf_counter() - start
+                )
+                ood_scores, ood_flags = (
+                    self.score_ood(X_valid)
+                    if self.score_ood is not None
+                    else (None, None)
+                )
+
+                target_names = self.encoder.target_names
+                for i, class_index, row_proba in zip(
+                    valid, class_indices.tolist(), proba
+                ):
+                    seq, row_id = batch[positions[i]][:2]
+                    all_probabilities = self.encoder.probabilities(row_proba)
+                    results[positions[i]] = {
+                        "seq": seq,
+                        "id": row_id,
+                        "prediction": target_names[class_index],
+                        "probability": all_probabilities[target_names[class_index]],
+                        "all_probabilities": all_probabilities,
+                        "prediction_id": None,
+                    }
+                if ood_scores is not None:
+                    for i, score, flag in zip(
+                        valid, ood_scores.tolist(), ood_flags.tolist()
+                    ):
+                        results[positions[i]].update(ood_score=score, ood=flag)
+                prediction_ids = await logged if logged is not None else None
+                if prediction_ids is not None:
+                    for i, prediction_id in zip(valid, prediction_ids.tolist()):
+                        results[positions[i]]["prediction_id"] = prediction_id
+                self.metrics.batch_size.observe(len(valid))
+                self.metrics.scored.inc(len(valid))
+
+        rejected = len(batch) - sum(1 for r in results if "error" not in r)
+        if rejected:
+            self.metrics.rejected.inc(rejected)
+        return results
+
+    async def iter_results(self, lines):
+        """Async generator of result batches for an async iterator of JSON row lines"""
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        reader = asyncio.create_task(self._read(lines, queue))
+        self.metrics.active.inc()
+        try:
+            ended = False
+            while not ended:
+                batch, ended = await self._next_batch(queue)
+                if batch:
+                    yield await self._score(batch)
+            await reader
+        finally:
+            reader.cancel()
+            self.metrics.active.dec()
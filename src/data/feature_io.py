@@ -0,0 +1,198 @@
+"""
+Feature matrix parsing and validation shared by the API and offline scoring: NumPy,
+Arrow IPC and CSV bodies straight into an (n, 4) float matrix, checked against the
+IrisFeatures bounds
+"""
+
+import io
+
+import numpy as np
+
+FEATURE_KEYS = ("sepal_length", "sepal_width", "petal_length", "petal_width")
+FEATURE_MIN = 0.0
+FEATURE_MAX = 10.0
+
+
+class BatchFormatError(ValueError):
+    """Raised when a batch body cannot be parsed into an (n, 4) feature matrix"""
+
+
+class UnsupportedFormatError(BatchFormatError):
+    """Raised when the body format is unknown or its optional dependency is missing"""
+
+
+def _normalize_column(name):
+    """'Sepal Length (cm)' -> 'sepal_length'"""
+    return name.strip().lower().replace("(cm)", "").strip().replace(" ", "_")
+
+
+def _column_order(names):
+    """Indices of the feature columns in a header, in FEATURE_KEYS order"""
+    normalized = [_normalize_column(name) for name in names]
+    try:
+        return [normalized.index(key) for key in FEATURE_KEYS]
+    except ValueError:
+        raise BatchFormatError(
+            f"Columns must include {', '.join(FEATURE_KEYS)}; got {list(names)}"
+        )
+
+
+def is_header(line):
+    """True when a CSV line has a field that is not a number"""
+    for field in line.split(","):
+        try:
+            float(field)
+        except ValueError:
+            return True
+    return False
+
+
+def _check_shape(X):
+    if X.ndim == 1 and X.shape[0] == len(FEATURE_KEYS):
+        X = X.reshape(1, -1)
+    if X.ndim != 2 or X.shape[1] != len(FEATURE_KEYS):
+        raise BatchFormatError(
+            f"Expected an (n, {len(FEATURE_KEYS)}) matrix, got shape {X.shape}"
+        )
+    return X
+
+
+def parse_npy(body):
+    try:
+        X = np.load(io.BytesIO(body), allow_pickle=False)
+    except Exception as e:
+        raise BatchFormatError(f"Invalid .npy body: {str(e)}")
+    try:
+        X = np.asarray(X, dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise BatchFormatError(
+            f"Expected a numeric .npy array, got dtype {X.dtype}: {str(e)}"
+        )
+    return _check_shape(X)
+
+
+def parse_csv(body):
+    """CSV with an optional header row; without one columns are in FEATURE_KEYS order"""
+    first_line = body.split(b"\n", 1)[0].decode("utf-8", errors="replace")
+    has_header = is_header(first_line)
+    usecols = _column_order(first_line.split(",")) if has_header else None
+
+    try:
+        X = np.loadtxt(
+            io.BytesIO(body),
+            delimiter=",",
+            skiprows=int(has_header),
+            usecols=usecols,
+            ndmin=2,
+            dtype=np.float64,
+        )
+    except Exception as e:
+        raise BatchFormatError(f"Invalid CSV body: {str(e)}")
+    if X.size == 0:
+        return np.empty((0, len(FEATURE_KEYS)))
+    return _check_shape(X)
+
+
+def parse_csv_rows(body):
+    """Like parse_csv, but an unparseable row becomes a NaN row instead of an error
+
+    NaN rows fail validate_feature_matrix, so callers that score the valid rows and flag
+    the rest (offline bulk scoring) keep going past a malformed line. A header without
+    the feature columns still raises, since no row could be read.
+    """
+    try:
+        return parse_csv(body)
+    except BatchFormatError:
+        pass
+
+    lines = body.decode("utf-8", errors="replace").splitlines()
+    order, n_fields = list(range(len(FEATURE_KEYS))), len(FEATURE_KEYS)
+    if lines and is_header(lines[0]):
+        header = lines[0].split(",")
+        order, n_fields = _column_order(header), len(header)
+        lines = lines[1:]
+    rows = []
+    for line in lines:
+        if not line.strip():
+            continue
+        fields = line.split(",")
+        try:
+            if len(fields) != n_fields:
+                raise ValueError(f"Expected {n_fields} fields")
+            rows.append([float(fields[i]) for i in order])
+        except ValueError:
+            rows.append([np.nan] * len(FEATURE_KEYS))
+    return np.array(rows, dtype=np.float64).reshape(-1, len(FEATURE_KEYS))
+
+
+def import_arrow():
+    """pyarrow with its IPC module; UnsupportedFormatError when not installed"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise UnsupportedFormatError("Arrow bodies require pyarrow to be installed")
+    return pyarrow
+
+
+def parse_arrow(body):
+    """Arrow IPC stream or file; columns are matched by name, else taken in order"""
+    pa = import_arrow()
+    try:
+        try:
+            table = pa.ipc.open_stream(body).read_all()
+        except pa.ArrowInvalid:
+            table = pa.ipc.open_file(body).read_all()
+    except Exception as e:
+        raise BatchFormatError(f"Invalid Arrow body: {str(e)}")
+
+    try:
+        order = _column_order(table.column_names)
+    except BatchFormatError:
+        order = list(range(len(FEATURE_KEYS)))
+    if table.num_columns < len(FEATURE_KEYS):
+        raise BatchFormatError(
+            f"Expected {len(FEATURE_KEYS)} columns, got {table.num_columns}"
+        )
+
+    try:
+        columns = [
+            table.column(i).to_numpy().astype(np.float64, copy=False) for i in order
+        ]
+    except (TypeError, ValueError, pa.ArrowException) as e:
+        raise BatchFormatError(f"Feature columns must be numeric: {str(e)}")
+    return (
+        np.column_stack(columns) if table.num_rows else np.empty((0, len(FEATURE_KEYS)))
+    )
+
+
+PARSERS = {"npy": parse_npy, "csv": parse_csv, "arrow": parse_arrow}
+
+
+def parse_features(batch_format, body):
+    """Parse a request body into an (n, 4) float64 matrix"""
+    parser = PARSERS.get(batch_format)
+    if parser is None:
+        raise UnsupportedFormatError(f"Unsupported batch format: {batch_format}")
+    return parser(body)
+
+
+def validate_feature_matrix(X, max_reported=10):
+    """Vectorized IrisFeatures bounds check: error details, empty when valid"""
+    invalid = ~np.isfinite(X) | (X < FEATURE_MIN) | (X > FEATURE_MAX)
+    bad_rows = np.flatnonzero(invalid.any(axis=1))
+    if bad_rows.size == 0:
+        return []
+
+    errors = [
+        {
+            "row": int(row),
+            "features": [FEATURE_KEYS[i] for i in np.flatnonzero(invalid[row])],
+            "msg": "Features must be finite and within "
+            f"[{FEATURE_MIN:g}, {FEATURE_MAX:g}]",
+        }
+        for row in bad_rows[:max_reported]
+    ]
+    if bad_rows.size > max_reported:
+        errors.append({"msg": f"{bad_rows.size - max_reported} more invalid rows"})
+    return errors
@@ -0,0 +1,215 @@
+"""
+Exact k-nearest-neighbour search over the scaled training specimens, stored as
+memory-mappable arrays
+"""
+
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = "data/neighbors"
+INDEX_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+INDEX_ARRAYS = (
+    "features",
+    "labels",
+    "row_ids",
+    "leaf_offsets",
+    "leaf_lower",
+    "leaf_upper",
+    "raw_features",
+)
+
+DEFAULT_LEAF_SIZE = 256
+# Leaves scanned per step of a query, and query-leaf bound elements computed per chunk
+LEAVES_PER_STEP = 4
+BOUND_ELEMENTS = 1 << 22
+
+
+def _partition(X, leaf_size):
+    """Row order and leaf offsets from median splits on the widest dimension"""
+    order = np.arange(len(X))
+    offsets = []
+    stack = [(0, len(X))]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo <= leaf_size:
+            offsets.append(lo)
+            continue
+        rows = order[lo:hi]
+        points = X[rows]
+        dim = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+        mid = (hi - lo) // 2
+        order[lo:hi] = rows[np.argpartition(points[:, dim], mid)]
+        # Right half pushed first so leaves come off the stack left to right
+        stack.append((lo + mid, hi))
+        stack.append((lo, lo + mid))
+    offsets.append(len(X))
+    return order, np.asarray(offsets, dtype=np.int64)
+
+
+class NeighborIndex:
+    """Reference specimens grouped into contiguous leaves with bounding boxes
+
+    A query computes a lower bound on its distance to every leaf box, then scans leaves
+    in bound order and stops once the next bound exceeds its current k-th distance, so
+    results are exact while most leaves are never read. The arrays are read-only memory
+    maps when loaded from disk, so API workers share them.
+    """
+
+    def __init__(
+        self,
+        features,
+        labels,
+        row_ids,
+        leaf_offsets,
+        leaf_lower,
+        leaf_upper,
+        raw_features=None,
+    ):
+        self.features = features
+        self.labels = labels
+        self.row_ids = row_ids
+        self.leaf_offsets = leaf_offsets
+        self.leaf_lower = leaf_lower
+        self.leaf_upper = leaf_upper
+        self.raw_features = raw_features
+
+    def __len__(self):
+        return len(self.features)
+
+    @property
+    def n_leaves(self):
+        return len(self.leaf_offsets) - 1
+
+    @classmethod
+    def build(cls, X_scaled, y, scaler=None, leaf_size=DEFAULT_LEAF_SIZE):
+        """Index scaled training rows; ``scaler`` recovers the measurements shown"""
+        X = np.asarray(X_scaled, dtype=np.float64)
+        order, offsets = _partition(X, leaf_size)
+        features = np.ascontiguousarray(X[order])
+        leaf_lower = np.minimum.reduceat(features, offsets[:-1], axis=0)
+        leaf_upper = np.maximum.reduceat(features, offsets[:-1], axis=0)
+        # Rounded to strip inverse-scaling noise from the recorded measurements
+        raw = (
+            np.round(scaler.inverse_transform(features), 6)
+            if scaler is not None
+            else None
+        )
+        return cls(
+            features,
+            np.asarray(y, dtype=np.int64)[order],
+            order,
+            offsets,
+            leaf_lower,
+            leaf_upper,
+            raw,
+        )
+
+    def _leaf_bounds(self, Q):
+        """Squared distance from each query to each leaf's bounding box"""
+        below = np.maximum(self.leaf_lower[None, :, :] - Q[:, None, :], 0)
+        above = np.maximum(Q[:, None, :] - self.leaf_upper[None, :, :], 0)
+        return ((below + above) ** 2).sum(axis=2)
+
+    def _search(self, q, bounds, k):
+        order = np.argsort(bounds, kind="stable")
+        best_distances = np.full(k, np.inf)
+        best_rows = np.full(k, -1, dtype=np.int64)
+        for step in range(0, self.n_leaves, LEAVES_PER_STEP):
+            leaves = order[step : step + LEAVES_PER_STEP]
+            leaves = leaves[bounds[leaves] < best_distances.max()]
+            if len(leaves) == 0:
+                # Leaves are in bound order, so no later leaf can improve either
+                break
+            rows = np.concatenate(
+                [
+                    np.arange(self.leaf_offsets[leaf], self.leaf_offsets[leaf + 1])
+                    for leaf in leaves
+                ]
+            )
+            distances = ((self.features[rows] - q) ** 2).sum(axis=1)
+            candidates = np.concatenate([best_distances, distances])
+            candidate_rows = np.concatenate([best_rows, rows])
+            keep = np.argpartition(candidates, k - 1)[:k]
+            best_distances, best_rows = candidates[keep], candidate_rows[keep]
+        nearest = np.argsort(best_distances, kind="stable")
+        return best_distances[nearest], best_rows[nearest]
+
+    def query(self, X_scaled, k=5):
+        """(distances, positions) of the k nearest specimens per query, nearest first
+
+        Positions index this index's arrays; ``row_ids`` maps them to training rows.
+        """
+        Q = np.atleast_2d(np.asarray(X_scaled, dtype=np.float64))
+        k = min(k, len(self))
+        distances = np.empty((len(Q), k))
+        rows = np.empty((len(Q), k), dtype=np.int64)
+        chunk = max(1, BOUND_ELEMENTS // (self.n_leaves * Q.shape[1]))
+        for start in range(0, len(Q), chunk):
+            bounds = self._leaf_bounds(Q[start : start + chunk])
+            for i, (q, q_bounds) in enumerate(zip(Q[start : start + chunk], bounds)):
+                distances[start + i], rows[start + i] = self._search(q, q_bounds, k)
+        return np.sqrt(distances), rows
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        """Write the arrays as .npy files and a manifest, replacing any old index"""
+        staging = f"{path}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        manifest = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "rows": len(self),
+            "arrays": {},
+        }
+        for name in INDEX_ARRAYS:
+            array = getattr(self, name)
+            if array is None:
+                continue
+            np.save(
+                os.path.join(staging, f"{name}.npy"),
+                np.ascontiguousarray(array),
+                allow_pickle=False,
+            )
+            manifest["arrays"][name] = f"{name}.npy"
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(staging, path)
+        logger.info(
+            f"Neighbor index of {len(self)} specimens in {self.n_leaves} leaves "
+            f"saved to {path}"
+        )
+        return path
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH, mmap=True):
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported neighbor index format: {manifest.get('format_version')}"
+            )
+
+        arrays = {
+            name: np.load(
+                os.path.join(path, filename),
+                mmap_mode="r" if mmap else None,
+                allow_pickle=False,
+            )
+            for name, filename in manifest["arrays"].items()
+        }
+        if (
+            arrays["leaf_offsets"][-1] != manifest["rows"]
+            or len(arrays["features"]) != manifest["rows"]
+        ):
+            raise ValueError(
+                f"Neighbor index arrays in {path} do not match the manifest"
+            )
+        return cls(**arrays)
@@ -0,0 +1,510 @@
+"""
+Serving artifact: a JSON manifest plus raw .npy blobs, loaded by memory-mapping
+
+The artifact holds only numbers and names: scaler parameters, model parameters, class
+names and a probe used to check the round trip. Loading it executes no pickled code and
+does not depend on the scikit-learn version. The arrays are mapped read-only, so API
+workers on the same host share the page cache instead of each holding a copy.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+from src.models.bundle import (
+    DEFAULT_TARGET_NAMES,
+    PROBE_INPUT,
+    BundleValidationError,
+    ServingBundle,
+)
+from src.models.ood import OODScorer
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT_VERSION = 1
+DEFAULT_ARTIFACT_PATH = "models/serving_artifact"
+MANIFEST_NAME = "manifest.json"
+
+
+class UnsupportedModelError(ValueError):
+    """Raised when a model has no array representation in the artifact format"""
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _sigmoid(x):
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+class ArrayModel:
+    """Common predict/predict_proba surface of the array runtimes"""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = PROBE_INPUT.shape[1]
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class ArrayScaler:
+    """StandardScaler.transform from its mean and scale"""
+
+    def __init__(self, mean, scale):
+        self.mean = mean
+        self.scale = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+
+class LinearModel(ArrayModel):
+    """Multinomial or one-vs-rest logistic regression"""
+
+    def __init__(self, classes, coef, intercept, multinomial=True):
+        super().__init__(classes)
+        self.coef = coef
+        self.intercept = intercept
+        self.multinomial = multinomial
+
+    def decision_function(self, X):
+        return X @ self.coef.T + self.intercept
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        if scores.shape[1] == 1:
+            positive = _sigmoid(scores[:, 0])
+            return np.column_stack([1 - positive, positive])
+        if self.multinomial:
+            return _softmax(scores)
+        proba = _sigmoid(scores)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+
+class TreeEnsembleModel(ArrayModel):
+    """Averaged class distributions of flattened trees, evaluated level by level"""
+
+    def __init__(
+        self,
+        classes,
+        roots,
+        children_left,
+        children_right,
+        feature,
+        threshold,
+        value,
+        max_depth,
+    ):
+        super().__init__(classes)
+        self.roots = roots
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.max_depth = int(max_depth)
+
+    def predict_proba(self, X):
+        # Trees compare float32 features against their thresholds, as scikit-learn does
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        rows = np.arange(len(X))[None, :]
+        nodes = np.repeat(np.asarray(self.roots)[:, None], len(X), axis=1)
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            leaf = feature < 0
+            if leaf.all():
+                break
+            go_left = X[rows, np.where(leaf, 0, feature)] <= self.threshold[nodes]
+            nodes = np.where(
+                leaf,
+                nodes,
+                np.where(
+                    go_left, self.children_left[nodes], self.children_right[nodes]
+                ),
+            )
+        return self.value[nodes].mean(axis=0)
+
+
+class KernelSVCModel(ArrayModel):
+    """SVC decision function (one-vs-one, folded to one-vs-rest like scikit-learn)"""
+
+    def __init__(
+        self,
+        classes,
+        support_vectors,
+        dual_coef,
+        intercept,
+        n_support,
+        kernel="rbf",
+        gamma=1.0,
+        coef0=0.0,
+        degree=3,
+    ):
+        super().__init__(classes)
+        self.support_vectors = support_vectors
+        self.dual_coef = dual_coef
+        self.intercept = intercept
+        self.starts = np.concatenate([[0], np.cumsum(n_support)]).astype(int)
+        self.kernel = kernel
+        self.gamma = gamma
+        self.coef0 = coef0
+        self.degree = degree
+
+    def _kernel(self, X):
+        sv = self.support_vectors
+        if self.kernel == "rbf":
+            distances = (
+                (X * X).sum(axis=1)[:, None]
+                - 2 * X @ sv.T
+                + (sv * sv).sum(axis=1)[None, :]
+            )
+            return np.exp(-self.gamma * np.maximum(distances, 0))
+        dot = X @ sv.T
+        if self.kernel == "linear":
+            return dot
+        if self.kernel == "poly":
+            return (self.gamma * dot + self.coef0) ** self.degree
+        return np.tanh(self.gamma * dot + self.coef0)
+
+    def decision_function(self, X):
+        K = self._kernel(np.asarray(X, dtype=np.float64))
+        n_classes = len(self.classes_)
+        pairs = 0
+        votes = np.zeros((len(K), n_classes))
+        sum_of_confidences = np.zeros((len(K), n_classes))
+        for i in range(n_classes):
+            si = slice(self.starts[i], self.starts[i + 1])
+            for j in range(i + 1, n_classes):
+                sj = slice(self.starts[j], self.starts[j + 1])
+                dec = (
+                    K[:, si] @ self.dual_coef[j - 1, si]
+                    + K[:, sj] @ self.dual_coef[i, sj]
+                    + self.intercept[pairs]
+                )
+                sum_of_confidences[:, i] += dec
+                sum_of_confidences[:, j] -= dec
+                votes[dec >= 0, i] += 1
+                votes[dec < 0, j] += 1
+                pairs += 1
+        if n_classes == 2:
+            return dec
+        return votes + sum_of_confidences / (3 * (np.abs(sum_of_confidences) + 1))
+
+
+class CalibratedArrayModel(ArrayModel):
+    """Per-class sigmoid or isotonic calibration over a base runtime's scores"""
+
+    def __init__(self, classes, base, method, params, base_output):
+        super().__init__(classes)
+        self.base = base
+        self.method = method
+        self.params = params
+        self.base_output = base_output
+
+    def predict_proba(self, X):
+        if self.base_output == "proba":
+            scores = self.base.predict_proba(X)
+        else:
+            scores = self.base.decision_function(X)
+            if scores.ndim == 1:
+                scores = np.column_stack([-scores, scores])
+
+        if self.method == "sigmoid":
+            a, b = self.params["a"], self.params["b"]
+            proba = _sigmoid(-(scores * a + b))
+        else:
+            proba = np.column_stack(
+                [
+                    np.interp(
+                        scores[:, i], self.params[f"x_{i}"], self.params[f"y_{i}"]
+                    )
+                    for i in range(scores.shape[1])
+                ]
+            )
+        totals = proba.sum(axis=1, keepdims=True)
+        return np.divide(
+            proba,
+            totals,
+            out=np.full_like(proba, 1.0 / proba.shape[1]),
+            where=totals > 0,
+        )
+
+
+def _flatten_trees(trees, n_classes):
+    """Concatenate fitted sklearn trees into global node arrays"""
+    roots, left, right, feature, threshold, value = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for tree in trees:
+        t = tree.tree_
+        leaf = t.children_left < 0
+        roots.append(offset)
+        left.append(np.where(leaf, -1, t.children_left + offset))
+        right.append(np.where(leaf, -1, t.children_right + offset))
+        feature.append(np.where(leaf, -1, t.feature))
+        threshold.append(t.threshold)
+        node_value = t.value[:, 0, :n_classes].astype(np.float64)
+        value.append(
+            node_value / np.maximum(node_value.sum(axis=1, keepdims=True), 1e-300)
+        )
+        offset += t.node_count
+        max_depth = max(max_depth, t.max_depth)
+    return {
+        "roots": np.asarray(roots, dtype=np.int64),
+        "children_left": np.concatenate(left).astype(np.int64),
+        "children_right": np.concatenate(right).astype(np.int64),
+        "feature": np.concatenate(feature).astype(np.int64),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value),
+    }, {"max_depth": max_depth}
+
+
+def _describe_model(model):
+    """(kind, arrays, params, children) of a fitted model, or UnsupportedModelError"""
+    from src.models.calibration import CalibratedModel
+
+    name = type(model).__name__
+    classes = np.asarray(model.classes_)
+    if isinstance(model, CalibratedModel):
+        # Mirrors uncalibrated_scores: SVC without probability=True exposes no
+        # predict_proba
+        base_output = (
+            "proba" if hasattr(model.estimator, "predict_proba") else "decision"
+        )
+        arrays, params = {}, {"method": model.method, "base_output": base_output}
+        if model.method == "sigmoid":
+            arrays["a"] = np.array([calibrator[0] for calibrator in model.calibrators_])
+            arrays["b"] = np.array([calibrator[1] for calibrator in model.calibrators_])
+        else:
+            for i, calibrator in enumerate(model.calibrators_):
+                arrays[f"x_{i}"] = np.asarray(
+                    calibrator.X_thresholds_, dtype=np.float64
+                )
+                arrays[f"y_{i}"] = np.asarray(
+                    calibrator.y_thresholds_, dtype=np.float64
+                )
+        return "calibrated", classes, arrays, params, {"base": model.estimator}
+
+    if name == "LogisticRegression":
+        multinomial = not (
+            getattr(model, "multi_class", "auto") == "ovr"
+            or model.solver == "liblinear"
+        )
+        return (
+            "linear",
+            classes,
+            {"coef": model.coef_, "intercept": model.intercept_},
+            {"multinomial": multinomial},
+            {},
+        )
+
+    if name in (
+        "RandomForestClassifier",
+        "ExtraTreesClassifier",
+        "DecisionTreeClassifier",
+    ):
+        trees = model.estimators_ if hasattr(model, "estimators_") else [model]
+        arrays, params = _flatten_trees(trees, len(classes))
+        return "tree_ensemble", classes, arrays, params, {}
+
+    if name == "SVC":
+        if model.probability is True:
+            raise UnsupportedModelError(
+                "SVC probabilities come from libsvm's internal Platt scaling"
+            )
+        if model.kernel not in ("rbf", "linear", "poly", "sigmoid"):
+            raise UnsupportedModelError(f"SVC kernel '{model.kernel}' is not supported")
+        arrays = {
+            "support_vectors": model.support_vectors_,
+            "dual_coef": model.dual_coef_,
+            "intercept": model.intercept_,
+            "n_support": model.n_support_,
+        }
+        params = {
+            "kernel": model.kernel,
+            "gamma": float(model._gamma),
+            "coef0": float(model.coef0),
+            "degree": int(model.degree),
+        }
+        return "svc", classes, arrays, params, {}
+
+    raise UnsupportedModelError(f"No array representation for {name}")
+
+
+def _save_array(directory, filename, array, arrays_manifest):
+    array = np.ascontiguousarray(array)
+    np.save(os.path.join(directory, filename), array, allow_pickle=False)
+    arrays_manifest[filename] = {
+        "dtype": array.dtype.str,
+        "shape": list(array.shape),
+        "sha256": hashlib.sha256(array.tobytes()).hexdigest(),
+    }
+    return filename
+
+
+def _write_model(model, directory, prefix, arrays_manifest):
+    kind, classes, arrays, params, children = _describe_model(model)
+    node = {"kind": kind, "classes": classes.tolist(), "params": params, "arrays": {}}
+    for key, array in arrays.items():
+        node["arrays"][key] = _save_array(
+            directory, f"{prefix}{key}.npy", array, arrays_manifest
+        )
+    node["children"] = {
+        name: _write_model(child, directory, f"{prefix}{name}.", arrays_manifest)
+        for name, child in children.items()
+    }
+    return node
+
+
+def export_artifact(
+    model,
+    scaler,
+    target_names=None,
+    path=DEFAULT_ARTIFACT_PATH,
+    version=None,
+    metadata=None,
+    ood=None,
+):
+    """Write a model, StandardScaler and optional OODScorer as a manifest and .npy blobs
+
+    The artifact is written to a temporary directory and moved into place only after the
+    array runtime reproduces the model's probabilities on the probe input.
+    """
+    target_names = list(target_names or DEFAULT_TARGET_NAMES)
+    version = version or f"artifact-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    staging = f"{path}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    try:
+        arrays = {}
+        scale = (
+            scaler.scale_ if scaler.scale_ is not None else np.ones_like(scaler.mean_)
+        )
+        scaler_node = {
+            key: _save_array(
+                staging,
+                f"scaler.{key}.npy",
+                np.asarray(array, dtype=np.float64),
+                arrays,
+            )
+            for key, array in (("mean", scaler.mean_), ("scale", scale))
+        }
+        ood_node = None
+        if ood is not None:
+            ood_node = {"threshold": ood.threshold}
+            for key in ("whitening", "whitened_means"):
+                ood_node[key] = _save_array(
+                    staging, f"ood.{key}.npy", getattr(ood, key), arrays
+                )
+        model_node = _write_model(model, staging, "model.", arrays)
+        if model_node["kind"] == "svc":
+            raise UnsupportedModelError(
+                "An uncalibrated SVC has no probabilities to serve"
+            )
+
+        expected = model.predict_proba(scaler.transform(PROBE_INPUT))
+        manifest = {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "version": version,
+            "created_at": datetime.now().isoformat(),
+            "target_names": target_names,
+            "metadata": metadata or {},
+            "scaler": scaler_node,
+            "model": model_node,
+            "ood": ood_node,
+            "arrays": arrays,
+            "probe": {"input": PROBE_INPUT.tolist(), "proba": expected.tolist()},
+        }
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Refuse to publish an artifact whose runtime disagrees with the trained model
+        load_artifact(staging, verify=True)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    logger.info(f"Serving artifact {version} saved to {path}")
+    return path
+
+
+def _build_model(node, arrays):
+    kind, classes = node["kind"], node["classes"]
+    data = {key: arrays[filename] for key, filename in node["arrays"].items()}
+    params = node["params"]
+    if kind == "linear":
+        return LinearModel(
+            classes, data["coef"], data["intercept"], params["multinomial"]
+        )
+    if kind == "tree_ensemble":
+        return TreeEnsembleModel(classes, max_depth=params["max_depth"], **data)
+    if kind == "svc":
+        return KernelSVCModel(classes, **data, **params)
+    if kind == "calibrated":
+        base = _build_model(node["children"]["base"], arrays)
+        return CalibratedArrayModel(
+            classes, base, params["method"], data, params["base_output"]
+        )
+    raise BundleValidationError(f"Unknown model kind in artifact: {kind}")
+
+
+def load_artifact(path=DEFAULT_ARTIFACT_PATH, mmap=True, verify=False):
+    """Map an artifact's arrays and wrap them in a ServingBundle
+
+    ``verify`` also hashes every array against the manifest. The probe output is always
+    checked.
+    """
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise BundleValidationError(
+            f"Unsupported artifact format: {manifest.get('format_version')}"
+        )
+
+    arrays = {}
+    for filename, spec in manifest["arrays"].items():
+        array = np.load(
+            os.path.join(path, filename),
+            mmap_mode="r" if mmap else None,
+            allow_pickle=False,
+        )
+        if array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise BundleValidationError(f"Array {filename} does not match the manifest")
+        if (
+            verify
+            and hashlib.sha256(np.ascontiguousarray(array).tobytes()).hexdigest()
+            != spec["sha256"]
+        ):
+            raise BundleValidationError(f"Array {filename} failed its checksum")
+        arrays[filename] = array
+
+    scaler = ArrayScaler(
+        arrays[manifest["scaler"]["mean"]], arrays[manifest["scaler"]["scale"]]
+    )
+    ood = manifest.get("ood")
+    if ood is not None:
+        ood = OODScorer(
+            arrays[ood["whitening"]], arrays[ood["whitened_means"]], ood["threshold"]
+        )
+    bundle = ServingBundle(
+        _build_model(manifest["model"], arrays),
+        scaler,
+        manifest["target_names"],
+        version=manifest["version"],
+        metadata={**manifest["metadata"], "source": "artifact"},
+        ood=ood,
+    )
+    bundle.validate(expected_proba=np.asarray(manifest["probe"]["proba"]))
+    return bundle
@@ -0,0 +1,233 @@
+"""
+Offline bulk scoring: stream a CSV or .npy file through a process pool and write
+predictions and probabilities back out in input order
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.data.feature_io import FEATURE_MAX, FEATURE_MIN, is_header, parse_csv_rows
+from src.models.bundle import DEFAULT_BUNDLE_PATH, load_serving_bundle
+
+logger = logging.getLogger(__name__)
+
+INVALID_LABEL = "invalid"
+
+# Bundle loaded once per worker process by _init_worker
+_worker_bundle = None
+
+
+def _init_worker(bundle_path, model_path, scaler_path):
+    global _worker_bundle
+    _worker_bundle = load_serving_bundle(bundle_path, model_path, scaler_path)
+
+
+def encode_csv_rows(class_indices, proba, target_names, valid):
+    """CSV rows (no header) of prediction, probability and per-class probabilities"""
+    names = np.asarray(list(target_names) + [INVALID_LABEL], dtype=object)
+    labels = np.where(valid, class_indices, len(target_names))
+    confidence = np.full(len(labels), np.nan)
+    confidence[valid] = proba[valid, class_indices[valid]]
+
+    rows = np.empty((len(labels), proba.shape[1] + 2), dtype=object)
+    rows[:, 0] = names[labels]
+    rows[:, 1] = confidence
+    rows[:, 2:] = proba
+    text = io.StringIO()
+    np.savetxt(text, rows, delimiter=",", fmt=["%s"] + ["%.10g"] * (proba.shape[1] + 1))
+    return text.getvalue().encode()
+
+
+def score_matrix(bundle, X):
+    """Score rows that pass the API bounds; invalid rows get NaN probabilities"""
+    # NaN fails both comparisons, so this also rejects non-finite rows
+    valid = ((X >= FEATURE_MIN) & (X <= FEATURE_MAX)).all(axis=1)
+
+    class_indices = np.zeros(len(X), dtype=np.int64)
+    proba = np.full((len(X), len(bundle.target_names)), np.nan)
+    if valid.any():
+        class_indices[valid], proba[valid] = bundle.predict(X[valid])
+    return class_indices, proba, valid
+
+
+def score_chunk(chunk):
+    """Parse, score and encode one chunk; returns (rows, invalid rows, CSV bytes)"""
+    kind, data = chunk
+    # A malformed CSV line becomes an invalid row rather than failing the whole run
+    X = parse_csv_rows(data) if kind == "csv" else np.asarray(data, dtype=np.float64)
+    class_indices, proba, valid = score_matrix(_worker_bundle, X)
+    return (
+        len(X),
+        int((~valid).sum()),
+        encode_csv_rows(class_indices, proba, _worker_bundle.target_names, valid),
+    )
+
+
+def iter_csv_chunks(path, chunk_bytes):
+    """Byte chunks split on line boundaries, each prefixed with the header if any"""
+    with open(path, "rb") as f:
+        first_line = f.readline()
+        header = first_line if is_header(first_line.decode("utf-8", "replace")) else b""
+        pending = b"" if header else first_line
+
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                break
+            data = pending + data + f.readline()
+            pending = b""
+            yield "csv", header + data
+        if pending.strip():
+            yield "csv", header + pending
+
+
+def iter_npy_chunks(path, chunk_rows):
+    """Row blocks of a memory-mapped (n, 4) .npy file"""
+    X = np.load(path, mmap_mode="r")
+    for start in range(0, X.shape[0], chunk_rows):
+        yield "npy", np.array(X[start : start + chunk_rows])
+
+
+class BulkScorer:
+    """Score a file in chunks across worker processes with bounded in-flight work"""
+
+    def __init__(
+        self,
+        workers=None,
+        chunk_bytes=4 * 1024 * 1024,
+        chunk_rows=100000,
+        max_pending=None,
+        bundle_path=DEFAULT_BUNDLE_PATH,
+        model_path="models/best_model_model.pkl",
+        scaler_path="data/scaler.pkl",
+        progress_interval=10.0,
+    ):
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.chunk_bytes = chunk_bytes
+        self.chunk_rows = chunk_rows
+        self.max_pending = max_pending or 2 * max(self.workers, 1)
+        self.model_paths = (bundle_path, model_path, scaler_path)
+        self.progress_interval = progress_interval
+
+    def iter_chunks(self, input_path):
+        if input_path.endswith(".npy"):
+            return iter_npy_chunks(input_path, self.chunk_rows)
+        return iter_csv_chunks(input_path, self.chunk_bytes)
+
+    def _results(self, chunks):
+        """Chunk results in input order, never holding more than max_pending chunks"""
+        if self.workers <= 1:
+            if _worker_bundle is None:
+                _init_worker(*self.model_paths)
+            for chunk in chunks:
+                yield score_chunk(chunk)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=self.model_paths,
+        ) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(score_chunk, chunk))
+                if len(pending) >= self.max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def score_file(self, input_path, output_path):
+        """Score input_path into output_path as CSV; returns a run summary"""
+        start = time.perf_counter()
+        last_report = start
+        rows = invalid = 0
+
+        if _worker_bundle is None:
+            _init_worker(*self.model_paths)
+        target_names = _worker_bundle.target_names
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "wb") as out:
+            out.write(
+                (
+                    "prediction,probability,"
+                    + ",".join(f"probability_{name}" for name in target_names)
+                    + "\n"
+                ).encode()
+            )
+
+            for chunk_rows, chunk_invalid, body in self._results(
+                self.iter_chunks(input_path)
+            ):
+                out.write(body)
+                rows += chunk_rows
+                invalid += chunk_invalid
+
+                now = time.perf_counter()
+                if now - last_report >= self.progress_interval:
+                    logger.info(
+                        f"Scored {rows:,} rows ({rows / (now - start):,.0f} rows/s)"
+                    )
+                    last_report = now
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            "rows": rows,
+            "invalid_rows": invalid,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else None,
+            "workers": self.workers,
+            "model_version": _worker_bundle.version,
+        }
+        logger.info(f"Bulk scoring completed: {summary}")
+        return summary
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description="Bulk-score a CSV or .npy file of Iris measurements"
+    )
+    parser.add_argument(
+        "input", help="Input .csv (optional header) or .npy (n, 4) file"
+    )
+    parser.add_argument("output", help="Output CSV of predictions and probabilities")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--chunk-mb", type=float, default=4.0, help="CSV chunk size in MB"
+    )
+    parser.add_argument(
+        "--chunk-rows", type=int, default=100000, help=".npy chunk size in rows"
+    )
+    parser.add_argument(
+        "--bundle", default=DEFAULT_BUNDLE_PATH, help="Serving bundle path"
+    )
+    args = parser.parse_args()
+
+    scorer = BulkScorer(
+        workers=args.workers,
+        chunk_bytes=int(args.chunk_mb * 1024 * 1024),
+        chunk_rows=args.chunk_rows,
+        bundle_path=args.bundle,
+    )
+    scorer.score_file(args.input, args.output)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
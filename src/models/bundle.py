@@ -0,0 +1,225 @@
+"""
+Serving bundle: model, scaler and class names packaged in a single artifact
+"""
+
+import os
+import logging
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from src.models.ood import DEFAULT_OOD_PATH, OODScorer
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT_VERSION = 1
+DEFAULT_BUNDLE_PATH = "models/serving_bundle.joblib"
+DEFAULT_TARGET_NAMES = ["setosa", "versicolor", "virginica"]
+
+# Representative input used to validate a bundle at export and load time
+PROBE_INPUT = np.array(
+    [
+        [5.1, 3.5, 1.4, 0.2],
+        [6.2, 2.9, 4.3, 1.3],
+        [6.9, 3.1, 5.4, 2.1],
+    ]
+)
+N_FEATURES = PROBE_INPUT.shape[1]
+
+
+class BundleValidationError(Exception):
+    """Raised when a serving bundle fails validation"""
+
+
+class ServingBundle:
+    """Model, scaler and class names loaded together for inference"""
+
+    def __init__(
+        self,
+        model,
+        scaler,
+        target_names=None,
+        version="unversioned",
+        metadata=None,
+        ood=None,
+    ):
+        self.model = model
+        self.scaler = scaler
+        self.target_names = list(target_names or DEFAULT_TARGET_NAMES)
+        self.version = version
+        self.metadata = metadata or {}
+        # Optional OODScorer over the scaled features
+        self.ood = ood
+
+    def transform(self, X):
+        """Scale raw feature rows"""
+        return self.scaler.transform(X)
+
+    def predict_proba(self, X):
+        """Class probabilities for raw (unscaled) feature rows"""
+        return self.model.predict_proba(self.transform(X))
+
+    def predict(self, X):
+        """Predicted class indices and probabilities for raw feature rows"""
+        X_scaled = self.transform(X)
+        return self.model.predict(X_scaled), self.model.predict_proba(X_scaled)
+
+    def ood_scores(self, X):
+        """OOD distance for raw feature rows, or None without a scorer"""
+        if self.ood is None:
+            return None
+        return self.ood.score(self.transform(X))
+
+    def validate(self, expected_proba=None):
+        """Check the bundle is internally consistent and reproduces its probe output"""
+        n_features = getattr(self.model, "n_features_in_", N_FEATURES)
+        if n_features != N_FEATURES:
+            raise BundleValidationError(
+                f"Model expects {n_features} features, bundle serves {N_FEATURES}"
+            )
+
+        classes = getattr(self.model, "classes_", None)
+        if classes is not None and len(classes) != len(self.target_names):
+            raise BundleValidationError(
+                f"Model has {len(classes)} classes "
+                f"but {len(self.target_names)} target names"
+            )
+
+        proba = self.predict_proba(PROBE_INPUT)
+        if not np.allclose(proba.sum(axis=1), 1.0, atol=1e-6):
+            raise BundleValidationError("Probe probabilities do not sum to 1")
+        if expected_proba is not None and not np.allclose(
+            proba, expected_proba, atol=1e-6
+        ):
+            raise BundleValidationError(
+                "Probe output differs from the output recorded at export"
+            )
+
+        return proba
+
+    def save(self, path=DEFAULT_BUNDLE_PATH):
+        """Validate and write the bundle as a single file"""
+        probe_proba = self.validate()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump(
+            {
+                "format_version": BUNDLE_FORMAT_VERSION,
+                "model": self.model,
+                "scaler": self.scaler,
+                "target_names": self.target_names,
+                "version": self.version,
+                "metadata": self.metadata,
+                "probe_proba": probe_proba,
+                "ood": None if self.ood is None else self.ood.to_arrays(),
+            },
+            path,
+        )
+        logger.info(f"Serving bundle {self.version} saved to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path=DEFAULT_BUNDLE_PATH, validate=True):
+        """Load a bundle with a single read and re-check its probe output"""
+        payload = joblib.load(path)
+        if payload.get("format_version") != BUNDLE_FORMAT_VERSION:
+            raise BundleValidationError(
+                f"Unsupported bundle format: {payload.get('format_version')}"
+            )
+
+        ood = payload.get("ood")
+        bundle = cls(
+            payload["model"],
+            payload["scaler"],
+            payload["target_names"],
+            version=payload["version"],
+            metadata=payload["metadata"],
+            ood=None if ood is None else OODScorer.from_arrays(ood),
+        )
+        if validate:
+            bundle.validate(expected_proba=payload["probe_proba"])
+        return bundle
+
+    @classmethod
+    def from_legacy(
+        cls,
+        model_path="models/best_model_model.pkl",
+        scaler_path="data/scaler.pkl",
+        target_names=None,
+    ):
+        """Assemble a bundle from the separate model and scaler pickles"""
+        model = joblib.load(model_path)
+        scaler = joblib.load(scaler_path)
+        version = f"legacy-{int(os.path.getmtime(model_path))}"
+        return cls(
+            model, scaler, target_names, version=version, metadata={"source": "legacy"}
+        )
+
+
+def load_serving_bundle(
+    bundle_path=DEFAULT_BUNDLE_PATH,
+    model_path="models/best_model_model.pkl",
+    scaler_path="data/scaler.pkl",
+    target_names=None,
+    artifact_path="models/serving_artifact",
+    ood_path=DEFAULT_OOD_PATH,
+):
+    """Load the mmapped serving artifact, else the bundle, else the separate pickles
+
+    Bundles saved without an OOD scorer pick up the one stored next to the model, if
+    any.
+    """
+    bundle = _load_serving_bundle(
+        bundle_path, model_path, scaler_path, target_names, artifact_path
+    )
+    if bundle.ood is None and ood_path and os.path.exists(ood_path):
+        bundle.ood = OODScorer.load(ood_path)
+    return bundle
+
+
+def _load_serving_bundle(
+    bundle_path, model_path, scaler_path, target_names, artifact_path
+):
+    if artifact_path and os.path.exists(os.path.join(artifact_path, "manifest.json")):
+        from src.models.artifact import load_artifact
+
+        try:
+            return load_artifact(artifact_path)
+        except Exception as e:
+            logger.error(
+                f"Error loading serving artifact, falling back to the bundle: {str(e)}"
+            )
+    if os.path.exists(bundle_path):
+        return ServingBundle.load(bundle_path)
+    if os.path.exists(model_path) and os.path.exists(scaler_path):
+        return ServingBundle.from_legacy(model_path, scaler_path, target_names)
+    raise FileNotFoundError(
+        f"Model or scaler files not found: {bundle_path}, {model_path}, {scaler_path}"
+    )
+
+
+def export_bundle(
+    model, scaler, model_type, target_names=None, path=DEFAULT_BUNDLE_PATH, ood=None
+):
+    """Build, validate and save a serving bundle for a trained model"""
+    version = f"{model_type}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    bundle = ServingBundle(
+        model,
+        scaler,
+        target_names,
+        version=version,
+        metadata={"model_type": model_type, "created_at": datetime.now().isoformat()},
+        ood=ood,
+    )
+    return bundle.save(path)
+
+
+def main():
+    """Build a serving bundle from the existing model and scaler pickles"""
+    bundle = ServingBundle.from_legacy()
+    bundle.save()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
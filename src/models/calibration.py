@@ -0,0 +1,183 @@
+"""
+Post-hoc probability calibration on a held-out split
+"""
+
+import numpy as np
+from scipy.special import expit
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.isotonic import IsotonicRegression
+from sklearn.model_selection import StratifiedKFold
+
+CALIBRATION_METHODS = ("sigmoid", "isotonic")
+
+
+def expected_calibration_error(y_true, proba, n_bins=15):
+    """Top-label ECE: |accuracy - confidence| per confidence bin, weighted by size"""
+    y_true = np.asarray(y_true)
+    confidence = proba.max(axis=1)
+    correct = proba.argmax(axis=1) == y_true
+
+    bins = np.minimum((confidence * n_bins).astype(int), n_bins - 1)
+    counts = np.bincount(bins, minlength=n_bins)
+    confidence_sums = np.bincount(bins, weights=confidence, minlength=n_bins)
+    correct_sums = np.bincount(bins, weights=correct, minlength=n_bins)
+    filled = counts > 0
+    return float(
+        np.abs(correct_sums[filled] - confidence_sums[filled]).sum() / len(y_true)
+    )
+
+
+def fit_sigmoid(scores, target, max_iter=100, tol=1e-10):
+    """Platt scaling: (a, b) for P(y=1 | s) = 1 / (1 + exp(a * s + b))
+
+    Newton's method with backtracking on Platt's smoothed targets, which keep the fit
+    finite when the split is separable. Two parameters do not need a general solver.
+    """
+    n_pos = float(target.sum())
+    n_neg = len(target) - n_pos
+    t = np.where(target == 1, (n_pos + 1) / (n_pos + 2), 1 / (n_neg + 2))
+
+    def loss(a, b):
+        z = a * scores + b
+        # -[t log p + (1 - t) log(1 - p)] with p = expit(-z), written stably
+        return float((np.logaddexp(0, -z) + t * z).sum())
+
+    a, b = 0.0, float(np.log((n_neg + 1) / (n_pos + 1)))
+    current = loss(a, b)
+    for _ in range(max_iter):
+        p = expit(-(a * scores + b))
+        d = t - p
+        w = p * (1 - p)
+        g_a, g_b = float((d * scores).sum()), float(d.sum())
+        h_aa, h_ab, h_bb = (
+            float((w * scores * scores).sum()) + 1e-12,
+            float((w * scores).sum()),
+            float(w.sum()) + 1e-12,
+        )
+        det = h_aa * h_bb - h_ab * h_ab
+        if det <= 0:
+            break
+        step_a = (h_bb * g_a - h_ab * g_b) / det
+        step_b = (h_aa * g_b - h_ab * g_a) / det
+
+        scale = 1.0
+        while scale > 1e-8:
+            candidate = loss(a - scale * step_a, b - scale * step_b)
+            if candidate <= current:
+                break
+            scale /= 2
+        else:
+            break
+        a, b, current = a - scale * step_a, b - scale * step_b, candidate
+        if abs(scale * step_a) + abs(scale * step_b) < tol:
+            break
+    return a, b
+
+
+def uncalibrated_scores(estimator, X):
+    """Per-class scores of a fitted estimator: predict_proba, else decision_function"""
+    if hasattr(estimator, "predict_proba"):
+        try:
+            return estimator.predict_proba(X)
+        except AttributeError:
+            # SVC exposes predict_proba only when fitted with probability=True
+            pass
+    scores = estimator.decision_function(X)
+    if scores.ndim == 1:
+        scores = np.column_stack([-scores, scores])
+    return scores
+
+
+def has_probabilities(estimator):
+    """Whether a fitted estimator has its own predict_proba (not SVC without it)"""
+    return hasattr(estimator, "predict_proba") and getattr(
+        estimator, "probability", True
+    )
+
+
+def cross_validated_ece(estimator, X, y, method="sigmoid", n_splits=3):
+    """(uncalibrated, calibrated) ECE of a prefit estimator, out of fold on (X, y)
+
+    Calibrators are fitted on all but one fold and scored on the remaining one, so a
+    calibrator that only fits its own rows does not look better than it is.
+    """
+    y = np.asarray(y)
+    # Every fold needs each class, so small splits get fewer folds
+    n_splits = min(n_splits, int(np.unique(y, return_counts=True)[1].min()))
+    proba = uncalibrated_scores(estimator, X)
+    calibrated = np.empty_like(proba, dtype=np.float64)
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    for fit_index, eval_index in folds.split(X, y):
+        calibrator = CalibratedModel(estimator, method=method).fit(
+            X[fit_index], y[fit_index]
+        )
+        calibrated[eval_index] = calibrator.predict_proba(X[eval_index])
+    return (
+        expected_calibration_error(y, proba),
+        expected_calibration_error(y, calibrated),
+    )
+
+
+class CalibratedModel(ClassifierMixin, BaseEstimator):
+    """A prefit classifier with one-vs-rest calibrators fitted once on held-out data
+
+    Each class score from the base estimator is mapped through its own sigmoid (Platt)
+    or isotonic calibrator and the results are renormalized. ``predict`` is the argmax
+    of ``predict_proba``, so the served class always matches the highest probability.
+    """
+
+    def __init__(self, estimator=None, method="sigmoid"):
+        self.estimator = estimator
+        self.method = method
+
+    def fit(self, X, y):
+        """Fit the calibrators on a held-out split; the estimator must be fitted"""
+        if self.method not in CALIBRATION_METHODS:
+            raise ValueError(
+                f"Unknown calibration method '{self.method}'; "
+                f"use one of {CALIBRATION_METHODS}"
+            )
+
+        y = np.asarray(y)
+        self.classes_ = self.estimator.classes_
+        self.n_features_in_ = getattr(self.estimator, "n_features_in_", X.shape[1])
+        scores = uncalibrated_scores(self.estimator, X)
+
+        self.calibrators_ = []
+        for i, label in enumerate(self.classes_):
+            target = (y == label).astype(int)
+            column = scores[:, i]
+            if self.method == "isotonic":
+                calibrator = IsotonicRegression(
+                    y_min=0.0, y_max=1.0, out_of_bounds="clip"
+                ).fit(column, target)
+            else:
+                calibrator = fit_sigmoid(column, target)
+            self.calibrators_.append(calibrator)
+        return self
+
+    def _calibrate_column(self, calibrator, column):
+        if isinstance(calibrator, IsotonicRegression):
+            return calibrator.predict(column)
+        a, b = calibrator
+        return expit(-(a * column + b))
+
+    def predict_proba(self, X):
+        scores = uncalibrated_scores(self.estimator, X)
+        proba = np.column_stack(
+            [
+                self._calibrate_column(calibrator, scores[:, i])
+                for i, calibrator in enumerate(self.calibrators_)
+            ]
+        )
+        totals = proba.sum(axis=1, keepdims=True)
+        # Rows where every calibrator says 0 fall back to uniform
+        return np.divide(
+            proba,
+            totals,
+            out=np.full_like(proba, 1.0 / proba.shape[1]),
+            where=totals > 0,
+        )
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
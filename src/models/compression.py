@@ -0,0 +1,125 @@
+"""
+Post-training compression of tree ensembles: greedy tree subsets and distillation into
+small students
+"""
+
+import copy
+import io
+import logging
+
+import joblib
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+logger = logging.getLogger(__name__)
+
+SUBSET_SIZES = (1, 2, 3, 5, 10, 20, 50)
+STUDENT_DEPTHS = (2, 3, 4, 6)
+
+
+def is_tree_ensemble(model):
+    return hasattr(model, "estimators_") and hasattr(model, "n_estimators")
+
+
+def serialized_size(model):
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.getbuffer().nbytes
+
+
+def greedy_tree_order(forest, X, y):
+    """Trees in greedy forward-selection order by (X, y) accuracy of their average"""
+    tree_proba = np.stack([tree.predict_proba(X) for tree in forest.estimators_])
+    # Sub-estimators predict encoded class indices
+    y_index = np.searchsorted(forest.classes_, y)
+
+    order, remaining = [], list(range(len(tree_proba)))
+    total = np.zeros(tree_proba.shape[1:])
+    while remaining:
+        # Ensemble accuracy with each remaining tree added; ties go to lower mean loss
+        candidates = total[None] + tree_proba[remaining]
+        accuracy = (candidates.argmax(axis=2) == y_index).mean(axis=1)
+        confidence = candidates[:, np.arange(len(y_index)), y_index].mean(axis=1)
+        best = int(np.lexsort((-confidence, -accuracy))[0])
+        tree = remaining.pop(best)
+        order.append(tree)
+        total += tree_proba[tree]
+    return order
+
+
+def forest_subset(forest, tree_indices):
+    """Copy of a fitted forest keeping only the given trees"""
+    subset = copy.copy(forest)
+    subset.estimators_ = [forest.estimators_[i] for i in tree_indices]
+    subset.n_estimators = len(subset.estimators_)
+    return subset
+
+
+def distill_tree(teacher, X, max_depth, n_augment=10, noise_scale=0.1, random_state=42):
+    """Small decision tree fit on the teacher's labels for X and jittered copies of X"""
+    rng = np.random.default_rng(random_state)
+    scale = X.std(axis=0) * noise_scale
+    X_augmented = np.vstack(
+        [X] + [X + rng.normal(size=X.shape) * scale for _ in range(n_augment)]
+    )
+    student = DecisionTreeClassifier(max_depth=max_depth, random_state=random_state)
+    return student.fit(X_augmented, teacher.predict(X_augmented))
+
+
+def compression_candidates(forest, X_train, y_train):
+    """(method, model) pairs, cheapest first"""
+    candidates = [
+        (f"distilled_tree_depth_{depth}", distill_tree(forest, X_train, depth))
+        for depth in STUDENT_DEPTHS
+    ]
+    order = greedy_tree_order(forest, X_train, y_train)
+    candidates += [
+        (f"tree_subset_{size}", forest_subset(forest, order[:size]))
+        for size in SUBSET_SIZES
+        if size < forest.n_estimators
+    ]
+    return candidates
+
+
+def compress_ensemble(forest, X_train, y_train, X_test, y_test, max_accuracy_loss=0.01):
+    """Smallest candidate with test accuracy within max_accuracy_loss of the forest's
+
+    Candidates are built from the training data only; the test split is used just to
+    accept or reject them. Returns (model, report); the model is the original forest
+    when nothing qualifies.
+    """
+    baseline_accuracy = float((forest.predict(X_test) == y_test).mean())
+    baseline_size = serialized_size(forest)
+    report = {
+        "method": "none",
+        "baseline_accuracy": baseline_accuracy,
+        "baseline_size_bytes": baseline_size,
+        "accuracy": baseline_accuracy,
+        "size_bytes": baseline_size,
+        "max_accuracy_loss": max_accuracy_loss,
+    }
+
+    sized = sorted(
+        (
+            (serialized_size(model), method, model)
+            for method, model in compression_candidates(forest, X_train, y_train)
+        ),
+        key=lambda candidate: candidate[0],
+    )
+    for size, method, model in sized:
+        if size >= baseline_size:
+            break
+        accuracy = float((model.predict(X_test) == y_test).mean())
+        if accuracy >= baseline_accuracy - max_accuracy_loss:
+            report.update(method=method, accuracy=accuracy, size_bytes=size)
+            logger.info(
+                f"Compressed ensemble with {method}: "
+                f"{baseline_size:,} -> {size:,} bytes, "
+                f"accuracy {baseline_accuracy:.4f} -> {accuracy:.4f}"
+            )
+            return model, report
+
+    logger.info(
+        "No compressed candidate within the accuracy budget; keeping the full ensemble"
+    )
+    return forest, report
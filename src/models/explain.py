@@ -0,0 +1,249 @@
+"""
+Per-prediction explanations: per-feature contributions to each class score, vectorized
+over a batch
+
+Every explainer works on scaled features and returns ``(base_values, contributions)``
+with shapes (n, n_classes) and (n, n_classes, n_features), such that base value plus
+summed contributions is the explained output for each class:
+
+- linear: exact contributions ``coef * (x - mean)`` to the logistic regression's logits
+- tree_path: per-split changes in class distribution along each tree's decision path,
+  averaged over the forest (its uncalibrated probabilities)
+- shapley: exact interventional Shapley values of the served probabilities against a
+  background sample, enumerating all feature coalitions (any model with predict_proba)
+"""
+
+import logging
+from math import factorial
+
+import numpy as np
+
+from src.models.artifact import LinearModel, TreeEnsembleModel, _flatten_trees
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKGROUND_SIZE = 32
+MAX_SHAPLEY_FEATURES = 10
+# Rows passed to predict_proba per call when evaluating coalitions
+SHAPLEY_CHUNK_ROWS = 1 << 16
+
+
+def _base_model(model):
+    """The estimator under a calibration wrapper, or the model itself"""
+    from src.models.calibration import CalibratedModel
+    from src.models.artifact import CalibratedArrayModel
+
+    if isinstance(model, CalibratedModel):
+        return model.estimator
+    if isinstance(model, CalibratedArrayModel):
+        return model.base
+    return model
+
+
+class LinearExplainer:
+    """Exact logit contributions of a multinomial or one-vs-rest logistic regression"""
+
+    method = "linear"
+
+    def __init__(self, coef, intercept, background_mean):
+        coef = np.asarray(coef, dtype=np.float64)
+        intercept = np.asarray(intercept, dtype=np.float64)
+        if coef.shape[0] == 1:
+            # Binary models score the positive class only; the negative class mirrors it
+            coef, intercept = np.vstack([-coef, coef]), np.concatenate(
+                [-intercept, intercept]
+            )
+        self.coef = coef
+        self.mean = background_mean
+        self.base_values = intercept + coef @ background_mean
+        self.output = "logit"
+
+    def explain(self, X):
+        contributions = self.coef[None, :, :] * (X - self.mean)[:, None, :]
+        return (
+            np.broadcast_to(self.base_values, (len(X), len(self.base_values))),
+            contributions,
+        )
+
+
+class TreePathExplainer:
+    """Decision-path attributions for tree ensembles, walking all trees level by level
+
+    Each split charges the change in the node's class distribution to the feature it
+    tested. Node values, parents' features and the root distribution are fixed per
+    model.
+    """
+
+    method = "tree_path"
+
+    def __init__(self, trees, n_features, output="probability"):
+        self.trees = trees
+        self.n_features = n_features
+        self.output = output
+        self.base_value = trees.value[trees.roots].mean(axis=0)
+
+    def explain(self, X):
+        trees = self.trees
+        # Trees compare float32 features against their thresholds, as scikit-learn does
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        rows = np.arange(len(X))[None, :]
+        nodes = np.repeat(np.asarray(trees.roots)[:, None], len(X), axis=1)
+        contributions = np.zeros((len(X), self.n_features, trees.value.shape[1]))
+        for _ in range(trees.max_depth):
+            feature = trees.feature[nodes]
+            leaf = feature < 0
+            if leaf.all():
+                break
+            go_left = X[rows, np.where(leaf, 0, feature)] <= trees.threshold[nodes]
+            children = np.where(
+                leaf,
+                nodes,
+                np.where(
+                    go_left, trees.children_left[nodes], trees.children_right[nodes]
+                ),
+            )
+            delta = trees.value[children] - trees.value[nodes]
+            for j in range(self.n_features):
+                contributions[:, j, :] += (delta * (feature == j)[:, :, None]).sum(
+                    axis=0
+                )
+            nodes = children
+        contributions /= len(trees.roots)
+        return (
+            np.broadcast_to(self.base_value, (len(X), len(self.base_value))),
+            contributions.transpose(0, 2, 1),
+        )
+
+
+class ShapleyExplainer:
+    """Exact Shapley values of ``predict_proba`` over all 2^d feature coalitions
+
+    The value of a coalition is the mean prediction with its features taken from the row
+    and the rest from each background row. Coalition masks, Shapley weights and the
+    background's mean prediction are fixed per model.
+    """
+
+    method = "shapley"
+    output = "probability"
+
+    def __init__(self, model, background):
+        self.model = model
+        self.background = np.asarray(background, dtype=np.float64)
+        n_features = self.background.shape[1]
+        if n_features > MAX_SHAPLEY_FEATURES:
+            raise ValueError(
+                f"Exact Shapley values over {n_features} features are too expensive"
+            )
+
+        coalitions = np.arange(2**n_features)
+        self.masks = ((coalitions[:, None] >> np.arange(n_features)) & 1).astype(bool)
+        sizes = self.masks.sum(axis=1)
+        weight = np.array(
+            [
+                factorial(s) * factorial(n_features - s - 1) / factorial(n_features)
+                for s in range(n_features)
+            ]
+        )
+        # phi_j = sum over S containing j of w(|S|-1) v(S)
+        #       - sum over S without j of w(|S|) v(S)
+        with_j = weight[np.maximum(sizes - 1, 0)]
+        without_j = -weight[np.minimum(sizes, n_features - 1)]
+        self.weights = np.where(self.masks.T, with_j[None, :], without_j[None, :])
+        self.base_value = model.predict_proba(self.background).mean(axis=0)
+
+    def _coalition_values(self, X):
+        """Mean prediction per (row, coalition): shape (n, 2^d, n_classes)
+
+        The empty coalition is the background's mean prediction and the full one is the
+        row's own prediction, so only the others are evaluated against the background.
+        """
+        masks, background = self.masks[1:-1], self.background
+        hybrid = np.where(
+            masks[None, :, None, :], X[:, None, None, :], background[None, None, :, :]
+        )
+        proba = self.model.predict_proba(hybrid.reshape(-1, X.shape[1]))
+        partial = proba.reshape(len(X), len(masks), len(background), -1).mean(axis=2)
+        empty = np.broadcast_to(self.base_value, (len(X), 1, len(self.base_value)))
+        return np.concatenate(
+            [empty, partial, self.model.predict_proba(X)[:, None, :]], axis=1
+        )
+
+    def explain(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        chunk = max(1, SHAPLEY_CHUNK_ROWS // (len(self.masks) * len(self.background)))
+        contributions = np.empty((len(X), len(self.base_value), X.shape[1]))
+        for start in range(0, len(X), chunk):
+            values = self._coalition_values(X[start : start + chunk])
+            contributions[start : start + chunk] = np.einsum(
+                "js,nsc->ncj", self.weights, values
+            )
+        return (
+            np.broadcast_to(self.base_value, (len(X), len(self.base_value))),
+            contributions,
+        )
+
+
+def build_explainer(model, background=None, n_features=None):
+    """Pick and precompute the explainer for a fitted sklearn or artifact-runtime model
+
+    ``background`` holds scaled training rows; without it the training mean (zero after
+    scaling) is the reference point.
+    """
+    if background is None:
+        n_features = n_features or getattr(model, "n_features_in_", None)
+        background = np.zeros((1, n_features))
+    background = np.asarray(background, dtype=np.float64)
+
+    base = _base_model(model)
+    output_suffix = "" if base is model else " (before calibration)"
+    name = type(base).__name__
+    if isinstance(base, LinearModel) or name == "LogisticRegression":
+        coef = base.coef if isinstance(base, LinearModel) else base.coef_
+        intercept = base.intercept if isinstance(base, LinearModel) else base.intercept_
+        explainer = LinearExplainer(coef, intercept, background.mean(axis=0))
+        explainer.output += output_suffix
+        return explainer
+    if isinstance(base, TreeEnsembleModel):
+        return TreePathExplainer(
+            base, background.shape[1], "probability" + output_suffix
+        )
+    if name in (
+        "RandomForestClassifier",
+        "ExtraTreesClassifier",
+        "DecisionTreeClassifier",
+    ):
+        trees = base.estimators_ if hasattr(base, "estimators_") else [base]
+        arrays, params = _flatten_trees(trees, len(base.classes_))
+        runtime = TreeEnsembleModel(
+            base.classes_, max_depth=params["max_depth"], **arrays
+        )
+        return TreePathExplainer(
+            runtime, background.shape[1], "probability" + output_suffix
+        )
+    return ShapleyExplainer(model, background)
+
+
+def sample_background(X, size=DEFAULT_BACKGROUND_SIZE, random_state=0):
+    """A fixed random subset of scaled training rows to explain against"""
+    X = np.asarray(X, dtype=np.float64)
+    if len(X) <= size:
+        return X
+    return X[
+        np.random.default_rng(random_state).choice(len(X), size=size, replace=False)
+    ]
+
+
+_explainers = {}
+
+
+def explainer_for(bundle, background=None):
+    """The explainer for a serving bundle, built once per model version"""
+    cached = _explainers.get(bundle.version)
+    if cached is not None and cached[0] is bundle.model:
+        return cached[1]
+    explainer = build_explainer(bundle.model, background)
+    # Only the serving version is kept; a reload replaces it
+    _explainers.clear()
+    _explainers[bundle.version] = (bundle.model, explainer)
+    logger.info(f"Built {explainer.method} explainer for model {bundle.version}")
+    return explainer
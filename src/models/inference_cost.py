@@ -0,0 +1,124 @@
+"""
+Inference cost of a trained model: serving latency, serialized size and memory footprint
+"""
+
+import io
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+
+SELECTION_POLICIES = ("accuracy", "accuracy_then_latency")
+
+
+def _percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def profile_inference(
+    model, X, single_rounds=200, batch_size=1000, batch_rounds=5, warmup=10
+):
+    """Measured cost of serving a model as the API does (predict plus predict_proba)
+
+    Single-row latency cycles through the rows of ``X``; batch latency scores
+    ``batch_size`` rows tiled from ``X``. Memory is what the unpickled model retains
+    once loaded, which is what each API worker pays; it is measured the same way whether
+    or not tracemalloc is already tracing.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    rows = [X[i : i + 1] for i in range(len(X))]
+
+    for row in rows[:warmup]:
+        model.predict(row)
+        model.predict_proba(row)
+
+    single = np.empty(single_rounds)
+    for i in range(single_rounds):
+        row = rows[i % len(rows)]
+        start = time.perf_counter()
+        model.predict(row)
+        model.predict_proba(row)
+        single[i] = time.perf_counter() - start
+
+    batch = np.resize(X, (batch_size, X.shape[1]))
+    batch_times = np.empty(batch_rounds)
+    for i in range(batch_rounds):
+        start = time.perf_counter()
+        model.predict(batch)
+        model.predict_proba(batch)
+        batch_times[i] = time.perf_counter() - start
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    serialized = buffer.getvalue()
+
+    # Under an outer trace (e.g. benchmarks/perf_regression.py) leave it running:
+    # stopping would discard it, and its peak covers more than this load, so only the
+    # retained delta is comparable
+    outer = tracemalloc.is_tracing()
+    if not outer:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        loaded = joblib.load(io.BytesIO(serialized))
+        retained = tracemalloc.get_traced_memory()[0] - before
+        del loaded
+    finally:
+        if not outer:
+            tracemalloc.stop()
+
+    return {
+        "latency_single_p50_ms": _percentile_ms(single, 50),
+        "latency_single_p99_ms": _percentile_ms(single, 99),
+        "latency_batch_ms": float(np.median(batch_times) * 1000),
+        "batch_rows_per_second": float(batch_size / np.median(batch_times)),
+        "model_size_bytes": len(serialized),
+        "model_memory_bytes": retained,
+    }
+
+
+def select_model(
+    results,
+    policy="accuracy_then_latency",
+    accuracy_epsilon=0.01,
+    latency_metric="latency_single_p99_ms",
+    latency_budget_ms=None,
+):
+    """Name of the model to serve from {name: {"metrics": ...}} results
+
+    ``accuracy`` picks the highest accuracy. ``accuracy_then_latency`` keeps every model
+    within ``accuracy_epsilon`` of the best accuracy and picks the lowest
+    ``latency_metric`` among them. With a ``latency_budget_ms`` models over budget are
+    dropped first, unless none fit.
+    """
+    if policy not in SELECTION_POLICIES:
+        raise ValueError(
+            f"Unknown selection policy '{policy}'; use one of {SELECTION_POLICIES}"
+        )
+
+    candidates = list(results)
+    if policy == "accuracy":
+        return max(candidates, key=lambda name: results[name]["metrics"]["accuracy"])
+
+    if latency_budget_ms is not None:
+        within_budget = [
+            name
+            for name in candidates
+            if results[name]["metrics"][latency_metric] <= latency_budget_ms
+        ]
+        candidates = within_budget or candidates
+
+    best_accuracy = max(results[name]["metrics"]["accuracy"] for name in candidates)
+    near_best = [
+        name
+        for name in candidates
+        if results[name]["metrics"]["accuracy"] >= best_accuracy - accuracy_epsilon
+    ]
+    return min(
+        near_best,
+        key=lambda name: (
+            results[name]["metrics"][latency_metric],
+            -results[name]["metrics"]["accuracy"],
+        ),
+    )
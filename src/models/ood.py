@@ -0,0 +1,78 @@
+"""
+Out-of-distribution scoring: Mahalanobis distance to the nearest class mean
+"""
+
+import logging
+import os
+
+import numpy as np
+from scipy.stats import chi2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OOD_PATH = "models/ood_scorer.npz"
+DEFAULT_OOD_QUANTILE = 0.999
+
+
+class OODScorer:
+    """Distance of each row to the closest class mean under the pooled class covariance
+
+    The covariance is whitened once at fit time, so scoring is one matrix product and a
+    reduction over classes: a few microseconds for a single row. Rows further than
+    ``threshold`` (the chi-square quantile for the feature count) are flagged.
+    """
+
+    def __init__(self, whitening, whitened_means, threshold):
+        self.whitening = whitening
+        self.whitened_means = whitened_means
+        self.threshold = float(threshold)
+
+    @classmethod
+    def fit(cls, X, y, quantile=DEFAULT_OOD_QUANTILE, ridge=1e-6):
+        """Fit on (scaled) training features and labels"""
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y)
+        classes = np.unique(y)
+        means = np.stack([X[y == label].mean(axis=0) for label in classes])
+        residuals = X - means[np.searchsorted(classes, y)]
+        covariance = residuals.T @ residuals / max(len(X) - len(classes), 1)
+        covariance += np.eye(X.shape[1]) * ridge * np.trace(covariance) / X.shape[1]
+
+        # W with W^T W = inv(covariance), so ||W (x - mu)|| is the Mahalanobis distance
+        whitening = np.linalg.inv(np.linalg.cholesky(covariance))
+        threshold = np.sqrt(chi2.ppf(quantile, df=X.shape[1]))
+        return cls(whitening, means @ whitening.T, threshold)
+
+    def score(self, X):
+        """Mahalanobis distance from each row to its nearest class mean"""
+        whitened = np.asarray(X, dtype=np.float64) @ self.whitening.T
+        distances = ((whitened[:, None, :] - self.whitened_means[None, :, :]) ** 2).sum(
+            axis=2
+        )
+        return np.sqrt(distances.min(axis=1))
+
+    def flags(self, scores):
+        return scores > self.threshold
+
+    def to_arrays(self):
+        """Plain arrays for the bundle, the serving artifact and the .npz file"""
+        return {
+            "whitening": self.whitening,
+            "whitened_means": self.whitened_means,
+            "threshold": np.array(self.threshold),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["whitening"], arrays["whitened_means"], arrays["threshold"])
+
+    def save(self, path=DEFAULT_OOD_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, **self.to_arrays())
+        logger.info(f"OOD scorer saved to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path=DEFAULT_OOD_PATH):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls.from_arrays({key: arrays[key] for key in arrays.files})
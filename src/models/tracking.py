@@ -0,0 +1,299 @@
+"""
+Buffered MLflow tracking: batched params and metrics, artifacts written on a background
+thread
+"""
+
+import functools
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import mlflow
+import mlflow.sklearn
+from mlflow import MlflowClient
+from mlflow.entities import Metric, Param
+from mlflow.utils.validation import MAX_METRICS_PER_BATCH, MAX_PARAMS_TAGS_PER_BATCH
+
+logger = logging.getLogger(__name__)
+
+# Where a queued model was logged; model_uri is what register_model takes
+ModelReference = namedtuple("ModelReference", ["run_id", "artifact_path", "model_uri"])
+
+
+def _foreground(method):
+    """Charge the time spent in a tracking call to the caller's thread"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.tracker.foreground_seconds += time.perf_counter() - start
+
+    return wrapper
+
+
+class TrackedRun:
+    """An MLflow run recorded in memory and written once the ``with`` block exits
+
+    Params and metrics are sent with ``log_batch``; models, dicts and files are logged
+    by the tracker's writer thread, so logged models must not be refitted afterwards.
+    """
+
+    def __init__(self, tracker, run_name):
+        self.tracker = tracker
+        self.run_name = run_name
+        self.run_id = None
+        self.start_time = int(time.time() * 1000)
+        self.end_time = None
+        self.status = "FINISHED"
+        self.params = {}
+        self.metrics = []
+        self.tasks = []
+        self.models = []
+
+    @_foreground
+    def log_param(self, key, value):
+        self.params[key] = str(value)
+
+    @_foreground
+    def log_params(self, params):
+        self.params.update((key, str(value)) for key, value in params.items())
+
+    @_foreground
+    def log_metric(self, key, value, step=0):
+        self.metrics.append(Metric(key, float(value), int(time.time() * 1000), step))
+
+    @_foreground
+    def log_metrics(self, metrics, step=0):
+        timestamp = int(time.time() * 1000)
+        self.metrics.extend(
+            Metric(key, float(value), timestamp, step) for key, value in metrics.items()
+        )
+
+    @_foreground
+    def log_dict(self, dictionary, artifact_file):
+        self.tasks.append(
+            lambda: self.tracker.client.log_dict(self.run_id, dictionary, artifact_file)
+        )
+
+    @_foreground
+    def log_artifact(self, local_path, artifact_path=None):
+        self.tasks.append(
+            lambda: self.tracker.client.log_artifact(
+                self.run_id, local_path, artifact_path
+            )
+        )
+
+    @_foreground
+    def log_artifacts(self, local_dir, artifact_path=None):
+        self.tasks.append(
+            lambda: self.tracker.client.log_artifacts(
+                self.run_id, local_dir, artifact_path
+            )
+        )
+
+    @_foreground
+    def log_model(self, model, name, **kwargs):
+        """Queue logging an sklearn-flavor model under ``name``
+
+        Returns a Future of its ModelReference. Takes ``mlflow.sklearn.save_model``
+        keywords plus ``registered_model_name``.
+        """
+        result = Future()
+
+        def task():
+            try:
+                result.set_result(
+                    self.tracker._log_model(self.run_id, model, name, **kwargs)
+                )
+            except Exception as e:
+                # Registrations waiting on this model fail rather than block
+                result.set_exception(e)
+                raise
+
+        self.tasks.append(task)
+        self.models.append(result)
+        return result
+
+    def __enter__(self):
+        return self
+
+    @_foreground
+    def __exit__(self, exc_type, exc, tb):
+        self.end_time = int(time.time() * 1000)
+        if exc_type is not None:
+            self.status = "FAILED"
+        self.tracker._submit(self.tracker._write_run, self)
+        return False
+
+
+class RunTracker:
+    """Writes MLflow runs on one background thread so training never waits on the store
+
+    The writer is a FIFO, so later jobs (e.g. registering a model logged by an earlier
+    run) see everything submitted before them. Inside ``quiet()`` the writer pauses
+    between steps, so latency measurements do not compete with it. pip requirements are
+    inferred for the first model only and reused: every model comes from this process's
+    environment, and the inference subprocess dominates ``log_model``.
+    ``asynchronous=False`` writes inline.
+    """
+
+    def __init__(self, experiment_name="iris_classification", asynchronous=True):
+        self.experiment_id = mlflow.set_experiment(experiment_name).experiment_id
+        self.client = MlflowClient()
+        self.asynchronous = asynchronous
+        self.executor = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="mlflow-writer")
+            if asynchronous
+            else None
+        )
+        self.pip_requirements = None
+        self._gate = threading.Condition()
+        self._quiet = 0
+        self._busy = False
+        self.foreground_seconds = 0.0
+        self.write_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.runs = 0
+        self.failures = 0
+
+    def start_run(self, run_name):
+        return TrackedRun(self, run_name)
+
+    def register_model(self, model_info, name):
+        """Register a model logged by an earlier run instead of serializing it again"""
+        start = time.perf_counter()
+        self._submit(self._register_model, model_info, name)
+        self.foreground_seconds += time.perf_counter() - start
+
+    @contextmanager
+    def quiet(self):
+        """Hold the writer while the block runs, after its current step finishes"""
+        start = time.perf_counter()
+        with self._gate:
+            self._quiet += 1
+            while self._busy:
+                self._gate.wait()
+        self.foreground_seconds += time.perf_counter() - start
+        try:
+            yield
+        finally:
+            with self._gate:
+                self._quiet -= 1
+                self._gate.notify_all()
+
+    def _step(self, fn, *args):
+        """Run one write on the writer thread once no quiet block is active"""
+        with self._gate:
+            while self._quiet and self.executor is not None:
+                self._gate.wait()
+            self._busy = True
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.write_seconds += time.perf_counter() - start
+            with self._gate:
+                self._busy = False
+                self._gate.notify_all()
+
+    def _submit(self, fn, *args):
+        if self.executor is None:
+            fn(*args)
+        else:
+            self.executor.submit(fn, *args)
+
+    def _write_run(self, run):
+        try:
+            self._step(self._create_run, run)
+        except Exception as e:
+            self.failures += 1
+            run.status = "FAILED"
+            logger.error(f"Error writing MLflow run {run.run_name}: {str(e)}")
+            for model_info in run.models:
+                model_info.set_exception(e)
+            run.tasks = []
+        for task in run.tasks:
+            try:
+                self._step(task)
+            except Exception as e:
+                self.failures += 1
+                run.status = "FAILED"
+                logger.error(
+                    f"Error logging artifact to MLflow run {run.run_name}: {str(e)}"
+                )
+        try:
+            if run.run_id is not None:
+                self._step(
+                    self.client.set_terminated, run.run_id, run.status, run.end_time
+                )
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error closing MLflow run {run.run_name}: {str(e)}")
+        self.runs += 1
+
+    def _create_run(self, run):
+        run.run_id = self.client.create_run(
+            self.experiment_id, start_time=run.start_time, run_name=run.run_name
+        ).info.run_id
+        params = [Param(key, value) for key, value in run.params.items()]
+        for i in range(0, len(params), MAX_PARAMS_TAGS_PER_BATCH):
+            self.client.log_batch(
+                run.run_id, params=params[i : i + MAX_PARAMS_TAGS_PER_BATCH]
+            )
+        for i in range(0, len(run.metrics), MAX_METRICS_PER_BATCH):
+            self.client.log_batch(
+                run.run_id, metrics=run.metrics[i : i + MAX_METRICS_PER_BATCH]
+            )
+
+    def _log_model(self, run_id, model, name, registered_model_name=None, **kwargs):
+        if self.pip_requirements is not None:
+            kwargs.setdefault("pip_requirements", self.pip_requirements)
+        # Saved locally and uploaded with the client instead of resuming the run through
+        # the fluent API: before MLflow 2.10 the active-run stack is process-wide, so a
+        # resumed run would leak into the caller's fluent runs
+        with tempfile.TemporaryDirectory() as local_dir:
+            model_dir = os.path.join(local_dir, name)
+            mlflow.sklearn.save_model(model, model_dir, **kwargs)
+            if self.pip_requirements is None:
+                with open(os.path.join(model_dir, "requirements.txt")) as f:
+                    self.pip_requirements = [line.strip() for line in f if line.strip()]
+            self.client.log_artifacts(run_id, model_dir, name)
+        reference = ModelReference(run_id, name, f"runs:/{run_id}/{name}")
+        if registered_model_name:
+            mlflow.register_model(reference.model_uri, registered_model_name)
+        return reference
+
+    def _register_model(self, model_info, name):
+        try:
+            model_uri = model_info.result().model_uri
+            self._step(mlflow.register_model, model_uri, name)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error registering model {name}: {str(e)}")
+
+    def close(self):
+        """Wait for pending writes; returns the tracking overhead timings"""
+        start = time.perf_counter()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        self.wait_seconds += time.perf_counter() - start
+        return self.overhead()
+
+    def overhead(self):
+        """Seconds tracking blocked training (calls, quiet, final wait) and wrote"""
+        return {
+            "tracking_foreground_seconds": self.foreground_seconds,
+            "tracking_wait_seconds": self.wait_seconds,
+            "tracking_blocking_seconds": self.foreground_seconds + self.wait_seconds,
+            "tracking_write_seconds": self.write_seconds,
+            "tracking_runs": self.runs,
+            "tracking_failures": self.failures,
+        }
@@ -1,6 +1,7 @@
 """
 Model training and experiment tracking with MLflow
 """
+
 import mlflow
 import mlflow.sklearn
 import numpy as np
@@ -8,118 +9,430 @@ import pandas as pd
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import (
+    accuracy_score,
+    precision_score,
+    recall_score,
+    f1_score,
+    classification_report,
+)
 import joblib
 import os
+import shutil
 import logging
 from datetime import datetime
 import sys
+import time
+import warnings
+
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.data.data_loader import IrisDataProcessor
+from src.models.artifact import UnsupportedModelError, export_artifact
+from src.models.bundle import BundleValidationError, export_bundle
+from src.models.calibration import (
+    CalibratedModel,
+    cross_validated_ece,
+    expected_calibration_error,
+    has_probabilities,
+    uncalibrated_scores,
+)
+from src.models.ood import OODScorer
+from src.models.inference_cost import profile_inference, select_model
+from src.models.compression import compress_ensemble, is_tree_ensemble
+from src.models.tracking import RunTracker
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Training rows used to compare SVC's internal calibration with held-out calibration
+CALIBRATION_REFERENCE_ROWS = 500
+
+
 class ModelTrainer:
     """Class to handle model training and MLflow tracking"""
-    
-    def __init__(self, experiment_name="iris_classification"):
+
+    def __init__(
+        self,
+        experiment_name="iris_classification",
+        calibration="sigmoid",
+        calibration_size=0.2,
+        selection_policy="accuracy_then_latency",
+        accuracy_epsilon=0.01,
+        latency_metric="latency_single_p99_ms",
+        latency_budget_ms=None,
+        max_compression_loss=0.01,
+        tracker=None,
+    ):
         self.experiment_name = experiment_name
+        # Largest test-accuracy drop accepted when compressing a tree-ensemble winner
+        self.max_compression_loss = max_compression_loss
+        # Best-model selection: see inference_cost.select_model
+        self.selection_policy = selection_policy
+        self.accuracy_epsilon = accuracy_epsilon
+        self.latency_metric = latency_metric
+        self.latency_budget_ms = latency_budget_ms
+        # With a calibration method every model is calibrated once on a held-out split
+        # (kept only where it lowers ECE), so SVC can skip its internal 5-fold Platt
+        # scaling
+        self.calibration = calibration
+        self.calibration_size = calibration_size
+        self.artifact_path = None
+        # ModelReference futures of the models train_model logged, to register them
+        # without logging them again
+        self.logged_models = {}
         self.models = {
             "logistic_regression": LogisticRegression(random_state=42, max_iter=1000),
             "random_forest": RandomForestClassifier(random_state=42, n_estimators=100),
-            "svm": SVC(random_state=42, probability=True)
+            "svm": SVC(random_state=42, probability=calibration is None),
         }
-        
-        # Setup MLflow
-        mlflow.set_experiment(experiment_name)
-        
+
+        # Setup MLflow; runs are buffered and written in the background
+        self.tracker = tracker or RunTracker(experiment_name)
+
     def evaluate_model(self, model, X_test, y_test):
         """Evaluate model and return metrics"""
         y_pred = model.predict(X_test)
-        
+
         metrics = {
             "accuracy": accuracy_score(y_test, y_pred),
-            "precision": precision_score(y_test, y_pred, average='weighted'),
-            "recall": recall_score(y_test, y_pred, average='weighted'),
-            "f1_score": f1_score(y_test, y_pred, average='weighted')
+            "precision": precision_score(y_test, y_pred, average="weighted"),
+            "recall": recall_score(y_test, y_pred, average="weighted"),
+            "f1_score": f1_score(y_test, y_pred, average="weighted"),
         }
-        
+
         return metrics, y_pred
-    
+
+    def calibration_split(self, X_train, y_train):
+        """(X_fit, X_cal, y_fit, y_cal): the same held-out split for every model"""
+        return train_test_split(
+            X_train,
+            y_train,
+            test_size=self.calibration_size,
+            stratify=y_train,
+            random_state=42,
+        )
+
+    def calibrate_model(self, model, X_train, y_train):
+        """Fit on part of the training data, calibrate on the rest; (model, metrics)
+
+        A model with its own probabilities keeps them unless calibration lowers the
+        out-of-fold ECE on the calibration split: with a few dozen rows, Platt's
+        smoothed targets cap the calibrated probabilities near 0.9.
+        """
+        X_fit, X_cal, y_fit, y_cal = self.calibration_split(X_train, y_train)
+        start = time.perf_counter()
+        model.fit(X_fit, y_fit)
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        calibrated = CalibratedModel(model, method=self.calibration).fit(X_cal, y_cal)
+        metrics = {"fit_seconds": fit_seconds}
+        if has_probabilities(model):
+            ece_uncalibrated, ece_calibrated = cross_validated_ece(
+                model, X_cal, y_cal, method=self.calibration
+            )
+            metrics.update(
+                calibration_cv_ece_uncalibrated=ece_uncalibrated,
+                calibration_cv_ece=ece_calibrated,
+            )
+            if ece_calibrated >= ece_uncalibrated:
+                calibrated = model
+        metrics["calibration_seconds"] = time.perf_counter() - start
+        return calibrated, metrics
+
+    def calibration_savings(self, model, X_train, y_train):
+        """Time SVC's internal 5-fold calibration against one fit plus calibration
+
+        Both run on the same stratified subsample of at most CALIBRATION_REFERENCE_ROWS
+        rows, which keeps the reference cheap however large the training set is.
+        """
+        if len(X_train) > CALIBRATION_REFERENCE_ROWS:
+            X_train, _, y_train, _ = train_test_split(
+                X_train,
+                y_train,
+                train_size=CALIBRATION_REFERENCE_ROWS,
+                stratify=y_train,
+                random_state=42,
+            )
+        with warnings.catch_warnings():
+            # probability=True is deprecated in recent scikit-learn; it is the baseline
+            warnings.simplefilter("ignore", FutureWarning)
+            start = time.perf_counter()
+            clone(model).set_params(probability=True).fit(X_train, y_train)
+            internal_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        X_fit, X_cal, y_fit, y_cal = self.calibration_split(X_train, y_train)
+        CalibratedModel(clone(model).fit(X_fit, y_fit), method=self.calibration).fit(
+            X_cal, y_cal
+        )
+        held_out_seconds = time.perf_counter() - start
+        return {
+            "internal_calibration_fit_seconds": internal_seconds,
+            "held_out_calibration_fit_seconds": held_out_seconds,
+            "calibration_time_saved_seconds": internal_seconds - held_out_seconds,
+        }
+
     def train_model(self, model_name, X_train, y_train, X_test, y_test):
         """Train a single model with MLflow tracking"""
         logger.info(f"Training {model_name}")
-        
-        with mlflow.start_run(run_name=f"{model_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"):
+
+        with self.tracker.start_run(
+            f"{model_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        ) as run:
             # Get model
             model = self.models[model_name]
-            
+
             # Log parameters
-            mlflow.log_params(model.get_params())
-            
+            run.log_params(model.get_params())
+
             # Train model
-            model.fit(X_train, y_train)
-            
+            if self.calibration:
+                run.log_params(
+                    {
+                        "calibration_method": self.calibration,
+                        "calibration_size": self.calibration_size,
+                    }
+                )
+                base_model = model
+                model, calibration = self.calibrate_model(base_model, X_train, y_train)
+                run.log_metrics(calibration)
+                run.log_param("calibration_applied", model is not base_model)
+                if "probability" in base_model.get_params():
+                    # Training-time savings of replacing SVC's internal calibration
+                    with self.tracker.quiet():
+                        savings = self.calibration_savings(base_model, X_train, y_train)
+                    run.log_metrics(savings)
+                if model is base_model:
+                    logger.info(
+                        f"{model_name}: {self.calibration} calibration did not lower "
+                        "the held-out ECE; keeping the model's own probabilities"
+                    )
+            else:
+                base_model = model
+                start = time.perf_counter()
+                model.fit(X_train, y_train)
+                run.log_metric("fit_seconds", time.perf_counter() - start)
+
             # Evaluate model
             metrics, y_pred = self.evaluate_model(model, X_test, y_test)
-            
+            metrics["ece"] = expected_calibration_error(
+                y_test, model.predict_proba(X_test)
+            )
+            if self.calibration and has_probabilities(base_model):
+                metrics["ece_uncalibrated"] = expected_calibration_error(
+                    y_test, uncalibrated_scores(base_model, X_test)
+                )
+
+            # Serving cost: latency, serialized size and memory footprint
+            with self.tracker.quiet():
+                metrics.update(profile_inference(model, X_test))
+
             # Log metrics
-            mlflow.log_metrics(metrics)
-            
+            run.log_metrics(metrics)
+
             # Log model
-            mlflow.sklearn.log_model(
-                model, 
+            self.logged_models[model_name] = run.log_model(
+                model,
                 model_name,
-                registered_model_name=f"iris_{model_name}"
+                registered_model_name=f"iris_{model_name}",
+                # The default skops format refuses project classes like CalibratedModel
+                serialization_format=mlflow.sklearn.SERIALIZATION_FORMAT_CLOUDPICKLE,
             )
-            
+
             # Log classification report
             report = classification_report(y_test, y_pred, output_dict=True)
-            mlflow.log_dict(report, "classification_report.json")
-            
-            logger.info(f"{model_name} - Accuracy: {metrics['accuracy']:.4f}")
-            
+            run.log_dict(report, "classification_report.json")
+
+            logger.info(
+                f"{model_name} - Accuracy: {metrics['accuracy']:.4f}, "
+                f"ECE: {metrics['ece']:.4f}, "
+                f"p99 latency: {metrics['latency_single_p99_ms']:.3f}ms, "
+                f"size: {metrics['model_size_bytes']:,} bytes"
+            )
+
             return model, metrics
-    
+
     def train_all_models(self, X_train, y_train, X_test, y_test):
         """Train all models and return results"""
         results = {}
-        
+
         for model_name in self.models.keys():
-            model, metrics = self.train_model(model_name, X_train, y_train, X_test, y_test)
-            results[model_name] = {
-                "model": model,
-                "metrics": metrics
-            }
-        
+            model, metrics = self.train_model(
+                model_name, X_train, y_train, X_test, y_test
+            )
+            results[model_name] = {"model": model, "metrics": metrics}
+
         return results
-    
+
     def select_best_model(self, results):
-        """Select the best model based on accuracy"""
-        best_model_name = max(results.keys(), key=lambda k: results[k]["metrics"]["accuracy"])
+        """Select the model to serve according to the selection policy"""
+        best_model_name = select_model(
+            results,
+            policy=self.selection_policy,
+            accuracy_epsilon=self.accuracy_epsilon,
+            latency_metric=self.latency_metric,
+            latency_budget_ms=self.latency_budget_ms,
+        )
         best_model = results[best_model_name]["model"]
         best_metrics = results[best_model_name]["metrics"]
-        
-        logger.info(f"Best model: {best_model_name} with accuracy: {best_metrics['accuracy']:.4f}")
-        
+
+        logger.info(
+            f"Best model ({self.selection_policy}): {best_model_name} with accuracy: "
+            f"{best_metrics['accuracy']:.4f}, {self.latency_metric}: "
+            f"{best_metrics.get(self.latency_metric, float('nan')):.3f}"
+        )
+
         return best_model_name, best_model, best_metrics
-    
-    def save_model(self, model, model_name, models_dir="models"):
-        """Save the best model"""
+
+    def compress_model(self, model, X_train, y_train, X_test, y_test):
+        """Shrink a tree-ensemble model within max_compression_loss of its test accuracy
+
+        Calibrated models are compressed underneath and recalibrated on the same
+        held-out split. Size and latency before and after are logged to MLflow. Returns
+        (model, report), with a None report for models that are not tree ensembles.
+        """
+        calibrated = isinstance(model, CalibratedModel)
+        ensemble = model.estimator if calibrated else model
+        if not is_tree_ensemble(ensemble):
+            return model, None
+
+        if calibrated:
+            X_fit, X_cal, y_fit, y_cal = self.calibration_split(X_train, y_train)
+        else:
+            X_fit, y_fit = X_train, y_train
+
+        compressed, report = compress_ensemble(
+            ensemble,
+            X_fit,
+            y_fit,
+            X_test,
+            y_test,
+            max_accuracy_loss=self.max_compression_loss,
+        )
+        if compressed is not ensemble and calibrated:
+            compressed = CalibratedModel(compressed, method=model.method).fit(
+                X_cal, y_cal
+            )
+
+        # The budget applies to the model that is served, after recalibration
+        if compressed is not model:
+            served_accuracy = accuracy_score(y_test, model.predict(X_test))
+            report["accuracy"] = accuracy_score(y_test, compressed.predict(X_test))
+            if report["accuracy"] < served_accuracy - self.max_compression_loss:
+                logger.info(
+                    f"Recalibrated {report['method']} lost too much accuracy; "
+                    "keeping the full ensemble"
+                )
+                compressed, report["method"], report["accuracy"] = (
+                    model,
+                    "none",
+                    served_accuracy,
+                )
+
+        with self.tracker.quiet():
+            before = profile_inference(model, X_test)
+            after = (
+                before if compressed is model else profile_inference(compressed, X_test)
+            )
+        report.update(
+            {
+                "latency_single_p99_ms_before": before["latency_single_p99_ms"],
+                "latency_single_p99_ms_after": after["latency_single_p99_ms"],
+                "size_bytes_before": before["model_size_bytes"],
+                "size_bytes_after": after["model_size_bytes"],
+                "size_reduction": 1
+                - after["model_size_bytes"] / before["model_size_bytes"],
+                "latency_reduction": 1
+                - after["latency_single_p99_ms"] / before["latency_single_p99_ms"],
+            }
+        )
+
+        with self.tracker.start_run(
+            f"compression_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        ) as run:
+            run.log_params(
+                {
+                    "compression_method": report["method"],
+                    "max_accuracy_loss": self.max_compression_loss,
+                }
+            )
+            run.log_metrics(
+                {
+                    key: value
+                    for key, value in report.items()
+                    if isinstance(value, (int, float)) and key != "max_accuracy_loss"
+                }
+            )
+
+        logger.info(
+            f"Compression ({report['method']}): "
+            f"size {report['size_reduction']:.0%} smaller, "
+            f"p99 latency {report['latency_reduction']:.0%} lower"
+        )
+        return compressed, report
+
+    def save_model(
+        self,
+        model,
+        model_name,
+        models_dir="models",
+        scaler=None,
+        target_names=None,
+        ood=None,
+        model_type=None,
+    ):
+        """Save the model and its OOD scorer, plus the serving artifact given a scaler
+
+        ``model_name`` names the files; ``model_type`` (e.g. "logistic_regression")
+        versions the artifact the way export_bundle versions the bundle, so the API
+        reports what it serves.
+        """
+        model_type = model_type or model_name
         os.makedirs(models_dir, exist_ok=True)
         model_path = os.path.join(models_dir, f"{model_name}_model.pkl")
         joblib.dump(model, model_path)
         logger.info(f"Model saved to {model_path}")
+        if ood is not None:
+            ood.save(os.path.join(models_dir, "ood_scorer.npz"))
+
+        if scaler is not None:
+            artifact_path = os.path.join(models_dir, "serving_artifact")
+            try:
+                self.artifact_path = export_artifact(
+                    model,
+                    scaler,
+                    target_names,
+                    artifact_path,
+                    version=f"{model_type}-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+                    # The estimator under the calibration wrapper, e.g.
+                    # LogisticRegression
+                    metadata={
+                        "model_type": model_type,
+                        "estimator": type(getattr(model, "estimator", model)).__name__,
+                    },
+                    ood=ood,
+                )
+            except (UnsupportedModelError, BundleValidationError) as e:
+                # A stale artifact would shadow the new bundle in the API
+                shutil.rmtree(artifact_path, ignore_errors=True)
+                self.artifact_path = None
+                logger.warning(
+                    "Serving artifact not exported, the API will load the bundle: "
+                    f"{str(e)}"
+                )
         return model_path
 
+
 def main():
     """Main training pipeline"""
     # Load data
     processor = IrisDataProcessor()
-    
+
     try:
         # Try to load processed data
         X_train, X_test, y_train, y_test = processor.load_processed_data()
@@ -130,32 +443,101 @@ def main():
         df, feature_names, target_names = processor.load_data()
         X_train, X_test, y_train, y_test = processor.preprocess_data(df, feature_names)
         processor.save_data(X_train, X_test, y_train, y_test)
-    
-    # Initialize trainer
-    trainer = ModelTrainer()
-    
+
+    # Initialize trainer; CALIBRATION_METHOD=none keeps the models' own probabilities
+    calibration = os.getenv("CALIBRATION_METHOD", "sigmoid")
+    latency_budget = os.getenv("LATENCY_BUDGET_MS")
+    trainer = ModelTrainer(
+        calibration=None if calibration == "none" else calibration,
+        selection_policy=os.getenv("SELECTION_POLICY", "accuracy_then_latency"),
+        accuracy_epsilon=float(os.getenv("SELECTION_ACCURACY_EPSILON", "0.01")),
+        latency_budget_ms=float(latency_budget) if latency_budget else None,
+        max_compression_loss=float(os.getenv("MAX_COMPRESSION_LOSS", "0.01")),
+        # TRACKING_ASYNC=false writes every run inline, e.g. to debug the tracking store
+        tracker=RunTracker(
+            asynchronous=os.getenv("TRACKING_ASYNC", "true").lower() != "false"
+        ),
+    )
+
     # Train all models
     results = trainer.train_all_models(X_train, y_train, X_test, y_test)
-    
+
     # Select best model
     best_model_name, best_model, best_metrics = trainer.select_best_model(results)
-    
+
+    # Shrink tree-ensemble winners before they are saved and served
+    best_model, compression = trainer.compress_model(
+        best_model, X_train, y_train, X_test, y_test
+    )
+    if compression and compression["method"] != "none":
+        best_metrics, _ = trainer.evaluate_model(best_model, X_test, y_test)
+        best_metrics["ece"] = expected_calibration_error(
+            y_test, best_model.predict_proba(X_test)
+        )
+        with trainer.tracker.quiet():
+            best_metrics.update(profile_inference(best_model, X_test))
+
+    # OOD scorer served next to the model; the test-split rate sanity-checks the
+    # threshold
+    ood = OODScorer.fit(X_train, y_train)
+    best_metrics["ood_rate_test"] = float(ood.flags(ood.score(X_test)).mean())
+
     # Save best model
-    model_path = trainer.save_model(best_model, "best_model")
-    
+    model_path = trainer.save_model(
+        best_model,
+        "best_model",
+        scaler=processor.scaler,
+        ood=ood,
+        model_type=best_model_name,
+    )
+
+    # Export the single-file serving bundle loaded by the API
+    bundle_path = export_bundle(best_model, processor.scaler, best_model_name, ood=ood)
+
     # Register best model in MLflow
-    with mlflow.start_run(run_name=f"best_model_{datetime.now().strftime('%Y%m%d_%H%M%S')}"):
-        mlflow.log_params(best_model.get_params())
-        mlflow.log_metrics(best_metrics)
-        mlflow.sklearn.log_model(
-            best_model,
-            "best_model",
-            registered_model_name="iris_best_model"
+    with trainer.tracker.start_run(
+        f"best_model_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    ) as run:
+        run.log_params(best_model.get_params())
+        run.log_metrics(best_metrics)
+        if best_model is results[best_model_name]["model"]:
+            # Unchanged since its training run logged it: register that copy
+            trainer.tracker.register_model(
+                trainer.logged_models[best_model_name], "iris_best_model"
+            )
+        else:
+            run.log_model(
+                best_model,
+                "best_model",
+                registered_model_name="iris_best_model",
+                serialization_format=mlflow.sklearn.SERIALIZATION_FORMAT_CLOUDPICKLE,
+            )
+        run.log_param("model_type", best_model_name)
+        if compression:
+            run.log_param("compression_method", compression["method"])
+        run.log_params(
+            {
+                "selection_policy": trainer.selection_policy,
+                "selection_accuracy_epsilon": trainer.accuracy_epsilon,
+            }
         )
-        mlflow.log_param("model_type", best_model_name)
-        mlflow.log_artifact(model_path)
-    
+        run.log_artifact(model_path)
+        run.log_artifact(bundle_path)
+        run.log_artifact(os.path.join("models", "ood_scorer.npz"))
+        if trainer.artifact_path:
+            run.log_artifacts(trainer.artifact_path, artifact_path="serving_artifact")
+
+    overhead = trainer.tracker.close()
+    logger.info(
+        f"MLflow tracking: {overhead['tracking_blocking_seconds']:.2f}s "
+        "blocking training "
+        f"({overhead['tracking_wait_seconds']:.2f}s "
+        "waiting for the writer at the end), "
+        f"{overhead['tracking_write_seconds']:.2f}s writing to the tracking store, "
+        f"{overhead['tracking_runs']} runs, {overhead['tracking_failures']} failures"
+    )
     logger.info("Training pipeline completed successfully")
 
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,199 @@
+"""
+Ground-truth feedback: true labels attached to logged predictions and a windowed
+confusion matrix
+"""
+
+import logging
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on host parameters is 999 on older builds
+ID_CHUNK_SIZE = 500
+
+
+class WindowedConfusionMatrix:
+    """Confusion matrix over the last ``bucket_seconds * n_buckets`` seconds
+
+    Rows are true classes and columns predicted ones. Counts are kept per interval in a
+    ring, plus running totals of the whole window. An update touches one interval and
+    the totals, so accuracy is O(1) to maintain; expired intervals are subtracted once,
+    when the clock moves into a new interval.
+    """
+
+    def __init__(self, n_classes, bucket_seconds=60, n_buckets=60, clock=time.time):
+        self.n_classes = n_classes
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = n_buckets
+        self.clock = clock
+        self._counts = np.zeros((n_buckets, n_classes, n_classes), dtype=np.int64)
+        self._bucket_ids = np.full(n_buckets, -1, dtype=np.int64)
+        self._current_id = None
+        self.total = np.zeros((n_classes, n_classes), dtype=np.int64)
+        self.correct = 0
+        self.count = 0
+
+    @property
+    def horizon_seconds(self):
+        return self.bucket_seconds * self.n_buckets
+
+    def _advance(self):
+        """Drop intervals that left the window; returns the current interval id"""
+        current_id = int(self.clock() // self.bucket_seconds)
+        if current_id != self._current_id:
+            stale = (self._bucket_ids >= 0) & (
+                self._bucket_ids <= current_id - self.n_buckets
+            )
+            if stale.any():
+                expired = self._counts[stale].sum(axis=0)
+                self.total -= expired
+                self.correct -= int(np.trace(expired))
+                self.count -= int(expired.sum())
+                self._counts[stale] = 0
+                self._bucket_ids[stale] = -1
+            self._current_id = current_id
+        return current_id
+
+    def add_many(self, predicted, actual, timestamps=None):
+        """Count (predicted, actual) class-index pairs, optionally at past timestamps"""
+        predicted = np.asarray(predicted, dtype=np.int64)
+        actual = np.asarray(actual, dtype=np.int64)
+        current_id = self._advance()
+        if timestamps is None:
+            bucket_ids = np.full(len(predicted), current_id)
+        else:
+            bucket_ids = (
+                np.asarray(timestamps, dtype=np.float64) // self.bucket_seconds
+            ).astype(np.int64)
+            # Labels from outside the window (or the future) are not counted
+            keep = (bucket_ids > current_id - self.n_buckets) & (
+                bucket_ids <= current_id
+            )
+            predicted, actual, bucket_ids = (
+                predicted[keep],
+                actual[keep],
+                bucket_ids[keep],
+            )
+
+        # After _advance a slot is empty or holds the one in-window id mapping to it
+        slots = bucket_ids % self.n_buckets
+        self._bucket_ids[slots] = bucket_ids
+        np.add.at(self._counts, (slots, actual, predicted), 1)
+        np.add.at(self.total, (actual, predicted), 1)
+        self.correct += int((predicted == actual).sum())
+        self.count += len(predicted)
+        return len(predicted)
+
+    def add(self, predicted, actual):
+        return self.add_many([predicted], [actual])
+
+    def accuracy(self):
+        """Accuracy over the window, or None without labels"""
+        self._advance()
+        return self.correct / self.count if self.count else None
+
+    def window(self, seconds=None):
+        """Confusion matrix of the last ``seconds`` (default: the whole window)"""
+        current_id = self._advance()
+        if seconds is None or seconds >= self.horizon_seconds:
+            return self.total.copy()
+        n = max(1, int(np.ceil(seconds / self.bucket_seconds)))
+        recent = (self._bucket_ids >= 0) & (self._bucket_ids > current_id - n)
+        return self._counts[recent].sum(axis=0)
+
+    def summary(self, class_names, seconds=None):
+        """Count, accuracy, confusion matrix and per-class precision/recall"""
+        matrix = self.window(seconds)
+        count = int(matrix.sum())
+        hits = np.diag(matrix)
+        predicted_totals = matrix.sum(axis=0)
+        actual_totals = matrix.sum(axis=1)
+        return {
+            "count": count,
+            "accuracy": float(hits.sum() / count) if count else None,
+            "confusion_matrix": matrix.tolist(),
+            "per_class": {
+                name: {
+                    "precision": (
+                        float(hits[i] / predicted_totals[i])
+                        if predicted_totals[i]
+                        else None
+                    ),
+                    "recall": (
+                        float(hits[i] / actual_totals[i]) if actual_totals[i] else None
+                    ),
+                    "support": int(actual_totals[i]),
+                }
+                for i, name in enumerate(class_names)
+            },
+        }
+
+
+def ensure_feedback_columns(conn):
+    """Add the true_label and feedback_timestamp columns to an old predictions table"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(predictions)")}
+    for column in ("true_label", "feedback_timestamp"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE predictions ADD COLUMN {column} TEXT")
+
+
+def store_feedback(db_path, labels_by_id, timestamp=None):
+    """Attach true labels to logged predictions in one transaction
+
+    Returns ``(matched, not_found, duplicates)``: matched is a list of ``(id, predicted
+    label, true label)`` for the rows updated now. Rows that already carry a label are
+    left alone, so a retried upload is not counted twice.
+    """
+    timestamp = timestamp or datetime.now().isoformat()
+    ids = list(labels_by_id)
+    matched, duplicates, found = [], [], set()
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        # Take the write lock before reading so two uploads cannot claim one row
+        conn.execute("BEGIN IMMEDIATE")
+        for start in range(0, len(ids), ID_CHUNK_SIZE):
+            chunk = ids[start : start + ID_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            for row_id, prediction, true_label in conn.execute(
+                "SELECT id, prediction, true_label FROM predictions "
+                f"WHERE id IN ({placeholders})",
+                chunk,
+            ):
+                found.add(row_id)
+                if true_label is not None:
+                    duplicates.append(row_id)
+                else:
+                    matched.append((row_id, prediction, labels_by_id[row_id]))
+        conn.executemany(
+            "UPDATE predictions SET true_label = ?, feedback_timestamp = ? "
+            "WHERE id = ?",
+            ((true_label, timestamp, row_id) for row_id, _, true_label in matched),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    not_found = [row_id for row_id in ids if row_id not in found]
+    return matched, not_found, duplicates
+
+
+def load_feedback(db_path, since):
+    """(predicted, true label, feedback epoch seconds) for labels after ``since``"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT prediction, true_label, feedback_timestamp FROM predictions "
+            "WHERE true_label IS NOT NULL AND feedback_timestamp > ?",
+            [datetime.fromtimestamp(since).isoformat()],
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        (prediction, true_label, datetime.fromisoformat(ts).timestamp())
+        for prediction, true_label, ts in rows
+    ]
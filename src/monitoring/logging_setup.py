@@ -0,0 +1,142 @@
+"""
+Non-blocking structured logging: records are queued on the calling thread and
+formatted and written by a background listener
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+try:
+    from pythonjsonlogger.json import JsonFormatter
+except ImportError:  # python-json-logger < 3
+    try:
+        from pythonjsonlogger.jsonlogger import JsonFormatter
+    except ImportError:
+        JsonFormatter = None
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+JSON_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+# Per-request records go to this logger so they can be sampled separately
+REQUEST_LOGGER_NAME = "iris.requests"
+
+_listener = None
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener and drops when full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Records stay in-process, so message formatting is left to the listener thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """Pass a fraction of records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, sample_rate=1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        return (
+            self.sample_rate >= 1.0
+            or record.levelno >= logging.WARNING
+            or random.random() < self.sample_rate
+        )
+
+
+def build_formatter(log_format="json"):
+    """JSON formatter when python-json-logger is available, plain text otherwise"""
+    if log_format == "json" and JsonFormatter is not None:
+        return JsonFormatter(JSON_FORMAT)
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def setup_logging(
+    log_file=None,
+    level=None,
+    log_format=None,
+    sample_rate=None,
+    max_bytes=None,
+    backup_count=None,
+    queue_size=None,
+):
+    """Route the root logger through a bounded queue to rotating file and console output
+
+    Unset arguments are read from LOG_FILE, LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE,
+    LOG_MAX_BYTES, LOG_BACKUP_COUNT and LOG_QUEUE_SIZE.
+    """
+    global _listener
+
+    log_file = log_file or os.getenv("LOG_FILE", "logs/api.log")
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    log_format = log_format or os.getenv("LOG_FORMAT", "json")
+    sample_rate = (
+        sample_rate
+        if sample_rate is not None
+        else float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+    )
+    max_bytes = max_bytes or int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    backup_count = backup_count or int(os.getenv("LOG_BACKUP_COUNT", "5"))
+    queue_size = queue_size or int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    stop_logging()
+
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    formatter = build_formatter(log_format)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
+    for existing in list(request_logger.filters):
+        request_logger.removeFilter(existing)
+    request_logger.addFilter(SamplingFilter(sample_rate))
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    return queue_handler
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
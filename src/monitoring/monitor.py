@@ -1,48 +1,271 @@
 """
 Monitoring and logging utilities
 """
+
+import asyncio
 import logging
 import json
 import sqlite3
-import pandas as pd
 from datetime import datetime, timedelta
 import os
-from prometheus_client import Counter, Histogram, Gauge, start_http_server
-import threading
+from prometheus_client import Counter, Histogram, Gauge, REGISTRY, start_http_server
 import time
+import numpy as np
+
+from src.monitoring.feedback import WindowedConfusionMatrix, load_feedback
+from src.monitoring.ring_buffer import PredictionRingBuffer
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+FEATURE_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+
+
 class ModelMonitor:
     """Class to handle model monitoring and metrics collection"""
-    
-    def __init__(self, db_path="logs/predictions.db"):
+
+    def __init__(
+        self,
+        db_path="logs/predictions.db",
+        registry=REGISTRY,
+        buffer_size=10000,
+        quantiles=None,
+        feedback_bucket_seconds=60,
+        feedback_buckets=60,
+    ):
         self.db_path = db_path
+        # Optional QuantileTracker for sketch-based latency and confidence percentiles
+        self.quantiles = quantiles
+        self.buffer_size = buffer_size
+        # In-memory history of this process's recent predictions, allocated by
+        # bind_classes
+        self.recent = None
+        self.class_names = []
+        self.baseline_means = None
+        self.ood_threshold = None
+        self.ood_scored = 0
+        self.ood_flagged = 0
+        # Windowed confusion matrix of labelled predictions, allocated by bind_classes
+        self.feedback_bucket_seconds = feedback_bucket_seconds
+        self.feedback_buckets = feedback_buckets
+        self.feedback = None
         self.metrics = {
-            'total_predictions': Counter('total_predictions', 'Total number of predictions made'),
-            'prediction_latency': Histogram('prediction_latency_seconds', 'Prediction latency in seconds'),
-            'prediction_confidence': Histogram('prediction_confidence', 'Model prediction confidence'),
-            'class_distribution': Counter('class_predictions', 'Predictions by class', ['class_name']),
-            'model_accuracy': Gauge('model_accuracy', 'Current model accuracy'),
+            "total_predictions": Counter(
+                "iris_predictions_total",
+                "Total number of predictions made",
+                registry=registry,
+            ),
+            "prediction_latency": Histogram(
+                "iris_prediction_duration_seconds",
+                "Time spent on predictions",
+                registry=registry,
+            ),
+            # Whole-batch scoring time, kept out of the per-prediction histogram
+            "batch_latency": Histogram(
+                "iris_batch_prediction_duration_seconds",
+                "Time spent scoring a batch of predictions",
+                registry=registry,
+            ),
+            "prediction_confidence": Histogram(
+                "prediction_confidence",
+                "Model prediction confidence",
+                registry=registry,
+            ),
+            "class_distribution": Counter(
+                "class_predictions",
+                "Predictions by class",
+                ["class_name"],
+                registry=registry,
+            ),
+            "model_accuracy": Gauge(
+                "model_accuracy", "Current model accuracy", registry=registry
+            ),
+            "ood_predictions": Counter(
+                "iris_ood_predictions_total",
+                "Predictions flagged out-of-distribution",
+                registry=registry,
+            ),
+            "feedback_labels": Counter(
+                "iris_feedback_labels_total",
+                "True labels received for logged predictions",
+                registry=registry,
+            ),
+            "class_precision": Gauge(
+                "iris_class_precision",
+                "Windowed precision from feedback labels",
+                ["class_name"],
+                registry=registry,
+            ),
+            "class_recall": Gauge(
+                "iris_class_recall",
+                "Windowed recall from feedback labels",
+                ["class_name"],
+                registry=registry,
+            ),
         }
-        
+        self.last_cycle = {}
+
+        # Bound methods and label children resolved once, used by record_prediction
+        self._inc_total = self.metrics["total_predictions"].inc
+        self._observe_latency = self.metrics["prediction_latency"].observe
+        self._observe_batch_latency = self.metrics["batch_latency"].observe
+        self._observe_confidence = self.metrics["prediction_confidence"].observe
+        self._class_counters = []
+
+    def bind_classes(self, class_names):
+        """Pre-bind per-class counters by index and size the recent-prediction buffer"""
+        self.class_names = list(class_names)
+        if self.buffer_size and (
+            self.recent is None
+            or self.recent.probabilities.shape[1] != len(class_names)
+        ):
+            self.recent = PredictionRingBuffer(
+                self.buffer_size, n_classes=len(class_names)
+            )
+        self._class_counters = [
+            self.metrics["class_distribution"].labels(class_name=name)
+            for name in class_names
+        ]
+        if self.feedback is None or self.feedback.n_classes != len(class_names):
+            self.feedback = WindowedConfusionMatrix(
+                len(class_names), self.feedback_bucket_seconds, self.feedback_buckets
+            )
+
     def log_prediction_metrics(self, prediction_class, confidence, latency):
         """Log metrics for a prediction"""
-        self.metrics['total_predictions'].inc()
-        self.metrics['prediction_latency'].observe(latency)
-        self.metrics['prediction_confidence'].observe(confidence)
-        self.metrics['class_distribution'].labels(class_name=prediction_class).inc()
-        
+        self.metrics["total_predictions"].inc()
+        self.metrics["prediction_latency"].observe(latency)
+        self.metrics["prediction_confidence"].observe(confidence)
+        self.metrics["class_distribution"].labels(class_name=prediction_class).inc()
+
+    def record_prediction(
+        self, class_index, confidence, latency, features=None, probabilities=None
+    ):
+        """Hot-path log_prediction_metrics using the pre-bound class counters"""
+        self._inc_total()
+        self._observe_latency(latency)
+        self._observe_confidence(confidence)
+        self._class_counters[class_index].inc()
+        if self.quantiles is not None:
+            self.quantiles.add("prediction", latency)
+            self.quantiles.add("confidence", confidence)
+        if features is not None and self.recent is not None:
+            self.recent.append(features, class_index, probabilities)
+
+    def record_batch(self, class_indices, latency, features=None, probabilities=None):
+        """Batch record_prediction; ``latency`` is the whole batch's, kept per batch"""
+        if features is not None and self.recent is not None:
+            self.recent.extend(features, class_indices, probabilities)
+        if probabilities is not None and self.quantiles is not None:
+            self.quantiles.add_many(
+                "confidence",
+                probabilities[np.arange(len(class_indices)), class_indices],
+            )
+        self._inc_total(len(class_indices))
+        self._observe_batch_latency(latency)
+        counts = np.bincount(class_indices, minlength=len(self._class_counters))
+        for counter, count in zip(self._class_counters, counts.tolist()):
+            if count:
+                counter.inc(count)
+
+    def record_ood(self, scores, threshold):
+        """Count OOD flags; scores go to the "ood_score" sketch for windowed rates"""
+        self.ood_threshold = threshold
+        flagged = int((scores > threshold).sum())
+        if self.quantiles is not None:
+            self.quantiles.add_many("ood_score", scores)
+        self.ood_scored += len(scores)
+        if flagged:
+            self.ood_flagged += flagged
+            self.metrics["ood_predictions"].inc(flagged)
+        return flagged
+
+    def ood_stats(self, window_seconds=None):
+        """OOD rate over a sliding window (from the sketch) and since start"""
+        stats = {
+            "threshold": self.ood_threshold,
+            "scored_total": self.ood_scored,
+            "flagged_total": self.ood_flagged,
+            "rate_total": (
+                self.ood_flagged / self.ood_scored if self.ood_scored else None
+            ),
+        }
+        if self.quantiles is not None and self.ood_threshold is not None:
+            window = self.quantiles.sketch("ood_score").window(window_seconds)
+            stats["window_count"] = window.count
+            stats["window_rate"] = (
+                1 - window.rank(self.ood_threshold) / window.count
+                if window.count
+                else None
+            )
+            stats.update(
+                self.quantiles.quantiles("ood_score", window_seconds, (0.5, 0.99))
+            )
+        return stats
+
+    def record_feedback(self, predicted, actual, timestamps=None):
+        """Count labelled class indices and refresh the accuracy and per-class gauges"""
+        counted = self.feedback.add_many(predicted, actual, timestamps)
+        self.metrics["feedback_labels"].inc(len(predicted))
+        self._publish_feedback()
+        return counted
+
+    def _publish_feedback(self):
+        accuracy = self.feedback.accuracy()
+        if accuracy is None:
+            return
+        self.metrics["model_accuracy"].set(accuracy)
+        matrix = self.feedback.total
+        hits = np.diag(matrix)
+        for i, (predicted_total, actual_total) in enumerate(
+            zip(matrix.sum(axis=0), matrix.sum(axis=1))
+        ):
+            name = self.class_names[i]
+            if predicted_total:
+                self.metrics["class_precision"].labels(class_name=name).set(
+                    hits[i] / predicted_total
+                )
+            if actual_total:
+                self.metrics["class_recall"].labels(class_name=name).set(
+                    hits[i] / actual_total
+                )
+
+    def load_feedback(self):
+        """Rebuild the windowed confusion matrix from labels in the database"""
+        try:
+            since = time.time() - self.feedback.horizon_seconds
+            index = {name: i for i, name in enumerate(self.class_names)}
+            rows = [
+                (index[predicted], index[actual], ts)
+                for predicted, actual, ts in load_feedback(self.db_path, since)
+                if predicted in index and actual in index
+            ]
+            if rows:
+                predicted, actual, timestamps = zip(*rows)
+                self.feedback.add_many(predicted, actual, timestamps)
+                self._publish_feedback()
+            logger.info(f"Loaded {len(rows)} feedback labels from the prediction store")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error loading feedback: {str(e)}")
+            return 0
+
+    def feedback_stats(self, window_seconds=None):
+        """Accuracy, confusion matrix and per-class precision/recall from feedback"""
+        if self.feedback is None:
+            return {"count": 0}
+        return self.feedback.summary(self.class_names, window_seconds)
+
     def get_prediction_stats(self, days=7):
         """Get prediction statistics for the last N days"""
         try:
             conn = sqlite3.connect(self.db_path)
-            
+            conn.row_factory = sqlite3.Row
+
             # Calculate date threshold
             threshold_date = (datetime.now() - timedelta(days=days)).isoformat()
-            
+
             query = """
                 SELECT 
                     prediction,
@@ -55,23 +278,24 @@ class ModelMonitor:
                 GROUP BY prediction
                 ORDER BY count DESC
             """
-            
-            df = pd.read_sql_query(query, conn, params=[threshold_date])
+
+            records = [dict(row) for row in conn.execute(query, [threshold_date])]
             conn.close()
-            
-            return df.to_dict('records')
-            
+
+            return records
+
         except Exception as e:
             logger.error(f"Error getting prediction stats: {str(e)}")
             return []
-    
+
     def get_hourly_prediction_volume(self, hours=24):
         """Get hourly prediction volume for the last N hours"""
         try:
             conn = sqlite3.connect(self.db_path)
-            
+            conn.row_factory = sqlite3.Row
+
             threshold_date = (datetime.now() - timedelta(hours=hours)).isoformat()
-            
+
             query = """
                 SELECT 
                     strftime('%Y-%m-%d %H:00:00', timestamp) as hour,
@@ -81,95 +305,172 @@ class ModelMonitor:
                 GROUP BY strftime('%Y-%m-%d %H:00:00', timestamp)
                 ORDER BY hour
             """
-            
-            df = pd.read_sql_query(query, conn, params=[threshold_date])
+
+            records = [dict(row) for row in conn.execute(query, [threshold_date])]
             conn.close()
-            
-            return df.to_dict('records')
-            
+
+            return records
+
         except Exception as e:
             logger.error(f"Error getting hourly stats: {str(e)}")
             return []
-    
+
+    def live_stats(self, window_seconds=None):
+        """Prediction statistics served from the in-memory buffer"""
+        if self.recent is None:
+            return {"count": 0}
+        return self.recent.stats(self.class_names, window_seconds)
+
+    def check_recent_drift(self, window_seconds=300, threshold=0.1):
+        """Short-window drift from memory against the last SQLite baseline"""
+        if self.recent is None:
+            return {"status": "insufficient_data", "drift_detected": False}
+        return self.recent.drift(window_seconds, self.baseline_means, threshold)
+
     def check_data_drift(self, threshold=0.1):
         """Check for potential data drift in recent predictions"""
         try:
             conn = sqlite3.connect(self.db_path)
-            
+
             # Get recent data (last 24 hours)
-            recent_threshold = (datetime.now() - timedelta(hours=24)).isoformat()
-            
+            recent_start = datetime.now() - timedelta(hours=24)
+            recent_threshold = recent_start.isoformat()
+
             # Get historical baseline (7-30 days ago)
             baseline_start = (datetime.now() - timedelta(days=30)).isoformat()
             baseline_end = (datetime.now() - timedelta(days=7)).isoformat()
-            
-            recent_query = """
-                SELECT sepal_length, sepal_width, petal_length, petal_width
+
+            # Aggregate in SQLite rather than pulling the rows into the process
+            averages = ", ".join(f"AVG({column})" for column in FEATURE_COLUMNS)
+            recent_query = f"""
+                SELECT COUNT(*), {averages}
                 FROM predictions WHERE timestamp > ?
             """
-            
-            baseline_query = """
-                SELECT sepal_length, sepal_width, petal_length, petal_width
+
+            baseline_query = f"""
+                SELECT COUNT(*), {averages}
                 FROM predictions WHERE timestamp BETWEEN ? AND ?
             """
-            
-            recent_df = pd.read_sql_query(recent_query, conn, params=[recent_threshold])
-            baseline_df = pd.read_sql_query(baseline_query, conn, params=[baseline_start, baseline_end])
-            
+
+            # The buffer answers the recent window when it still holds all of it
+            if (
+                self.recent is not None
+                and self.recent.covered_since <= recent_start.timestamp()
+            ):
+                window, _, _, _ = self.recent.snapshot(since=recent_start.timestamp())
+                recent_count = len(window)
+                recent_means = (
+                    window.mean(axis=0).tolist()
+                    if recent_count
+                    else [None] * len(FEATURE_COLUMNS)
+                )
+            else:
+                recent_count, *recent_means = conn.execute(
+                    recent_query, [recent_threshold]
+                ).fetchone()
+            baseline_count, *baseline_means = conn.execute(
+                baseline_query, [baseline_start, baseline_end]
+            ).fetchone()
+
             conn.close()
-            
-            if len(recent_df) == 0 or len(baseline_df) == 0:
+
+            if baseline_count:
+                self.baseline_means = baseline_means
+
+            if recent_count == 0 or baseline_count == 0:
                 return {"status": "insufficient_data", "drift_detected": False}
-            
-            # Calculate feature means
-            recent_means = recent_df.mean()
-            baseline_means = baseline_df.mean()
-            
-            # Calculate relative change
-            relative_changes = abs((recent_means - baseline_means) / baseline_means)
-            
+
+            # Calculate relative change of feature means
+            relative_changes = {
+                column: abs((recent - baseline) / baseline)
+                for column, recent, baseline in zip(
+                    FEATURE_COLUMNS, recent_means, baseline_means
+                )
+            }
+
             # Check if any feature has drifted beyond threshold
-            drift_detected = any(relative_changes > threshold)
-            
+            drift_detected = any(
+                change > threshold for change in relative_changes.values()
+            )
+
             return {
                 "status": "success",
                 "drift_detected": drift_detected,
-                "feature_changes": relative_changes.to_dict(),
+                "feature_changes": relative_changes,
                 "threshold": threshold,
-                "recent_samples": len(recent_df),
-                "baseline_samples": len(baseline_df)
+                "recent_samples": recent_count,
+                "baseline_samples": baseline_count,
             }
-            
+
         except Exception as e:
             logger.error(f"Error checking data drift: {str(e)}")
             return {"status": "error", "drift_detected": False, "error": str(e)}
 
+    def run_monitoring_cycle(self):
+        """Update the accuracy gauge and check for data drift"""
+        stats = self.get_prediction_stats(days=1)
+        if self.feedback is not None and self.feedback.accuracy() is not None:
+            # Real accuracy from feedback labels; refreshed here so expired intervals
+            # drop out
+            self._publish_feedback()
+        elif stats:
+            # No labels in the window: average confidence stands in for accuracy
+            avg_confidence = sum(stat["avg_confidence"] for stat in stats) / len(stats)
+            self.metrics["model_accuracy"].set(avg_confidence)
+
+        # Check for data drift
+        drift_info = self.check_data_drift()
+        if drift_info.get("drift_detected"):
+            logger.warning("Data drift detected!")
+
+        self.last_cycle = {
+            "timestamp": datetime.now().isoformat(),
+            "prediction_stats": stats,
+            "drift": drift_info,
+            "recent_drift": self.check_recent_drift(),
+            "feedback": self.feedback_stats(),
+            "ood": self.ood_stats(),
+        }
+        return self.last_cycle
+
+
 class PerformanceMonitor:
     """Monitor API performance and system health"""
-    
-    def __init__(self):
+
+    def __init__(self, saturation_threshold=1.0):
         self.start_time = datetime.now()
         self.request_count = 0
         self.error_count = 0
-        
+        self.saturation_threshold = saturation_threshold
+
     def log_request(self, success=True):
         """Log API request"""
         self.request_count += 1
         if not success:
             self.error_count += 1
-    
-    def get_health_status(self):
-        """Get current health status"""
+
+    def get_health_status(self, admission=None):
+        """Get current health status; ``admission`` is an AdmissionController status"""
         uptime = datetime.now() - self.start_time
         error_rate = self.error_count / max(self.request_count, 1)
-        
-        return {
+        saturated = (
+            admission is not None
+            and admission["saturation"] > self.saturation_threshold
+        )
+
+        status = {
             "uptime_seconds": uptime.total_seconds(),
             "total_requests": self.request_count,
             "error_count": self.error_count,
             "error_rate": error_rate,
-            "status": "healthy" if error_rate < 0.05 else "degraded"
+            "status": "healthy" if error_rate < 0.05 and not saturated else "degraded",
         }
+        if admission is not None:
+            status["saturation"] = admission["saturation"]
+            status["queue_delay_ms"] = admission["queue_delay_ms"]
+            status["shed_total"] = admission["shed_total"]
+        return status
+
 
 def start_metrics_server(port=9090):
     """Start Prometheus metrics server"""
@@ -179,48 +480,36 @@ def start_metrics_server(port=9090):
     except Exception as e:
         logger.error(f"Failed to start metrics server: {str(e)}")
 
-def background_monitoring():
-    """Background monitoring task"""
-    monitor = ModelMonitor()
-    
+
+async def run_background_monitoring(monitor, interval=300, retry_interval=60):
+    """Background monitoring as an asyncio task; blocking queries run in the executor"""
+    loop = asyncio.get_running_loop()
+    logger.info("Background monitoring task started")
+
     while True:
         try:
-            # Update model accuracy gauge (example)
-            stats = monitor.get_prediction_stats(days=1)
-            if stats:
-                # Calculate average confidence as proxy for accuracy
-                avg_confidence = sum(stat['avg_confidence'] for stat in stats) / len(stats)
-                monitor.metrics['model_accuracy'].set(avg_confidence)
-            
-            # Check for data drift
-            drift_info = monitor.check_data_drift()
-            if drift_info.get('drift_detected'):
-                logger.warning("Data drift detected!")
-            
-            time.sleep(300)  # Check every 5 minutes
-            
+            await loop.run_in_executor(None, monitor.run_monitoring_cycle)
+            await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            logger.info("Background monitoring task stopped")
+            raise
         except Exception as e:
             logger.error(f"Error in background monitoring: {str(e)}")
-            time.sleep(60)  # Retry after 1 minute on error
+            await asyncio.sleep(retry_interval)
 
-def start_background_monitoring():
-    """Start background monitoring in a separate thread"""
-    monitoring_thread = threading.Thread(target=background_monitoring, daemon=True)
-    monitoring_thread.start()
-    logger.info("Background monitoring started")
 
 if __name__ == "__main__":
     # Example usage
     monitor = ModelMonitor()
-    
+
     # Get stats
     stats = monitor.get_prediction_stats()
     print("Prediction Stats:", json.dumps(stats, indent=2))
-    
+
     # Get hourly volume
     volume = monitor.get_hourly_prediction_volume()
     print("Hourly Volume:", json.dumps(volume, indent=2))
-    
+
     # Check drift
     drift = monitor.check_data_drift()
     print("Drift Check:", json.dumps(drift, indent=2))
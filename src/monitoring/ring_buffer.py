@@ -0,0 +1,166 @@
+"""
+Fixed-size in-memory history of recent predictions, stored column-wise in NumPy arrays
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+FEATURE_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+
+
+class PredictionRingBuffer:
+    """The last ``capacity`` predictions in preallocated columns
+
+    Writes copy into the next slots of the feature, class index, probability and
+    timestamp arrays, so the write path allocates no per-row Python objects. Reads
+    return copies in arrival order and never touch SQLite; the prediction history with
+    row ids and feedback labels stays in SQLite. The buffer only sees predictions made
+    by this process.
+    """
+
+    def __init__(self, capacity=10000, n_classes=3, n_features=len(FEATURE_COLUMNS)):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.features = np.zeros((capacity, n_features), dtype=np.float64)
+        self.class_index = np.zeros(capacity, dtype=np.int16)
+        self.probabilities = np.zeros((capacity, n_classes), dtype=np.float64)
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.created_at = time.time()
+        self._written = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    @property
+    def total_written(self):
+        return self._written
+
+    @property
+    def covered_since(self):
+        """Epoch seconds from which every prediction of this process is still held"""
+        with self._lock:
+            if self._written <= self.capacity:
+                return self.created_at
+            return float(self.timestamp[self._written % self.capacity])
+
+    def append(self, features, class_index, probabilities, timestamp=None):
+        """Record one prediction"""
+        with self._lock:
+            slot = self._written % self.capacity
+            self.features[slot] = features
+            self.class_index[slot] = class_index
+            self.probabilities[slot] = probabilities
+            self.timestamp[slot] = time.time() if timestamp is None else timestamp
+            self._written += 1
+
+    def extend(self, features, class_indices, probabilities, timestamp=None):
+        """Record a scored batch; only the last ``capacity`` rows are kept"""
+        n = len(class_indices)
+        if n == 0:
+            return
+        if n > self.capacity:
+            features, class_indices, probabilities = (
+                features[-self.capacity :],
+                class_indices[-self.capacity :],
+                probabilities[-self.capacity :],
+            )
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self._lock:
+            kept = len(class_indices)
+            start = (self._written + n - kept) % self.capacity
+            # At most two slices: up to the end of the arrays, then from the start
+            first = min(kept, self.capacity - start)
+            for dest, src in (
+                (slice(start, start + first), slice(0, first)),
+                (slice(0, kept - first), slice(first, kept)),
+            ):
+                self.features[dest] = features[src]
+                self.class_index[dest] = class_indices[src]
+                self.probabilities[dest] = probabilities[src]
+                self.timestamp[dest] = timestamp
+            self._written += n
+
+    def _order(self):
+        """Slot indices from oldest to newest"""
+        if self._written <= self.capacity:
+            return np.arange(self._written)
+        return np.roll(np.arange(self.capacity), -(self._written % self.capacity))
+
+    def snapshot(self, since=None, limit=None):
+        """(features, class_index, probabilities, timestamp) copies, oldest first
+
+        ``since`` keeps rows at or after an epoch timestamp, ``limit`` the newest rows.
+        """
+        with self._lock:
+            order = self._order()
+            if limit is not None:
+                order = order[max(len(order) - limit, 0) :]
+            timestamps = self.timestamp[order]
+            if since is not None:
+                keep = timestamps >= since
+                order, timestamps = order[keep], timestamps[keep]
+            return (
+                self.features[order],
+                self.class_index[order],
+                self.probabilities[order],
+                timestamps,
+            )
+
+    def stats(self, target_names, window_seconds=None):
+        """Volume, class mix, confidence and feature means, optionally windowed"""
+        since = None if window_seconds is None else time.time() - window_seconds
+        features, class_index, probabilities, timestamps = self.snapshot(since=since)
+        count = len(class_index)
+        if count == 0:
+            return {"count": 0}
+
+        confidence = probabilities[np.arange(count), class_index]
+        class_counts = np.bincount(class_index, minlength=len(target_names))
+        return {
+            "count": count,
+            "window_seconds": window_seconds,
+            "oldest": datetime.fromtimestamp(timestamps[0]).isoformat(),
+            "newest": datetime.fromtimestamp(timestamps[-1]).isoformat(),
+            "class_counts": dict(zip(target_names, class_counts.tolist())),
+            "avg_confidence": float(confidence.mean()),
+            "min_confidence": float(confidence.min()),
+            "feature_means": dict(zip(FEATURE_COLUMNS, features.mean(axis=0).tolist())),
+            "feature_stds": dict(zip(FEATURE_COLUMNS, features.std(axis=0).tolist())),
+        }
+
+    def drift(self, window_seconds=300, baseline_means=None, threshold=0.1):
+        """Relative change of feature means in the trailing window
+
+        Compared against ``baseline_means`` when given, otherwise against the buffered
+        rows older than the window.
+        """
+        features, _, _, timestamps = self.snapshot()
+        in_window = timestamps >= time.time() - window_seconds
+        recent = features[in_window]
+        if baseline_means is None:
+            baseline = features[~in_window]
+            baseline_count = len(baseline)
+            baseline_means = baseline.mean(axis=0) if baseline_count else None
+        else:
+            baseline_count = None
+            baseline_means = np.asarray(baseline_means, dtype=np.float64)
+
+        if len(recent) == 0 or baseline_means is None:
+            return {"status": "insufficient_data", "drift_detected": False}
+
+        changes = np.abs(recent.mean(axis=0) - baseline_means) / np.abs(baseline_means)
+        return {
+            "status": "success",
+            "drift_detected": bool((changes > threshold).any()),
+            "feature_changes": dict(zip(FEATURE_COLUMNS, changes.tolist())),
+            "threshold": threshold,
+            "window_seconds": window_seconds,
+            "recent_samples": int(len(recent)),
+            "baseline_samples": baseline_count,
+        }
@@ -0,0 +1,225 @@
+"""
+Mergeable quantile sketches for latency and confidence, over sliding time windows
+"""
+
+import math
+import time
+
+import numpy as np
+
+
+class DDSketch:
+    """Relative-error quantile sketch (DDSketch)
+
+    Values are counted in logarithmic bins, so any quantile is returned within
+    ``relative_accuracy`` of the true value whatever the scale: 20µs and 200ms latencies
+    are resolved equally well. Sketches with the same accuracy merge by adding bin
+    counts. At most ``max_bins`` bins are kept; beyond that the lowest bins are
+    collapsed, which only coarsens the low tail.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048, min_value=1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.min_value = min_value
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index):
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        """Add a non-negative value; values below min_value count as zero"""
+        if value > self.min_value:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += count
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def add_many(self, values):
+        """Vectorized add for an array of values"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        positive = values[values > self.min_value]
+        if positive.size:
+            indices, counts = np.unique(
+                np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                return_counts=True,
+            )
+            for index, count in zip(indices.tolist(), counts.tolist()):
+                self.bins[index] = self.bins.get(index, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.zero_count += values.size - positive.size
+        self.count += values.size
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def _collapse(self):
+        indices = sorted(self.bins)
+        excess = indices[: len(indices) - self.max_bins + 1]
+        target = indices[len(excess)]
+        self.bins[target] += sum(self.bins.pop(index) for index in excess)
+
+    def merge(self, other):
+        """Add another sketch's counts into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError(
+                "Only sketches with the same relative accuracy can be merged"
+            )
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Estimated q-quantile, or None when empty"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Clamp to the observed range so p0/p100 are exact
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def rank(self, value):
+        """Approximate number of values <= value"""
+        if value <= self.min_value:
+            return self.zero_count
+        limit = self._index(value)
+        return self.zero_count + sum(
+            count for index, count in self.bins.items() if index <= limit
+        )
+
+    def clear(self):
+        self.bins.clear()
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+
+class SlidingWindowSketch:
+    """Per-interval sketches over the last ``bucket_seconds * n_buckets`` seconds
+
+    Memory is bounded by ``n_buckets`` sketches of at most ``max_bins`` bins each,
+    whatever the traffic. A window query merges the intervals that overlap it, so
+    windows resolve to whole intervals.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds=30,
+        n_buckets=120,
+        relative_accuracy=0.01,
+        max_bins=2048,
+        clock=time.monotonic,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = n_buckets
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.clock = clock
+        self._sketches = [
+            DDSketch(relative_accuracy, max_bins) for _ in range(n_buckets)
+        ]
+        self._bucket_ids = [None] * n_buckets
+
+    @property
+    def horizon_seconds(self):
+        return self.bucket_seconds * self.n_buckets
+
+    def _current(self):
+        bucket_id = int(self.clock() // self.bucket_seconds)
+        slot = bucket_id % self.n_buckets
+        if self._bucket_ids[slot] != bucket_id:
+            self._sketches[slot].clear()
+            self._bucket_ids[slot] = bucket_id
+        return self._sketches[slot]
+
+    def add(self, value):
+        self._current().add(value)
+
+    def add_many(self, values):
+        self._current().add_many(values)
+
+    def window(self, seconds=None):
+        """Merged sketch of the last ``seconds`` of intervals (default: full horizon)"""
+        current_id = int(self.clock() // self.bucket_seconds)
+        n = (
+            self.n_buckets
+            if seconds is None
+            else min(self.n_buckets, max(1, math.ceil(seconds / self.bucket_seconds)))
+        )
+        merged = DDSketch(self.relative_accuracy, self.max_bins)
+        for sketch, bucket_id in zip(self._sketches, self._bucket_ids):
+            if bucket_id is not None and current_id - n < bucket_id <= current_id:
+                merged.merge(sketch)
+        return merged
+
+
+class QuantileTracker:
+    """Named sliding-window sketches, created on first use"""
+
+    def __init__(self, bucket_seconds=30, n_buckets=120, relative_accuracy=0.01):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = n_buckets
+        self.relative_accuracy = relative_accuracy
+        self.sketches = {}
+
+    def sketch(self, name):
+        sketch = self.sketches.get(name)
+        if sketch is None:
+            sketch = self.sketches[name] = SlidingWindowSketch(
+                self.bucket_seconds, self.n_buckets, self.relative_accuracy
+            )
+        return sketch
+
+    def add(self, name, value):
+        self.sketch(name).add(value)
+
+    def add_many(self, name, values):
+        self.sketch(name).add_many(values)
+
+    def quantiles(self, name, window_seconds=None, quantiles=(0.5, 0.99, 0.999)):
+        """{"count", "p50", "p99", "p999", ...} for one metric over a window"""
+        merged = self.sketch(name).window(window_seconds)
+        summary = {"count": merged.count}
+        for q in quantiles:
+            summary[f"p{q * 100:g}".replace(".", "")] = merged.quantile(q)
+        return summary
+
+    def summary(self, window_seconds=None):
+        return {
+            name: self.quantiles(name, window_seconds) for name in sorted(self.sketches)
+        }
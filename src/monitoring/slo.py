@@ -0,0 +1,184 @@
+"""
+SLO burn-rate evaluation over the sliding-window quantile sketches
+"""
+
+import json
+import logging
+import os
+
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# Defaults: 99.9% of predictions within 25ms, 95% with confidence of at least 0.6
+DEFAULT_OBJECTIVES = [
+    {
+        "name": "prediction_latency",
+        "metric": "request",
+        "threshold": 0.025,
+        "objective": 0.999,
+        "good": "below",
+    },
+    {
+        "name": "prediction_confidence",
+        "metric": "confidence",
+        "threshold": 0.6,
+        "objective": 0.95,
+        "good": "above",
+    },
+]
+
+# (short window, long window, burn rate): alert when both windows burn faster than
+# the rate
+DEFAULT_BURN_WINDOWS = [(300, 3600, 14.4), (1800, 3600, 6.0)]
+
+
+class SLOObjective:
+    """A fraction of events that must be good: a metric below (or above) a threshold"""
+
+    def __init__(self, name, metric, threshold, objective, good="below"):
+        if not 0 < objective < 1:
+            raise ValueError(f"SLO objective must be in (0, 1), got {objective}")
+        if good not in ("below", "above"):
+            raise ValueError(f"good must be 'below' or 'above', got {good}")
+        self.name = name
+        self.metric = metric
+        self.threshold = threshold
+        self.objective = objective
+        self.good = good
+
+    def bad_fraction(self, sketch):
+        """Share of the sketch's events that miss the threshold, or None when empty"""
+        if sketch.count == 0:
+            return None
+        at_or_below = sketch.rank(self.threshold)
+        bad = sketch.count - at_or_below if self.good == "below" else at_or_below
+        return bad / sketch.count
+
+    def burn_rate(self, sketch):
+        """How many times faster than allowed the error budget is being spent"""
+        bad_fraction = self.bad_fraction(sketch)
+        if bad_fraction is None:
+            return None
+        return bad_fraction / (1 - self.objective)
+
+
+class SLOEvaluator:
+    """Multi-window burn-rate alerts for a set of objectives over a QuantileTracker"""
+
+    def __init__(self, tracker, objectives, burn_windows=DEFAULT_BURN_WINDOWS):
+        self.tracker = tracker
+        self.objectives = list(objectives)
+        self.burn_windows = list(burn_windows)
+
+    @classmethod
+    def from_env(cls, tracker):
+        """Objectives from SLO_OBJECTIVES, windows from SLO_BURN_WINDOWS (JSON lists)"""
+        objectives = DEFAULT_OBJECTIVES
+        burn_windows = DEFAULT_BURN_WINDOWS
+        try:
+            if os.getenv("SLO_OBJECTIVES"):
+                objectives = json.loads(os.getenv("SLO_OBJECTIVES"))
+            if os.getenv("SLO_BURN_WINDOWS"):
+                burn_windows = [
+                    tuple(window)
+                    for window in json.loads(os.getenv("SLO_BURN_WINDOWS"))
+                ]
+        except ValueError as e:
+            logger.error(f"Invalid SLO configuration, using defaults: {str(e)}")
+            objectives, burn_windows = DEFAULT_OBJECTIVES, DEFAULT_BURN_WINDOWS
+        return cls(
+            tracker,
+            [SLOObjective(**objective) for objective in objectives],
+            burn_windows,
+        )
+
+    def _windows(self, objective):
+        """(short s, long s, max burn rate, short burn, long burn) per window pair"""
+        sketch = self.tracker.sketch(objective.metric)
+        for short_seconds, long_seconds, max_burn_rate in self.burn_windows:
+            yield (
+                short_seconds,
+                long_seconds,
+                max_burn_rate,
+                objective.burn_rate(sketch.window(short_seconds)),
+                objective.burn_rate(sketch.window(long_seconds)),
+            )
+
+    def burn_rates(self):
+        """{(slo name, window label): burn rate} for every window with events"""
+        rates = {}
+        for objective in self.objectives:
+            for short_seconds, long_seconds, _, short_burn, long_burn in self._windows(
+                objective
+            ):
+                for seconds, burn in (
+                    (short_seconds, short_burn),
+                    (long_seconds, long_burn),
+                ):
+                    if burn is not None:
+                        rates[(objective.name, f"{seconds:g}s")] = burn
+        return rates
+
+    def evaluate(self):
+        """Burn rates per objective and window pair; alert when both exceed the rate"""
+        results = {}
+        for objective in self.objectives:
+            windows = []
+            for (
+                short_seconds,
+                long_seconds,
+                max_burn_rate,
+                short_burn,
+                long_burn,
+            ) in self._windows(objective):
+                windows.append(
+                    {
+                        "short_window_seconds": short_seconds,
+                        "long_window_seconds": long_seconds,
+                        "short_burn_rate": short_burn,
+                        "long_burn_rate": long_burn,
+                        "max_burn_rate": max_burn_rate,
+                        "alert": short_burn is not None
+                        and long_burn is not None
+                        and short_burn > max_burn_rate
+                        and long_burn > max_burn_rate,
+                    }
+                )
+            results[objective.name] = {
+                "metric": objective.metric,
+                "threshold": objective.threshold,
+                "objective": objective.objective,
+                "good": objective.good,
+                "windows": windows,
+                "alerting": any(window["alert"] for window in windows),
+            }
+        return results
+
+
+class SLOBurnRateCollector:
+    """Prometheus collector computing iris_slo_burn_rate from the sketches per scrape
+
+    A gauge set by /slo would only show the last time someone asked; evaluating per
+    scrape keeps burn-rate alert rules current. Windows without events are left out.
+    """
+
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+
+    @staticmethod
+    def _family():
+        return GaugeMetricFamily(
+            "iris_slo_burn_rate",
+            "Error-budget burn rate per SLO and window",
+            labels=["slo", "window"],
+        )
+
+    def describe(self):
+        return [self._family()]
+
+    def collect(self):
+        family = self._family()
+        for (name, window), burn in self.evaluator.burn_rates().items():
+            family.add_metric([name, window], burn)
+        yield family
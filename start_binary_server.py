@@ -0,0 +1,30 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+import asyncio
+from prometheus_client import start_http_server
+from src.api import main as api
+
+
+async def serve(host, port):
+    """Load the model like the HTTP app does, then serve the binary protocol"""
+    await api.startup_event()
+    server = api.create_binary_server()
+    tcp_server = await server.start(host, port)
+    try:
+        await tcp_server.serve_forever()
+    finally:
+        await server.stop()
+        await api.shutdown_event()
+
+
+if __name__ == "__main__":
+    # There is no /metrics route here; expose Prometheus metrics on their own port instead
+    metrics_port = os.getenv("BINARY_METRICS_PORT")
+    if metrics_port:
+        start_http_server(int(metrics_port))
+    try:
+        asyncio.run(serve(os.getenv("BINARY_HOST", "0.0.0.0"), int(os.getenv("BINARY_PORT", "8001"))))
+    except KeyboardInterrupt:
+        pass
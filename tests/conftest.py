@@ -1,6 +1,7 @@
 """
 Test configuration and fixtures
 """
+
 import pytest
 import numpy as np
 import os
@@ -9,7 +10,8 @@ import tempfile
 import shutil
 
 # Add src to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
 
 @pytest.fixture
 def sample_iris_data():
@@ -18,14 +20,16 @@ def sample_iris_data():
         "sepal_length": 5.1,
         "sepal_width": 3.5,
         "petal_length": 1.4,
-        "petal_width": 0.2
+        "petal_width": 0.2,
     }
 
+
 @pytest.fixture
 def sample_features_array():
     """Sample features as numpy array"""
     return np.array([[5.1, 3.5, 1.4, 0.2]])
 
+
 @pytest.fixture
 def temp_dir():
     """Temporary directory for testing"""
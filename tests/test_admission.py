@@ -0,0 +1,172 @@
+"""
+Tests for admission control, rate limiting and load shedding
+"""
+
+import asyncio
+
+import pytest
+
+from src.api.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    ClientRateLimiter,
+    Overloaded,
+    TokenBucket,
+)
+from src.monitoring.monitor import PerformanceMonitor
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _call(middleware, path, headers=()):
+    """Drive an ASGI request through the middleware; returns (status, headers)"""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "path": path,
+        "headers": list(headers),
+        "client": ("10.0.0.1", 1234),
+    }
+    await middleware(scope, receive, send)
+    start = sent[0]
+    return start["status"], dict(start["headers"])
+
+
+async def _ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+class TestTokenBucket:
+
+    def test_refills_at_rate_up_to_burst(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2.0, burst=2, clock=clock)
+        assert bucket.take() == 0 and bucket.take() == 0
+        assert bucket.take() == pytest.approx(0.5)
+
+        clock.now = 10.0
+        assert bucket.take() == 0 and bucket.take() == 0
+        assert bucket.take() > 0
+
+    def test_limiter_is_per_client(self):
+        limiter = ClientRateLimiter(rate=1.0, burst=1, clock=FakeClock())
+        assert limiter.check("a") == 0
+        assert limiter.check("a") > 0
+        assert limiter.check("b") == 0
+
+
+class TestAdmissionController:
+
+    def test_sheds_when_queue_is_full(self):
+        async def scenario():
+            controller = AdmissionController(
+                max_concurrency=1, max_queue=1, queue_timeout=1.0
+            )
+            await controller.acquire()
+            waiter = asyncio.ensure_future(controller.acquire())
+            await asyncio.sleep(0)
+            assert controller.saturation() == 2.0
+
+            with pytest.raises(Overloaded) as error:
+                await controller.acquire()
+            assert error.value.reason == "queue_full" and error.value.status_code == 503
+
+            controller.release()
+            await waiter
+            controller.release()
+            assert controller.in_flight == 0 and controller.queued == 0
+            assert controller.shed_total == 1
+
+        asyncio.run(scenario())
+
+    def test_queue_timeout_sheds(self):
+        async def scenario():
+            controller = AdmissionController(
+                max_concurrency=1, max_queue=4, queue_timeout=0.01
+            )
+            await controller.acquire()
+            with pytest.raises(Overloaded) as error:
+                await controller.acquire()
+            assert error.value.reason == "queue_timeout"
+            assert controller.queued == 0 and controller.queue_delay() == 0.0
+
+        asyncio.run(scenario())
+
+    def test_interactive_lane_is_granted_before_bulk(self):
+        async def scenario():
+            controller = AdmissionController(
+                max_concurrency=1, max_queue=4, queue_timeout=1.0
+            )
+            await controller.acquire()
+            order = []
+
+            async def wait(lane):
+                await controller.acquire(lane)
+                order.append(lane)
+
+            tasks = [
+                asyncio.ensure_future(wait("bulk")),
+                asyncio.ensure_future(wait("interactive")),
+            ]
+            await asyncio.sleep(0)
+            controller.release()
+            await asyncio.sleep(0)
+            controller.release()
+            await asyncio.gather(*tasks)
+            assert order == ["interactive", "bulk"]
+
+        asyncio.run(scenario())
+
+
+class TestAdmissionMiddleware:
+
+    def test_exempt_paths_bypass_a_saturated_controller(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrency=1, max_queue=0)
+            middleware = AdmissionMiddleware(_ok_app, controller)
+            await controller.acquire()
+
+            status, headers = await _call(middleware, "/predict")
+            assert status == 503 and b"retry-after" in headers
+            assert (await _call(middleware, "/health"))[0] == 200
+
+        asyncio.run(scenario())
+
+    def test_rate_limited_clients_get_429(self):
+        async def scenario():
+            limiter = ClientRateLimiter(rate=1.0, burst=1, clock=FakeClock())
+            middleware = AdmissionMiddleware(
+                _ok_app, AdmissionController(), rate_limiter=limiter
+            )
+            assert (await _call(middleware, "/predict"))[0] == 200
+            assert (await _call(middleware, "/predict"))[0] == 429
+            assert (await _call(middleware, "/predict", [(b"x-client-id", b"other")]))[
+                0
+            ] == 200
+
+        asyncio.run(scenario())
+
+
+def test_saturation_marks_health_degraded():
+    monitor = PerformanceMonitor()
+    monitor.log_request(success=True)
+    admission = {"saturation": 1.5, "queue_delay_ms": 40.0, "shed_total": 3}
+
+    assert monitor.get_health_status()["status"] == "healthy"
+    health = monitor.get_health_status(admission)
+    assert health["status"] == "degraded" and health["shed_total"] == 3
@@ -0,0 +1,127 @@
+"""
+Tests for the mmapped serving artifact
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from src.models.artifact import UnsupportedModelError, export_artifact, load_artifact
+from src.models.bundle import BundleValidationError, load_serving_bundle
+from src.models.calibration import CalibratedModel
+from src.models.compression import distill_tree
+
+
+@pytest.fixture
+def iris_scaled():
+    X, y = load_iris(return_X_y=True)
+    scaler = StandardScaler().fit(X)
+    return X, y, scaler, scaler.transform(X)
+
+
+def _models(X_scaled, y):
+    forest = RandomForestClassifier(n_estimators=20, random_state=42).fit(X_scaled, y)
+    svc = SVC(kernel="rbf", random_state=42).fit(X_scaled, y)
+    return {
+        "linear": LogisticRegression(max_iter=1000).fit(X_scaled, y),
+        "forest": forest,
+        "distilled": distill_tree(forest, X_scaled, max_depth=3),
+        "svc_sigmoid": CalibratedModel(svc, method="sigmoid").fit(X_scaled, y),
+        "svc_isotonic": CalibratedModel(svc, method="isotonic").fit(X_scaled, y),
+    }
+
+
+class TestServingArtifact:
+
+    def test_round_trip_matches_sklearn(self, temp_dir, iris_scaled):
+        """Every supported model kind reproduces predict and predict_proba"""
+        X, y, scaler, X_scaled = iris_scaled
+        for name, model in _models(X_scaled, y).items():
+            path = os.path.join(temp_dir, name)
+            export_artifact(model, scaler, path=path)
+            bundle = load_artifact(path)
+
+            classes, proba = bundle.predict(X)
+            np.testing.assert_allclose(
+                proba, model.predict_proba(X_scaled), atol=1e-9, err_msg=name
+            )
+            np.testing.assert_array_equal(
+                classes, model.predict(X_scaled), err_msg=name
+            )
+            assert bundle.metadata["source"] == "artifact"
+
+    def test_arrays_are_memory_mapped(self, temp_dir, iris_scaled):
+        X, y, scaler, X_scaled = iris_scaled
+        path = os.path.join(temp_dir, "artifact")
+        export_artifact(
+            LogisticRegression(max_iter=1000).fit(X_scaled, y), scaler, path=path
+        )
+
+        bundle = load_artifact(path)
+        assert isinstance(bundle.model.coef, np.memmap)
+        assert isinstance(bundle.scaler.mean, np.memmap)
+        assert not bundle.model.coef.flags.writeable
+
+    def test_unsupported_models_are_refused(self, temp_dir, iris_scaled):
+        X, y, scaler, X_scaled = iris_scaled
+        path = os.path.join(temp_dir, "artifact")
+        with pytest.raises(UnsupportedModelError):
+            export_artifact(
+                SVC(probability=True, random_state=42).fit(X_scaled, y),
+                scaler,
+                path=path,
+            )
+        assert not os.path.exists(path)
+
+    def test_tampered_arrays_fail_verification(self, temp_dir, iris_scaled):
+        X, y, scaler, X_scaled = iris_scaled
+        path = os.path.join(temp_dir, "artifact")
+        export_artifact(
+            LogisticRegression(max_iter=1000).fit(X_scaled, y), scaler, path=path
+        )
+        with open(os.path.join(path, "manifest.json")) as f:
+            coef_file = json.load(f)["model"]["arrays"]["coef"]
+        np.save(
+            os.path.join(path, coef_file), np.load(os.path.join(path, coef_file)) * 2
+        )
+
+        with pytest.raises(BundleValidationError):
+            load_artifact(path)
+
+    def test_serving_bundle_prefers_the_artifact(self, temp_dir, iris_scaled):
+        X, y, scaler, X_scaled = iris_scaled
+        path = os.path.join(temp_dir, "artifact")
+        export_artifact(
+            LogisticRegression(max_iter=1000).fit(X_scaled, y), scaler, path=path
+        )
+
+        bundle = load_serving_bundle(
+            os.path.join(temp_dir, "missing.joblib"), artifact_path=path
+        )
+        assert bundle.metadata["source"] == "artifact"
+
+    def test_trainer_artifact_keeps_the_model_identity(self, temp_dir, iris_scaled):
+        """The "best_model" artifact is versioned by model type, like the bundle"""
+        from src.models.train import ModelTrainer
+
+        X, y, scaler, X_scaled = iris_scaled
+        model = CalibratedModel(LogisticRegression(max_iter=1000).fit(X_scaled, y)).fit(
+            X_scaled, y
+        )
+        trainer = ModelTrainer(tracker=object())
+
+        trainer.save_model(
+            model, "best_model", temp_dir, scaler, model_type="logistic_regression"
+        )
+
+        artifact = load_artifact(os.path.join(temp_dir, "serving_artifact"))
+        assert artifact.version.startswith("logistic_regression-")
+        assert artifact.metadata["model_type"] == "logistic_regression"
+        assert artifact.metadata["estimator"] == "LogisticRegression"
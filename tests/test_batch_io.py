@@ -0,0 +1,203 @@
+"""
+Tests for batch scoring input parsing, validation and result streaming
+"""
+
+import io
+
+import numpy as np
+import pytest
+
+from src.api.batch_io import (
+    BatchFormatError,
+    parse_features,
+    stream_results,
+    validate_feature_matrix,
+)
+
+TARGET_NAMES = ["setosa", "versicolor", "virginica"]
+
+
+@pytest.fixture
+def feature_matrix():
+    return np.array([[5.1, 3.5, 1.4, 0.2], [6.9, 3.1, 5.4, 2.1]])
+
+
+@pytest.fixture
+def scored_batch():
+    """Class indices and probabilities for a two-row batch"""
+    return np.array([0, 2]), np.array([[0.9, 0.05, 0.05], [0.1, 0.2, 0.7]])
+
+
+class TestParsing:
+
+    def test_parse_npy(self, feature_matrix):
+        """A .npy body is loaded without pickle support"""
+        buffer = io.BytesIO()
+        np.save(buffer, feature_matrix.astype(np.float32))
+
+        X = parse_features("npy", buffer.getvalue())
+
+        assert X.dtype == np.float64
+        np.testing.assert_allclose(X, feature_matrix, rtol=1e-6)
+
+    def test_parse_csv_without_header(self, feature_matrix):
+        """Headerless CSV columns are taken in feature order"""
+        X = parse_features("csv", b"5.1,3.5,1.4,0.2\n6.9,3.1,5.4,2.1\n")
+        np.testing.assert_array_equal(X, feature_matrix)
+
+    def test_parse_csv_header_reorders_columns(self, feature_matrix):
+        """Header names, including raw dataset names, select and order the columns"""
+        body = (
+            b"petal width (cm),sepal length (cm),id,"
+            b"sepal width (cm),petal length (cm)\n"
+            b"0.2,5.1,1,3.5,1.4\n2.1,6.9,2,3.1,5.4\n"
+        )
+        np.testing.assert_array_equal(parse_features("csv", body), feature_matrix)
+
+    def test_parse_rejects_wrong_width(self):
+        """Bodies that are not (n, 4) are rejected"""
+        with pytest.raises(BatchFormatError):
+            parse_features("csv", b"1,2,3\n")
+
+    def test_parse_npy_rejects_non_numeric_dtype(self, feature_matrix):
+        """Structured arrays cannot be read as a feature matrix"""
+        buffer = io.BytesIO()
+        np.save(buffer, np.zeros(2, dtype=[("sepal_length", "f8"), ("species", "U10")]))
+
+        with pytest.raises(BatchFormatError, match="numeric"):
+            parse_features("npy", buffer.getvalue())
+
+    def test_parse_arrow(self, feature_matrix):
+        """Arrow IPC streams are matched by column name"""
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+
+        table = pa.table(
+            {
+                "petal_width": feature_matrix[:, 3],
+                "sepal_length": feature_matrix[:, 0],
+                "sepal_width": feature_matrix[:, 1],
+                "petal_length": feature_matrix[:, 2],
+            }
+        )
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        np.testing.assert_array_equal(
+            parse_features("arrow", sink.getvalue()), feature_matrix
+        )
+
+    def test_parse_arrow_rejects_string_column(self, feature_matrix):
+        """A non-numeric feature column is a format error, not a server error"""
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+
+        table = pa.table(
+            {
+                "sepal_length": feature_matrix[:, 0],
+                "sepal_width": feature_matrix[:, 1],
+                "petal_length": ["long", "short"],
+                "petal_width": feature_matrix[:, 3],
+            }
+        )
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        with pytest.raises(BatchFormatError, match="numeric"):
+            parse_features("arrow", sink.getvalue())
+
+
+class TestValidation:
+
+    def test_valid_matrix_has_no_errors(self, feature_matrix):
+        assert validate_feature_matrix(feature_matrix) == []
+
+    def test_out_of_bounds_and_nan_rows_are_reported(self, feature_matrix):
+        """Rows outside [0, 10] or non-finite are reported with the bad features"""
+        X = np.vstack(
+            [feature_matrix, [[11.0, 3.0, 1.0, 0.2], [5.0, np.nan, 1.0, -0.1]]]
+        )
+
+        errors = validate_feature_matrix(X)
+
+        assert [e["row"] for e in errors] == [2, 3]
+        assert errors[0]["features"] == ["sepal_length"]
+        assert errors[1]["features"] == ["sepal_width", "petal_width"]
+
+
+class TestStreaming:
+
+    def test_npy_stream_is_a_valid_array(self, scored_batch):
+        """Chunks concatenate into a loadable .npy of [class_index, probabilities]"""
+        class_indices, proba = scored_batch
+        body = b"".join(
+            stream_results("npy", class_indices, proba, TARGET_NAMES, chunk_rows=1)
+        )
+
+        result = np.load(io.BytesIO(body))
+
+        np.testing.assert_array_equal(result[:, 0], class_indices)
+        np.testing.assert_array_equal(result[:, 1:], proba)
+
+    def test_csv_stream(self, scored_batch):
+        """CSV output has a header and one line per row"""
+        class_indices, proba = scored_batch
+        body = b"".join(
+            stream_results("csv", class_indices, proba, TARGET_NAMES, chunk_rows=1)
+        ).decode()
+
+        lines = body.splitlines()
+        assert lines[0] == (
+            "prediction,probability,"
+            "probability_setosa,probability_versicolor,probability_virginica"
+        )
+        assert lines[2] == "virginica,0.7,0.1,0.2,0.7"
+
+    def test_arrow_stream(self, scored_batch):
+        """Arrow output is a readable IPC stream"""
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+
+        class_indices, proba = scored_batch
+        body = b"".join(
+            stream_results("arrow", class_indices, proba, TARGET_NAMES, chunk_rows=1)
+        )
+        table = pa.ipc.open_stream(body).read_all()
+
+        assert table.column("prediction").to_pylist() == ["setosa", "virginica"]
+        assert table.column("probability_virginica").to_pylist() == [0.05, 0.7]
+
+    def test_prediction_ids_come_before_ood_scores(self, scored_batch):
+        """Logged row ids are a trailing column, ahead of the OOD scores"""
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+
+        class_indices, proba = scored_batch
+        extra = {"ood_scores": np.array([0.5, 2.5]), "prediction_ids": [41, 42]}
+
+        npy = np.load(
+            io.BytesIO(
+                b"".join(
+                    stream_results("npy", class_indices, proba, TARGET_NAMES, **extra)
+                )
+            )
+        )
+        np.testing.assert_array_equal(npy[:, -2:], [[41, 0.5], [42, 2.5]])
+
+        lines = (
+            b"".join(stream_results("csv", class_indices, proba, TARGET_NAMES, **extra))
+            .decode()
+            .splitlines()
+        )
+        assert lines[0].endswith(",prediction_id,ood_score")
+        assert lines[2].endswith(",42,2.5")
+
+        table = pa.ipc.open_stream(
+            b"".join(
+                stream_results("arrow", class_indices, proba, TARGET_NAMES, **extra)
+            )
+        ).read_all()
+        assert table.schema.names[-2:] == ["prediction_id", "ood_score"]
+        assert table.column("prediction_id").to_pylist() == [41, 42]
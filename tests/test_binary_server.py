@@ -0,0 +1,150 @@
+"""
+Tests for the binary prediction protocol
+"""
+
+import asyncio
+import struct
+
+import numpy as np
+import pytest
+from sklearn.datasets import load_iris
+from sklearn.linear_model import LogisticRegression
+
+from src.api.binary_server import (
+    ERROR,
+    PREDICT_BATCH,
+    BinaryPredictionClient,
+    BinaryPredictionServer,
+    RequestError,
+    encode_frame,
+    encode_rows,
+    read_frame,
+)
+
+
+@pytest.fixture(scope="module")
+def iris():
+    X, y = load_iris(return_X_y=True)
+    return X, LogisticRegression(max_iter=1000).fit(X, y)
+
+
+async def _serve(model, scenario, **kwargs):
+    """Run scenario(server, port) against a server on an ephemeral port"""
+    batches = []
+
+    def score_batch(X):
+        return model.predict(X), model.predict_proba(X)
+
+    def log_batch(X, class_indices, proba, latency):
+        """Hands out consecutive row ids like the predictions table"""
+        first = sum(batches) + 1
+        batches.append(len(X))
+        logged = asyncio.get_running_loop().create_future()
+        logged.set_result(np.arange(first, first + len(X)))
+        return logged
+
+    server = BinaryPredictionServer(
+        score_batch,
+        log_batch,
+        score_ood=lambda X: (X.sum(axis=1), None),
+        **kwargs,
+    )
+    tcp_server = await server.start("127.0.0.1", 0)
+    try:
+        return await scenario(server, tcp_server.sockets[0].getsockname()[1]), batches
+    finally:
+        tcp_server.close()
+        await server.stop()
+
+
+class TestBinaryPredictionServer:
+
+    def test_unary_and_batch_round_trips(self, iris):
+        X, model = iris
+
+        async def scenario(server, port):
+            client = await BinaryPredictionClient.connect(port=port)
+            single = await client.predict(X[0])
+            batch = await client.predict_batch(X)
+            await client.close()
+            return single, batch
+
+        (single, batch), _ = asyncio.run(_serve(model, scenario))
+        class_index, proba, ood_score, prediction_id = single
+        assert class_index == model.predict(X[:1])[0]
+        np.testing.assert_array_equal(proba, model.predict_proba(X[:1])[0])
+        assert ood_score == X[0].sum()
+        assert prediction_id == 1
+
+        class_indices, batch_proba, ood_scores, prediction_ids = batch
+        np.testing.assert_array_equal(class_indices, model.predict(X))
+        np.testing.assert_array_equal(batch_proba, model.predict_proba(X))
+        np.testing.assert_array_equal(ood_scores, X.sum(axis=1))
+        np.testing.assert_array_equal(prediction_ids, np.arange(2, len(X) + 2))
+
+    def test_stream_results_arrive_in_order(self, iris):
+        X, model = iris
+
+        async def scenario(server, port):
+            client = await BinaryPredictionClient.connect(port=port)
+            results = [r async for r in client.stream(np.array_split(X, 30))]
+            await client.close()
+            return results
+
+        results, batches = asyncio.run(_serve(model, scenario))
+        assert [len(r[0]) for r in results] == [
+            len(chunk) for chunk in np.array_split(X, 30)
+        ]
+        np.testing.assert_array_equal(
+            np.concatenate([r[0] for r in results]), model.predict(X)
+        )
+        np.testing.assert_array_equal(
+            np.concatenate([r[3] for r in results]), np.arange(1, len(X) + 1)
+        )
+        assert sum(batches) == len(X)
+
+    def test_invalid_requests_get_error_frames(self, iris):
+        X, model = iris
+
+        async def scenario(server, port):
+            client = await BinaryPredictionClient.connect(port=port)
+            with pytest.raises(RequestError, match="Invalid rows"):
+                await client.predict([5.1, 3.5, float("nan"), 0.2])
+            # A truncated body is rejected, and the connection keeps working
+            client.writer.write(
+                encode_frame(PREDICT_BATCH, 7, struct.pack("<I", 2) + b"\0" * 8)
+            )
+            kind, request_id, body = await read_frame(client.reader)
+            assert (kind, request_id) == (ERROR, 7) and b"Expected 2 rows" in body
+            result = await client.predict(X[0])
+            await client.close()
+            return result
+
+        result, _ = asyncio.run(_serve(model, scenario))
+        assert result[0] == model.predict(X[:1])[0]
+
+    def test_concurrent_requests_share_model_calls(self, iris):
+        X, model = iris
+
+        async def scenario(server, port):
+            clients = [
+                await BinaryPredictionClient.connect(port=port) for _ in range(20)
+            ]
+            results = await asyncio.gather(
+                *(c.predict(X[i]) for i, c in enumerate(clients))
+            )
+            # Pipelined frames on one connection are answered in order
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                b"".join(encode_rows(PREDICT_BATCH, i, X[i : i + 2]) for i in range(10))
+            )
+            ids = [(await read_frame(reader))[1] for _ in range(10)]
+            writer.close()
+            for c in clients:
+                await c.close()
+            return results, ids
+
+        (results, ids), batches = asyncio.run(_serve(model, scenario, max_delay=0.05))
+        assert [r[0] for r in results] == list(model.predict(X[:20]))
+        assert ids == list(range(10))
+        assert len(batches) < 30
@@ -0,0 +1,119 @@
+"""
+Tests for offline bulk scoring
+"""
+
+import os
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from src.data.data_loader import IrisDataProcessor
+from src.models.bundle import export_bundle
+from src.models.bulk_score import BulkScorer, iter_csv_chunks
+
+
+@pytest.fixture
+def bundle_path(temp_dir):
+    """Serving bundle for a logistic regression fitted on the Iris data"""
+    processor = IrisDataProcessor()
+    df, feature_names, target_names = processor.load_data()
+    X_train, X_test, y_train, y_test = processor.preprocess_data(df, feature_names)
+    model = LogisticRegression(max_iter=1000).fit(X_train, y_train)
+    return export_bundle(
+        model,
+        processor.scaler,
+        "logistic_regression",
+        path=os.path.join(temp_dir, "bundle.joblib"),
+    )
+
+
+@pytest.fixture
+def input_rows():
+    X = np.tile(
+        [[5.1, 3.5, 1.4, 0.2], [6.2, 2.9, 4.3, 1.3], [6.9, 3.1, 5.4, 2.1]], (50, 1)
+    )
+    X[4] = [np.nan, 3.0, 1.0, 0.2]
+    X[10] = [12.0, 3.0, 1.0, 0.2]
+    return X
+
+
+def read_predictions(path):
+    with open(path) as f:
+        return [line.split(",")[0] for line in f.read().splitlines()[1:]]
+
+
+class TestBulkScorer:
+
+    def test_csv_chunks_keep_every_row(self, temp_dir, input_rows):
+        """Chunking on line boundaries neither drops nor splits rows"""
+        path = os.path.join(temp_dir, "input.csv")
+        np.savetxt(
+            path,
+            input_rows,
+            delimiter=",",
+            header="sepal_length,sepal_width,petal_length,petal_width",
+            comments="",
+        )
+
+        chunks = list(iter_csv_chunks(path, chunk_bytes=64))
+
+        assert len(chunks) > 1
+        assert all(data.startswith(b"sepal_length") for _, data in chunks)
+        assert sum(data.count(b"\n") - 1 for _, data in chunks) == len(input_rows)
+
+    def test_scores_csv_in_order(self, temp_dir, bundle_path, input_rows):
+        """Predictions come back in input order with invalid rows flagged"""
+        input_path = os.path.join(temp_dir, "input.csv")
+        output_path = os.path.join(temp_dir, "output.csv")
+        np.savetxt(input_path, input_rows, delimiter=",")
+
+        summary = BulkScorer(
+            workers=1, chunk_bytes=256, bundle_path=bundle_path
+        ).score_file(input_path, output_path)
+
+        predictions = read_predictions(output_path)
+        assert summary["rows"] == len(input_rows)
+        assert summary["invalid_rows"] == 2
+        assert predictions[:4] == ["setosa", "versicolor", "virginica", "setosa"]
+        assert predictions[4] == "invalid" and predictions[10] == "invalid"
+
+    def test_process_pool_matches_single_process(
+        self, temp_dir, bundle_path, input_rows
+    ):
+        """Sharding across workers gives byte-identical output"""
+        input_path = os.path.join(temp_dir, "input.npy")
+        np.save(input_path, input_rows)
+
+        outputs = []
+        for workers in (1, 2):
+            output_path = os.path.join(temp_dir, f"output_{workers}.csv")
+            BulkScorer(
+                workers=workers, chunk_rows=16, bundle_path=bundle_path
+            ).score_file(input_path, output_path)
+            with open(output_path) as f:
+                outputs.append(f.read())
+
+        assert outputs[0] == outputs[1]
+
+    def test_malformed_csv_rows_are_flagged_not_fatal(self, temp_dir, bundle_path):
+        """Unparseable lines are scored as invalid; the rest of the chunk is kept"""
+        input_path = os.path.join(temp_dir, "input.csv")
+        output_path = os.path.join(temp_dir, "output.csv")
+        with open(input_path, "w") as f:
+            f.write(
+                "sepal_length,sepal_width,petal_length,petal_width\n"
+                "5.1,3.5,1.4,0.2\n5.1,abc,1.4,0.2\n6.9,3.1\n6.9,3.1,5.4,2.1\n"
+            )
+
+        summary = BulkScorer(workers=2, bundle_path=bundle_path).score_file(
+            input_path, output_path
+        )
+
+        assert summary["rows"] == 4 and summary["invalid_rows"] == 2
+        assert read_predictions(output_path) == [
+            "setosa",
+            "invalid",
+            "invalid",
+            "virginica",
+        ]
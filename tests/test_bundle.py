@@ -0,0 +1,82 @@
+"""
+Tests for the serving bundle
+"""
+
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from src.data.data_loader import IrisDataProcessor
+from src.models.bundle import (
+    ServingBundle,
+    BundleValidationError,
+    PROBE_INPUT,
+    export_bundle,
+)
+
+
+@pytest.fixture
+def trained_model_and_scaler():
+    """Logistic regression fitted on the processed Iris data"""
+    processor = IrisDataProcessor()
+    df, feature_names, target_names = processor.load_data()
+    X_train, X_test, y_train, y_test = processor.preprocess_data(df, feature_names)
+    model = LogisticRegression(max_iter=1000).fit(X_train, y_train)
+    return model, processor.scaler
+
+
+class TestServingBundle:
+
+    def test_save_and_load_roundtrip(self, trained_model_and_scaler, temp_dir):
+        """A saved bundle loads back with identical predictions"""
+        model, scaler = trained_model_and_scaler
+        path = export_bundle(
+            model,
+            scaler,
+            "logistic_regression",
+            path=os.path.join(temp_dir, "bundle.joblib"),
+        )
+
+        bundle = ServingBundle.load(path)
+
+        assert bundle.version.startswith("logistic_regression-")
+        assert bundle.target_names == ["setosa", "versicolor", "virginica"]
+        expected = model.predict_proba(scaler.transform(PROBE_INPUT))
+        np.testing.assert_allclose(bundle.predict_proba(PROBE_INPUT), expected)
+
+    def test_predict_returns_indices_and_probabilities(self, trained_model_and_scaler):
+        """predict returns class indices alongside probabilities"""
+        model, scaler = trained_model_and_scaler
+        bundle = ServingBundle(model, scaler)
+
+        indices, proba = bundle.predict(PROBE_INPUT)
+
+        assert list(indices) == [0, 1, 2]
+        assert proba.shape == (3, 3)
+
+    def test_load_rejects_changed_probe_output(
+        self, trained_model_and_scaler, temp_dir
+    ):
+        """Loading fails when the model no longer reproduces the probe output"""
+        model, scaler = trained_model_and_scaler
+        path = ServingBundle(model, scaler).save(
+            os.path.join(temp_dir, "bundle.joblib")
+        )
+
+        payload = joblib.load(path)
+        payload["probe_proba"] = payload["probe_proba"][:, ::-1]
+        joblib.dump(payload, path)
+
+        with pytest.raises(BundleValidationError):
+            ServingBundle.load(path)
+
+    def test_validate_rejects_mismatched_target_names(self, trained_model_and_scaler):
+        """Validation fails when class names do not match the model classes"""
+        model, scaler = trained_model_and_scaler
+        bundle = ServingBundle(model, scaler, target_names=["setosa", "versicolor"])
+
+        with pytest.raises(BundleValidationError):
+            bundle.validate()
@@ -0,0 +1,114 @@
+"""
+Tests for held-out probability calibration
+"""
+
+import numpy as np
+import pytest
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.svm import SVC
+
+from src.data.data_loader import IrisDataProcessor
+from src.models.calibration import (
+    CalibratedModel,
+    expected_calibration_error,
+    uncalibrated_scores,
+)
+
+
+@pytest.fixture
+def iris_splits():
+    X, y = load_iris(return_X_y=True)
+    X_fit, X_rest, y_fit, y_rest = train_test_split(
+        X, y, test_size=0.5, stratify=y, random_state=0
+    )
+    X_cal, X_test, y_cal, y_test = train_test_split(
+        X_rest, y_rest, test_size=0.5, stratify=y_rest, random_state=0
+    )
+    return X_fit, y_fit, X_cal, y_cal, X_test, y_test
+
+
+class TestCalibratedModel:
+
+    @pytest.mark.parametrize("method", ["sigmoid", "isotonic"])
+    def test_svc_without_internal_cv(self, iris_splits, method):
+        """An SVC without probability=True gets probabilities that agree with predict"""
+        X_fit, y_fit, X_cal, y_cal, X_test, y_test = iris_splits
+        svc = SVC(random_state=42).fit(X_fit, y_fit)
+
+        model = CalibratedModel(svc, method=method).fit(X_cal, y_cal)
+        proba = model.predict_proba(X_test)
+
+        assert proba.shape == (len(X_test), 3)
+        np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+        np.testing.assert_array_equal(model.predict(X_test), proba.argmax(axis=1))
+        assert (model.predict(X_test) == y_test).mean() > 0.85
+
+    def test_unknown_method_is_rejected(self, iris_splits):
+        X_fit, y_fit, X_cal, y_cal, _, _ = iris_splits
+        with pytest.raises(ValueError):
+            CalibratedModel(SVC().fit(X_fit, y_fit), method="beta").fit(X_cal, y_cal)
+
+
+class TestTrainerCalibration:
+
+    @pytest.mark.parametrize(
+        "model",
+        [
+            LogisticRegression(random_state=42, max_iter=1000),
+            RandomForestClassifier(random_state=42, n_estimators=100),
+        ],
+        ids=["logistic_regression", "random_forest"],
+    )
+    def test_calibration_does_not_increase_ece(self, model):
+        """On the training pipeline's Iris split, calibration never makes ECE worse"""
+        from src.models.train import ModelTrainer
+
+        processor = IrisDataProcessor()
+        df, feature_names, _ = processor.load_data()
+        X_train, X_test, y_train, y_test = processor.preprocess_data(df, feature_names)
+        trainer = ModelTrainer(tracker=object())
+
+        served, metrics = trainer.calibrate_model(model, X_train, y_train)
+
+        assert "calibration_cv_ece" in metrics
+        assert expected_calibration_error(
+            y_test, served.predict_proba(X_test)
+        ) <= expected_calibration_error(y_test, uncalibrated_scores(model, X_test))
+
+    def test_calibration_savings_use_a_bounded_subsample(self, monkeypatch):
+        """The SVC reference fit is timed on at most CALIBRATION_REFERENCE_ROWS rows"""
+        from src.models import train
+
+        monkeypatch.setattr(train, "CALIBRATION_REFERENCE_ROWS", 60)
+        X, y = load_iris(return_X_y=True)
+        fitted_rows = []
+        original_fit = SVC.fit
+
+        def recording_fit(self, X, y, sample_weight=None):
+            fitted_rows.append(len(X))
+            return original_fit(self, X, y, sample_weight)
+
+        monkeypatch.setattr(SVC, "fit", recording_fit)
+        savings = train.ModelTrainer(tracker=object()).calibration_savings(
+            SVC(random_state=42), X, y
+        )
+
+        assert set(savings) == {
+            "internal_calibration_fit_seconds",
+            "held_out_calibration_fit_seconds",
+            "calibration_time_saved_seconds",
+        }
+        assert max(fitted_rows) == 60
+        assert savings["internal_calibration_fit_seconds"] > 0
+
+
+class TestExpectedCalibrationError:
+
+    def test_perfect_and_overconfident_predictions(self):
+        """Confident correct predictions have zero ECE; confident wrong ones near 1"""
+        proba = np.array([[1.0, 0.0], [0.0, 1.0]])
+        assert expected_calibration_error([0, 1], proba) == pytest.approx(0.0)
+        assert expected_calibration_error([1, 0], proba) == pytest.approx(1.0)
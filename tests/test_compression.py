@@ -0,0 +1,66 @@
+"""
+Tests for tree-ensemble compression
+"""
+
+import numpy as np
+import pytest
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+
+from src.models.compression import (
+    compress_ensemble,
+    forest_subset,
+    greedy_tree_order,
+    serialized_size,
+)
+
+
+@pytest.fixture(scope="module")
+def forest_and_data():
+    X, y = load_iris(return_X_y=True)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.3, stratify=y, random_state=0
+    )
+    forest = RandomForestClassifier(n_estimators=50, random_state=0).fit(
+        X_train, y_train
+    )
+    return forest, X_train, X_test, y_train, y_test
+
+
+class TestCompression:
+
+    def test_greedy_order_covers_every_tree(self, forest_and_data):
+        forest, X_train, _, y_train, _ = forest_and_data
+        order = greedy_tree_order(forest, X_train, y_train)
+        assert sorted(order) == list(range(50))
+
+    def test_subset_is_a_working_smaller_forest(self, forest_and_data):
+        """A subset predicts with its own trees and leaves the original untouched"""
+        forest, _, X_test, _, _ = forest_and_data
+        subset = forest_subset(forest, [0, 1, 2])
+
+        assert len(subset.estimators_) == 3 and len(forest.estimators_) == 50
+        np.testing.assert_allclose(subset.predict_proba(X_test).sum(axis=1), 1.0)
+
+    def test_compression_respects_the_accuracy_budget(self, forest_and_data):
+        """The chosen model is smaller and within the allowed accuracy loss"""
+        forest, X_train, X_test, y_train, y_test = forest_and_data
+
+        model, report = compress_ensemble(
+            forest, X_train, y_train, X_test, y_test, max_accuracy_loss=0.02
+        )
+
+        assert report["method"] != "none"
+        assert serialized_size(model) < serialized_size(forest)
+        assert report["accuracy"] >= report["baseline_accuracy"] - 0.02
+        assert (model.predict(X_test) == y_test).mean() == pytest.approx(
+            report["accuracy"]
+        )
+
+    def test_zero_budget_never_loses_accuracy(self, forest_and_data):
+        forest, X_train, X_test, y_train, y_test = forest_and_data
+        model, report = compress_ensemble(
+            forest, X_train, y_train, X_test, y_test, max_accuracy_loss=0.0
+        )
+        assert (model.predict(X_test) == y_test).mean() >= report["baseline_accuracy"]
@@ -0,0 +1,98 @@
+"""
+Tests for per-prediction explanations
+"""
+
+import itertools
+import os
+
+import numpy as np
+import pytest
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from src.models.artifact import export_artifact, load_artifact
+from src.models.bundle import ServingBundle
+from src.models.calibration import CalibratedModel
+from src.models.explain import build_explainer, explainer_for, sample_background
+
+
+@pytest.fixture(scope="module")
+def iris_scaled():
+    X, y = load_iris(return_X_y=True)
+    scaler = StandardScaler().fit(X)
+    return scaler, scaler.transform(X), y
+
+
+def assert_additive(explainer, X, expected):
+    base_values, contributions = explainer.explain(X)
+    np.testing.assert_allclose(
+        base_values + contributions.sum(axis=2), expected, atol=1e-10
+    )
+
+
+class TestExplainers:
+
+    def test_linear_contributions_sum_to_the_logits(self, iris_scaled):
+        _, X, y = iris_scaled
+        model = LogisticRegression(max_iter=1000).fit(X, y)
+        explainer = build_explainer(model, sample_background(X))
+
+        assert explainer.method == "linear"
+        assert_additive(explainer, X, model.decision_function(X))
+
+    def test_tree_paths_sum_to_forest_probabilities(self, iris_scaled, temp_dir):
+        scaler, X, y = iris_scaled
+        forest = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+        explainer = build_explainer(forest)
+
+        assert explainer.method == "tree_path"
+        assert_additive(explainer, X, forest.predict_proba(X))
+
+        # The memory-mapped runtime of the calibrated forest explains the same way
+        path = os.path.join(temp_dir, "artifact")
+        export_artifact(CalibratedModel(forest).fit(X, y), scaler, path=path)
+        runtime_explainer = build_explainer(load_artifact(path).model)
+        assert runtime_explainer.output == "probability (before calibration)"
+        np.testing.assert_allclose(
+            runtime_explainer.explain(X)[1], explainer.explain(X)[1], atol=1e-12
+        )
+
+    def test_shapley_values_match_permutation_enumeration(self, iris_scaled):
+        _, X, y = iris_scaled
+        model = CalibratedModel(SVC(random_state=0).fit(X, y)).fit(X, y)
+        background = sample_background(X, size=8)
+        explainer = build_explainer(model, background)
+
+        assert explainer.method == "shapley"
+        assert_additive(explainer, X[:20], model.predict_proba(X[:20]))
+
+        def value(coalition, x):
+            mask = np.isin(np.arange(X.shape[1]), list(coalition))
+            return model.predict_proba(np.where(mask, x, background)).mean(axis=0)
+
+        x = X[70]
+        expected = np.zeros((X.shape[1], 3))
+        orders = list(itertools.permutations(range(X.shape[1])))
+        for order in orders:
+            for position, feature in enumerate(order):
+                expected[feature] += value(order[: position + 1], x) - value(
+                    order[:position], x
+                )
+        np.testing.assert_allclose(
+            explainer.explain(X[70:71])[1][0], expected.T / len(orders), atol=1e-12
+        )
+
+    def test_explainer_is_cached_per_model_version(self, iris_scaled):
+        scaler, X, y = iris_scaled
+        bundle = ServingBundle(
+            LogisticRegression(max_iter=1000).fit(X, y), scaler, version="lr-1"
+        )
+
+        assert explainer_for(bundle) is explainer_for(bundle)
+        reloaded = ServingBundle(
+            RandomForestClassifier(n_estimators=5).fit(X, y), scaler, version="rf-2"
+        )
+        assert explainer_for(reloaded).method == "tree_path"
@@ -0,0 +1,177 @@
+"""
+Tests for feedback ingestion and the windowed confusion matrix
+"""
+
+import asyncio
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.monitoring.feedback import (
+    WindowedConfusionMatrix,
+    ensure_feedback_columns,
+    load_feedback,
+    store_feedback,
+)
+
+CLASS_NAMES = ["setosa", "versicolor", "virginica"]
+
+
+class FakeClock:
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def create_legacy_db(db_path, predictions):
+    """Predictions table as created before feedback columns existed"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT,
+            sepal_length REAL, sepal_width REAL, petal_length REAL, petal_width REAL,
+            prediction TEXT, probability REAL, all_probabilities TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO predictions (timestamp, prediction, probability) "
+        "VALUES (?, ?, 0.9)",
+        [(datetime.now().isoformat(), prediction) for prediction in predictions],
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestWindowedConfusionMatrix:
+
+    def test_accuracy_and_per_class_metrics(self):
+        matrix = WindowedConfusionMatrix(3, clock=FakeClock())
+        matrix.add_many([0, 1, 1, 2], [0, 1, 2, 2])
+
+        assert matrix.accuracy() == pytest.approx(0.75)
+        summary = matrix.summary(CLASS_NAMES)
+        assert summary["confusion_matrix"] == [[1, 0, 0], [0, 1, 0], [0, 1, 1]]
+        assert summary["per_class"]["versicolor"]["precision"] == pytest.approx(0.5)
+        assert summary["per_class"]["virginica"]["recall"] == pytest.approx(0.5)
+
+    def test_old_intervals_expire(self):
+        """Counts leave the window once their interval is older than the horizon"""
+        clock = FakeClock()
+        matrix = WindowedConfusionMatrix(3, bucket_seconds=10, n_buckets=6, clock=clock)
+        matrix.add_many([0, 0], [0, 1])
+        clock.now += 30
+        matrix.add(2, 2)
+
+        assert matrix.window(10).sum() == 1
+        assert matrix.accuracy() == pytest.approx(2 / 3)
+
+        clock.now += 40
+        assert matrix.accuracy() == pytest.approx(1.0)
+        assert matrix.count == 1
+
+        clock.now += 60
+        assert matrix.accuracy() is None
+
+    def test_timestamped_labels_outside_the_window_are_dropped(self):
+        clock = FakeClock()
+        matrix = WindowedConfusionMatrix(3, bucket_seconds=10, n_buckets=6, clock=clock)
+        counted = matrix.add_many(
+            [0, 1], [0, 1], timestamps=[clock.now - 30, clock.now - 600]
+        )
+
+        assert counted == 1
+        assert matrix.window(60).sum() == 1
+
+
+class TestFeedbackStore:
+
+    def test_labels_attach_once_and_reload(self, temp_dir):
+        db_path = os.path.join(temp_dir, "predictions.db")
+        create_legacy_db(db_path, ["setosa", "versicolor"])
+        conn = sqlite3.connect(db_path)
+        ensure_feedback_columns(conn)
+        conn.close()
+
+        matched, not_found, duplicates = store_feedback(
+            db_path, {1: "setosa", 2: "virginica", 99: "setosa"}
+        )
+        assert sorted(matched) == [
+            (1, "setosa", "setosa"),
+            (2, "versicolor", "virginica"),
+        ]
+        assert not_found == [99] and duplicates == []
+
+        matched, _, duplicates = store_feedback(db_path, {1: "versicolor"})
+        assert matched == [] and duplicates == [1]
+
+        rows = load_feedback(db_path, since=0)
+        assert sorted(row[:2] for row in rows) == [
+            ("setosa", "setosa"),
+            ("versicolor", "virginica"),
+        ]
+
+
+class TestPredictionHistory:
+
+    def test_history_rows_carry_ids_for_feedback(self, temp_dir, monkeypatch):
+        """Single and batch predictions come back with the same columns, ids included"""
+        from src.api import main as api
+
+        monkeypatch.chdir(temp_dir)
+        os.makedirs("logs")
+        api.init_database()
+        api.log_prediction(
+            api.IrisFeatures(
+                sepal_length=5.1, sepal_width=3.5, petal_length=1.4, petal_width=0.2
+            ),
+            "setosa",
+            0.9,
+            {"setosa": 0.9, "versicolor": 0.05, "virginica": 0.05},
+        )
+        api.log_predictions_batch(
+            np.array([[6.9, 3.1, 5.4, 2.1]]),
+            np.array([2]),
+            np.array([[0.05, 0.15, 0.8]]),
+            datetime.now().isoformat(),
+        )
+
+        batch_row, single_row = asyncio.run(api.get_prediction_history(limit=10))[
+            "history"
+        ]
+        assert set(batch_row) == set(single_row)
+        assert {"id", "true_label", "feedback_timestamp"} <= set(single_row)
+
+        store_feedback(
+            os.path.join("logs", "predictions.db"), {single_row["id"]: "setosa"}
+        )
+        history = asyncio.run(api.get_prediction_history(limit=10))["history"]
+        assert [row["true_label"] for row in history] == [None, "setosa"]
+
+    def test_batch_logging_returns_row_ids(self, temp_dir, monkeypatch):
+        """Batch rows get contiguous ids that /feedback can refer to"""
+        from src.api import main as api
+
+        monkeypatch.chdir(temp_dir)
+        os.makedirs("logs")
+        api.init_database()
+        X = np.array([[5.1, 3.5, 1.4, 0.2], [6.9, 3.1, 5.4, 2.1]])
+        proba = np.array([[0.9, 0.05, 0.05], [0.05, 0.15, 0.8]])
+
+        first = api.log_predictions_batch(
+            X, np.array([0, 2]), proba, datetime.now().isoformat()
+        )
+        second = api.log_predictions_batch(
+            X, np.array([0, 2]), proba, datetime.now().isoformat()
+        )
+
+        assert first.tolist() == [1, 2] and second.tolist() == [3, 4]
+        matched, not_found, _ = store_feedback(
+            os.path.join("logs", "predictions.db"), {4: "virginica"}
+        )
+        assert matched == [(4, "virginica", "virginica")] and not_found == []
@@ -0,0 +1,87 @@
+"""
+Tests for inference-cost profiling and cost-aware model selection
+"""
+
+import tracemalloc
+
+import pytest
+from sklearn.datasets import load_iris
+from sklearn.linear_model import LogisticRegression
+
+from src.models.inference_cost import profile_inference, select_model
+
+
+def _results(**models):
+    return {
+        name: {
+            "model": None,
+            "metrics": {"accuracy": accuracy, "latency_single_p99_ms": latency},
+        }
+        for name, (accuracy, latency) in models.items()
+    }
+
+
+class TestProfileInference:
+
+    def test_reports_latency_size_and_memory(self):
+        X, y = load_iris(return_X_y=True)
+        model = LogisticRegression(max_iter=1000).fit(X, y)
+
+        cost = profile_inference(
+            model, X[:10], single_rounds=20, batch_size=100, batch_rounds=2
+        )
+
+        assert 0 < cost["latency_single_p50_ms"] <= cost["latency_single_p99_ms"]
+        assert cost["batch_rows_per_second"] > 0
+        assert cost["model_size_bytes"] > 0
+        assert cost["model_memory_bytes"] > 0
+
+    def test_outer_trace_keeps_running_and_memory_matches(self):
+        X, y = load_iris(return_X_y=True)
+        model = LogisticRegression(max_iter=1000).fit(X, y)
+
+        untraced = profile_inference(
+            model, X[:10], single_rounds=20, batch_size=100, batch_rounds=2
+        )
+        tracemalloc.start()
+        try:
+            # The outer trace's earlier peak must not count towards the model
+            bytearray(10_000_000)
+            traced = profile_inference(
+                model, X[:10], single_rounds=20, batch_size=100, batch_rounds=2
+            )
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+        assert traced["model_memory_bytes"] == pytest.approx(
+            untraced["model_memory_bytes"], rel=0.1
+        )
+
+
+class TestSelectModel:
+
+    def test_accuracy_policy_ignores_latency(self):
+        results = _results(forest=(0.97, 5.0), linear=(0.965, 0.1))
+        assert select_model(results, policy="accuracy") == "forest"
+
+    def test_near_ties_go_to_the_faster_model(self):
+        """Within epsilon the lowest latency wins; outside it accuracy still rules"""
+        results = _results(forest=(0.97, 5.0), linear=(0.965, 0.1), tiny=(0.90, 0.05))
+        assert select_model(results, accuracy_epsilon=0.01) == "linear"
+        assert select_model(results, accuracy_epsilon=0.0) == "forest"
+
+    def test_latency_budget_filters_first(self):
+        results = _results(forest=(0.99, 5.0), linear=(0.95, 0.1))
+        assert (
+            select_model(results, accuracy_epsilon=0.0, latency_budget_ms=1.0)
+            == "linear"
+        )
+        assert (
+            select_model(results, accuracy_epsilon=0.0, latency_budget_ms=0.01)
+            == "forest"
+        )
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            select_model(_results(a=(1.0, 1.0)), policy="fastest")
@@ -0,0 +1,75 @@
+"""
+Tests for hot-path latency instrumentation
+"""
+
+import os
+
+from src.api.instrumentation import RequestProfiler, StageTimer, bind_stage_histograms
+
+
+class RecordingChild:
+    """Stand-in for a bound histogram child"""
+
+    def __init__(self):
+        self.observations = []
+
+    def observe(self, value):
+        self.observations.append(value)
+
+
+class TestStageTimer:
+
+    def test_marks_observe_consecutive_spans(self):
+        """Each mark observes the time since the previous mark under its stage"""
+        children = {"scale": RecordingChild(), "inference": RecordingChild()}
+        timer = StageTimer(children)
+
+        timer.mark("scale")
+        timer.mark("inference")
+
+        assert len(children["scale"].observations) == 1
+        assert len(children["inference"].observations) == 1
+        assert all(v >= 0 for child in children.values() for v in child.observations)
+
+    def test_bind_stage_histograms_covers_stages(self):
+        """Pre-bound children exist for every requested stage"""
+        children = bind_stage_histograms("test-version", stages=("scale", "inference"))
+        assert set(children) == {"scale", "inference"}
+
+
+class TestRequestProfiler:
+
+    def test_disabled_profiler_never_starts(self):
+        """No profile is taken while the profiler is disabled"""
+        profiler = RequestProfiler(enabled=False, sample_rate=1.0)
+        assert profiler.start() is None
+
+    def test_slow_request_is_dumped(self, temp_dir):
+        """A sampled request over the threshold is written to the output directory"""
+        profiler = RequestProfiler(
+            enabled=True, sample_rate=1.0, slow_threshold_ms=0, output_dir=temp_dir
+        )
+
+        profile = profiler.start()
+        sum(range(1000))
+        path = profiler.stop(profile, elapsed_seconds=0.1)
+
+        assert path is not None and os.path.exists(path)
+        assert profiler.recent[-1]["elapsed_ms"] == 100.0
+
+    def test_fast_request_is_not_dumped(self, temp_dir):
+        """Requests under the threshold are discarded"""
+        profiler = RequestProfiler(
+            enabled=True, sample_rate=1.0, slow_threshold_ms=1000, output_dir=temp_dir
+        )
+
+        profile = profiler.start()
+        assert profiler.stop(profile, elapsed_seconds=0.001) is None
+        assert os.listdir(temp_dir) == []
+
+    def test_configure_toggles_at_runtime(self):
+        """configure updates only the given settings"""
+        profiler = RequestProfiler(enabled=False, sample_rate=0.5)
+        profiler.configure(enabled=True)
+        assert profiler.status()["enabled"] is True
+        assert profiler.status()["sample_rate"] == 0.5
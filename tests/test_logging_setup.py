@@ -0,0 +1,91 @@
+"""
+Tests for the queued structured logging setup
+"""
+
+import json
+import logging
+import os
+import queue
+
+import pytest
+
+from src.monitoring.logging_setup import (
+    DroppingQueueHandler,
+    SamplingFilter,
+    setup_logging,
+    stop_logging,
+    REQUEST_LOGGER_NAME,
+)
+
+
+@pytest.fixture
+def restore_root_logger():
+    """Put the root logger back the way pytest configured it"""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    logging.getLogger(REQUEST_LOGGER_NAME).filters.clear()
+
+
+class TestSetupLogging:
+
+    def test_json_records_reach_the_log_file(self, temp_dir, restore_root_logger):
+        """Records are written as JSON lines with extra fields once the queue drains"""
+        log_file = os.path.join(temp_dir, "api.log")
+        setup_logging(log_file=log_file, log_format="json")
+
+        logging.getLogger("test").info(
+            "Prediction made", extra={"prediction": "setosa"}
+        )
+        stop_logging()
+
+        with open(log_file) as f:
+            record = json.loads(f.readline())
+        assert record["message"] == "Prediction made"
+        assert record["prediction"] == "setosa"
+
+    def test_request_logs_are_sampled(self, temp_dir, restore_root_logger):
+        """With a zero sample rate only warnings from the request logger are kept"""
+        log_file = os.path.join(temp_dir, "api.log")
+        setup_logging(log_file=log_file, log_format="text", sample_rate=0.0)
+
+        request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
+        request_logger.info("sampled out")
+        request_logger.warning("always kept")
+        logging.getLogger("test").info("not a request log")
+        stop_logging()
+
+        with open(log_file) as f:
+            content = f.read()
+        assert "sampled out" not in content
+        assert "always kept" in content
+        assert "not a request log" in content
+
+
+class TestHandlers:
+
+    def test_full_queue_drops_records(self):
+        """Records beyond the queue bound are counted and dropped instead of blocking"""
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 1, "message", None, None
+        )
+
+        handler.handle(record)
+        handler.handle(record)
+
+        assert handler.dropped == 1
+
+    def test_sampling_filter_passes_everything_at_full_rate(self):
+        """A sample rate of 1 keeps every record"""
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 1, "message", None, None
+        )
+        assert SamplingFilter(1.0).filter(record)
+        assert not SamplingFilter(0.0).filter(record)
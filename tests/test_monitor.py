@@ -0,0 +1,215 @@
+"""
+Tests for model monitoring
+"""
+
+import asyncio
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from prometheus_client import CollectorRegistry
+
+from src.monitoring.monitor import (
+    ModelMonitor,
+    PerformanceMonitor,
+    run_background_monitoring,
+)
+
+
+def create_predictions_db(path, rows):
+    """Predictions table of (timestamp, features, prediction, probability) rows"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            sepal_length REAL,
+            sepal_width REAL,
+            petal_length REAL,
+            petal_width REAL,
+            prediction TEXT,
+            probability REAL,
+            all_probabilities TEXT
+        )
+    """)
+    conn.executemany(
+        """
+        INSERT INTO predictions (timestamp, sepal_length, sepal_width, petal_length,
+        petal_width, prediction, probability) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def monitor(temp_dir):
+    """Monitor on its own registry and an empty database path"""
+    return ModelMonitor(
+        db_path=os.path.join(temp_dir, "predictions.db"), registry=CollectorRegistry()
+    )
+
+
+class TestModelMonitor:
+
+    def test_record_prediction_uses_bound_class_counters(self, monitor):
+        """record_prediction counts per class by index"""
+        monitor.bind_classes(["setosa", "versicolor", "virginica"])
+
+        monitor.record_prediction(1, 0.9, 0.001)
+        monitor.record_prediction(1, 0.8, 0.002)
+
+        assert monitor.metrics["total_predictions"]._value.get() == 2
+        assert (
+            monitor.metrics["class_distribution"]
+            .labels(class_name="versicolor")
+            ._value.get()
+            == 2
+        )
+        assert (
+            monitor.metrics["class_distribution"]
+            .labels(class_name="setosa")
+            ._value.get()
+            == 0
+        )
+
+    def test_prediction_stats_group_by_class(self, monitor):
+        """Stats aggregate count and confidence per predicted class"""
+        now = datetime.now().isoformat()
+        create_predictions_db(
+            monitor.db_path,
+            [
+                (now, 5.1, 3.5, 1.4, 0.2, "setosa", 0.9),
+                (now, 5.0, 3.4, 1.5, 0.2, "setosa", 0.7),
+                (now, 6.9, 3.1, 5.4, 2.1, "virginica", 0.6),
+            ],
+        )
+
+        stats = {row["prediction"]: row for row in monitor.get_prediction_stats()}
+
+        assert stats["setosa"]["count"] == 2
+        assert stats["setosa"]["avg_confidence"] == pytest.approx(0.8)
+        assert stats["virginica"]["max_confidence"] == pytest.approx(0.6)
+
+    def test_check_data_drift_compares_feature_means(self, monitor):
+        """Drift is flagged when recent feature means move beyond the threshold"""
+        recent = datetime.now().isoformat()
+        baseline = (datetime.now() - timedelta(days=10)).isoformat()
+        create_predictions_db(
+            monitor.db_path,
+            [
+                (baseline, 5.0, 3.0, 1.5, 0.2, "setosa", 0.9),
+                (recent, 5.0, 3.0, 3.0, 0.2, "setosa", 0.9),
+            ],
+        )
+
+        drift = monitor.check_data_drift(threshold=0.1)
+
+        assert drift["status"] == "success"
+        assert drift["drift_detected"] is True
+        assert drift["feature_changes"]["petal_length"] == pytest.approx(1.0)
+        assert drift["feature_changes"]["sepal_length"] == pytest.approx(0.0)
+        assert drift["recent_samples"] == 1
+
+    def test_check_data_drift_without_data(self, monitor):
+        """An empty window reports insufficient data"""
+        create_predictions_db(monitor.db_path, [])
+        assert monitor.check_data_drift()["status"] == "insufficient_data"
+
+    def test_batch_latency_is_not_a_per_prediction_sample(self, monitor):
+        """A batch's latency goes to the batch histogram; its rows are still counted"""
+        monitor.bind_classes(["setosa", "versicolor", "virginica"])
+
+        monitor.record_batch(np.array([0, 2, 2]), 0.5)
+
+        assert monitor.metrics["total_predictions"]._value.get() == 3
+        assert monitor.metrics["prediction_latency"]._sum.get() == 0
+        assert monitor.metrics["batch_latency"]._sum.get() == 0.5
+
+    def test_recorded_predictions_feed_the_buffer(self, monitor):
+        """record_* features are buffered; recent drift uses the SQLite baseline"""
+        monitor.bind_classes(["setosa", "versicolor", "virginica"])
+        monitor.record_prediction(
+            0, 0.9, 0.001, np.array([5.0, 3.0, 3.0, 0.2]), np.array([0.9, 0.05, 0.05])
+        )
+        monitor.record_batch(
+            np.array([0]),
+            0.001,
+            np.array([[5.0, 3.0, 3.0, 0.2]]),
+            np.array([[0.9, 0.05, 0.05]]),
+        )
+        create_predictions_db(
+            monitor.db_path,
+            [
+                (
+                    (datetime.now() - timedelta(days=10)).isoformat(),
+                    5.0,
+                    3.0,
+                    1.5,
+                    0.2,
+                    "setosa",
+                    0.9,
+                ),
+            ],
+        )
+        monitor.check_data_drift()
+
+        assert monitor.live_stats()["count"] == 2
+        drift = monitor.check_recent_drift(window_seconds=60)
+        assert drift["drift_detected"] is True
+        assert drift["feature_changes"]["petal_length"] == pytest.approx(1.0)
+
+    def test_feedback_sets_real_accuracy(self, monitor):
+        """Feedback sets model_accuracy; the cycle keeps it over the confidence proxy"""
+        monitor.bind_classes(["setosa", "versicolor", "virginica"])
+        monitor.record_feedback(np.array([0, 1, 2, 2]), np.array([0, 1, 1, 2]))
+        create_predictions_db(
+            monitor.db_path,
+            [
+                (datetime.now().isoformat(), 5.1, 3.5, 1.4, 0.2, "setosa", 0.99),
+            ],
+        )
+
+        monitor.run_monitoring_cycle()
+
+        assert monitor.metrics["model_accuracy"]._value.get() == pytest.approx(0.75)
+        assert monitor.metrics["class_recall"].labels(
+            class_name="versicolor"
+        )._value.get() == pytest.approx(0.5)
+        assert monitor.last_cycle["feedback"]["count"] == 4
+
+    def test_background_task_runs_cycle_and_cancels(self, monitor):
+        """The asyncio monitoring task runs a cycle and stops cleanly on cancel"""
+        create_predictions_db(
+            monitor.db_path,
+            [
+                (datetime.now().isoformat(), 5.1, 3.5, 1.4, 0.2, "setosa", 0.75),
+            ],
+        )
+
+        async def run_once():
+            task = asyncio.create_task(run_background_monitoring(monitor, interval=60))
+            while not monitor.last_cycle:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run_once())
+
+        assert monitor.metrics["model_accuracy"]._value.get() == pytest.approx(0.75)
+
+
+class TestPerformanceMonitor:
+
+    def test_error_rate_marks_degraded(self):
+        """Health degrades once the error rate reaches 5%"""
+        monitor = PerformanceMonitor()
+        for _ in range(9):
+            monitor.log_request(success=True)
+        monitor.log_request(success=False)
+
+        assert monitor.get_health_status()["status"] == "degraded"
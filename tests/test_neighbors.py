@@ -0,0 +1,57 @@
+"""
+Tests for the similar-specimen neighbor index
+"""
+
+import os
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+from src.data.data_loader import IrisDataProcessor
+from src.data.neighbors import NeighborIndex
+
+
+class TestNeighborIndex:
+
+    def test_pruned_search_matches_brute_force(self):
+        """Skipping leaves by their bounds never changes the answer, at any leaf size"""
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(5000, 4))
+        y = rng.integers(0, 3, size=len(X))
+        queries = np.vstack(
+            [rng.normal(size=(50, 4)), X[:5], rng.normal(scale=5, size=(5, 4))]
+        )
+        expected_distances, expected_rows = (
+            NearestNeighbors(n_neighbors=7).fit(X).kneighbors(queries)
+        )
+
+        for leaf_size in (8, 256, 10000):
+            index = NeighborIndex.build(X, y, leaf_size=leaf_size)
+            distances, positions = index.query(queries, k=7)
+            np.testing.assert_array_equal(index.row_ids[positions], expected_rows)
+            np.testing.assert_array_equal(index.labels[positions], y[expected_rows])
+            np.testing.assert_allclose(distances, expected_distances, atol=1e-9)
+
+    def test_k_larger_than_index(self):
+        index = NeighborIndex.build(np.eye(3), [0, 1, 2])
+        distances, positions = index.query(np.zeros((1, 3)), k=10)
+        assert positions.shape == (1, 3)
+        assert np.all(np.diff(distances[0]) >= 0)
+
+    def test_data_pipeline_saves_a_memory_mapped_index(self, temp_dir):
+        processor = IrisDataProcessor()
+        df, feature_names, _ = processor.load_data()
+        X_train, X_test, y_train, y_test = processor.preprocess_data(df, feature_names)
+        processor.save_data(X_train, X_test, y_train, y_test, data_dir=temp_dir)
+
+        index = NeighborIndex.load(os.path.join(temp_dir, "neighbors"))
+        assert isinstance(index.features, np.memmap)
+        assert len(index) == len(X_train)
+
+        distances, positions = index.query(X_train[:1], k=1)
+        position = positions[0, 0]
+        assert index.row_ids[position] == 0 and distances[0, 0] < 1e-6
+        np.testing.assert_allclose(
+            index.raw_features[position],
+            processor.scaler.inverse_transform(X_train[:1])[0],
+        )
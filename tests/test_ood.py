@@ -0,0 +1,109 @@
+"""
+Tests for out-of-distribution scoring
+"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+from prometheus_client import CollectorRegistry
+from sklearn.datasets import load_iris
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from src.models.artifact import export_artifact, load_artifact
+from src.models.bundle import ServingBundle, load_serving_bundle
+from src.models.ood import OODScorer
+from src.monitoring.monitor import ModelMonitor
+from src.monitoring.sketch import QuantileTracker
+
+
+@pytest.fixture
+def fitted():
+    X, y = load_iris(return_X_y=True)
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    model = LogisticRegression(max_iter=1000).fit(X_scaled, y)
+    return X, scaler, model, OODScorer.fit(X_scaled, y)
+
+
+class TestOODScorer:
+
+    def test_flags_implausible_rows_only(self, fitted):
+        X, scaler, _, ood = fitted
+        in_distribution = ood.flags(ood.score(scaler.transform(X))).mean()
+        # Long sepals on a tiny petal: inside the API bounds, unlike any iris
+        implausible = ood.score(
+            scaler.transform([[7.9, 2.0, 1.0, 2.5], [0.5, 9.0, 9.0, 0.1]])
+        )
+
+        assert in_distribution < 0.02
+        assert ood.flags(implausible).all()
+
+    def test_matches_explicit_mahalanobis(self, fitted):
+        X, scaler, _, ood = fitted
+        X_scaled = scaler.transform(X[:5])
+        precision = ood.whitening.T @ ood.whitening
+        means = np.linalg.solve(ood.whitening, ood.whitened_means.T).T
+        expected = np.sqrt(
+            np.min(
+                [
+                    np.einsum(
+                        "ij,jk,ik->i", X_scaled - mean, precision, X_scaled - mean
+                    )
+                    for mean in means
+                ],
+                axis=0,
+            )
+        )
+
+        np.testing.assert_allclose(ood.score(X_scaled), expected, rtol=1e-9)
+
+    def test_single_row_stays_in_microseconds(self, fitted):
+        X, scaler, _, ood = fitted
+        row = scaler.transform(X[:1])
+        ood.score(row)
+        start = time.perf_counter()
+        for _ in range(1000):
+            ood.score(row)
+        assert (time.perf_counter() - start) / 1000 < 200e-6
+
+
+class TestOODPersistence:
+
+    def test_bundle_artifact_and_npz_keep_the_scorer(self, temp_dir, fitted):
+        X, scaler, model, ood = fitted
+        expected = ood.score(scaler.transform(X))
+
+        bundle_path = os.path.join(temp_dir, "bundle.joblib")
+        ServingBundle(model, scaler, ood=ood).save(bundle_path)
+        np.testing.assert_allclose(
+            ServingBundle.load(bundle_path).ood_scores(X), expected
+        )
+
+        artifact_path = os.path.join(temp_dir, "artifact")
+        export_artifact(model, scaler, path=artifact_path, ood=ood)
+        np.testing.assert_allclose(load_artifact(artifact_path).ood_scores(X), expected)
+
+        # Bundles saved without a scorer pick up the one stored next to the model
+        plain_path = os.path.join(temp_dir, "plain.joblib")
+        ServingBundle(model, scaler).save(plain_path)
+        ood_path = ood.save(os.path.join(temp_dir, "ood_scorer.npz"))
+        bundle = load_serving_bundle(plain_path, artifact_path=None, ood_path=ood_path)
+        np.testing.assert_allclose(bundle.ood_scores(X), expected)
+
+
+def test_monitor_tracks_windowed_ood_rate(temp_dir):
+    monitor = ModelMonitor(
+        db_path=os.path.join(temp_dir, "predictions.db"),
+        registry=CollectorRegistry(),
+        quantiles=QuantileTracker(),
+    )
+    monitor.record_ood(np.array([0.5, 1.0, 1.5, 9.0]), threshold=4.0)
+    monitor.record_ood(np.array([12.0]), threshold=4.0)
+
+    stats = monitor.ood_stats()
+    assert stats["flagged_total"] == 2 and stats["rate_total"] == pytest.approx(0.4)
+    assert stats["window_rate"] == pytest.approx(0.4)
+    assert monitor.metrics["ood_predictions"]._value.get() == 2
@@ -0,0 +1,75 @@
+"""
+Tests for the in-memory recent-prediction buffer
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from src.monitoring.ring_buffer import PredictionRingBuffer
+
+TARGET_NAMES = ["setosa", "versicolor", "virginica"]
+
+
+def _rows(n, offset=0):
+    features = np.arange(offset, offset + n, dtype=np.float64)[:, None].repeat(
+        4, axis=1
+    )
+    class_indices = np.arange(offset, offset + n) % 3
+    probabilities = np.eye(3)[class_indices]
+    return features, class_indices, probabilities
+
+
+class TestPredictionRingBuffer:
+
+    def test_wraps_and_keeps_the_newest_rows_in_order(self):
+        """Appends and batches past capacity keep the last rows, oldest first"""
+        buffer = PredictionRingBuffer(capacity=5)
+        features, class_indices, probabilities = _rows(3)
+        for i in range(3):
+            buffer.append(features[i], class_indices[i], probabilities[i])
+        buffer.extend(*_rows(4, offset=3))
+
+        kept, kept_classes, _, _ = buffer.snapshot()
+        assert len(buffer) == 5 and buffer.total_written == 7
+        assert kept[:, 0].tolist() == [2, 3, 4, 5, 6]
+        assert kept_classes.tolist() == [2, 0, 1, 2, 0]
+
+    def test_batch_larger_than_capacity(self):
+        """Only the tail of an oversized batch is kept"""
+        buffer = PredictionRingBuffer(capacity=4)
+        buffer.extend(*_rows(10))
+        assert buffer.snapshot()[0][:, 0].tolist() == [6, 7, 8, 9]
+
+    def test_stats_and_window(self):
+        """Stats cover the whole buffer or only rows inside the window"""
+        buffer = PredictionRingBuffer(capacity=10)
+        buffer.extend(*_rows(2), timestamp=time.time() - 3600)
+        buffer.extend(*_rows(3, offset=2))
+
+        assert buffer.stats(TARGET_NAMES)["count"] == 5
+        window = buffer.stats(TARGET_NAMES, window_seconds=60)
+        assert window["count"] == 3
+        assert window["class_counts"] == {"setosa": 1, "versicolor": 1, "virginica": 1}
+        assert window["avg_confidence"] == pytest.approx(1.0)
+
+    def test_drift_against_older_rows_and_baseline(self):
+        """Short-window drift compares with older buffered rows or a given baseline"""
+        buffer = PredictionRingBuffer(capacity=10)
+        buffer.extend(
+            np.full((3, 4), 5.0),
+            np.zeros(3, dtype=int),
+            np.tile([1.0, 0, 0], (3, 1)),
+            timestamp=time.time() - 3600,
+        )
+        buffer.extend(
+            np.full((2, 4), 6.0), np.zeros(2, dtype=int), np.tile([1.0, 0, 0], (2, 1))
+        )
+
+        drift = buffer.drift(window_seconds=60)
+        assert drift["drift_detected"]
+        assert drift["feature_changes"]["sepal_length"] == pytest.approx(0.2)
+        assert not buffer.drift(window_seconds=60, baseline_means=[6.0] * 4)[
+            "drift_detected"
+        ]
@@ -0,0 +1,55 @@
+"""
+Tests for /predict response serialization
+"""
+
+import json
+
+import numpy as np
+
+from src.api.serialization import PredictionEncoder, BINARY_MEDIA_TYPE
+
+TARGET_NAMES = ["setosa", "versicolor", "virginica"]
+
+
+class TestPredictionEncoder:
+
+    def test_json_body_keeps_response_shape(self):
+        """The JSON body has the same fields as the PredictionResponse model"""
+        encoder = PredictionEncoder(TARGET_NAMES)
+        proba = np.array([0.1, 0.7, 0.2])
+        all_probabilities = encoder.probabilities(proba)
+
+        response = encoder.encode(
+            "json", 1, proba, all_probabilities, "2024-01-01T00:00:00"
+        )
+        body = json.loads(response.body)
+
+        assert body == {
+            "prediction": "versicolor",
+            "probability": 0.7,
+            "all_probabilities": {"setosa": 0.1, "versicolor": 0.7, "virginica": 0.2},
+            "timestamp": "2024-01-01T00:00:00",
+        }
+        assert response.media_type == "application/json"
+
+    def test_array_body(self):
+        """The array form is the class index followed by the probabilities"""
+        encoder = PredictionEncoder(TARGET_NAMES)
+        proba = np.array([0.1, 0.7, 0.2])
+
+        response = encoder.encode("array", 1, proba, encoder.probabilities(proba), "ts")
+
+        assert json.loads(response.body) == [1, 0.1, 0.7, 0.2]
+
+    def test_binary_body_roundtrip(self):
+        """The binary form packs a uint8 index and float64 probabilities"""
+        encoder = PredictionEncoder(TARGET_NAMES)
+        proba = np.array([0.1, 0.7, 0.2])
+
+        response = encoder.encode(
+            "binary", 1, proba, encoder.probabilities(proba), "ts"
+        )
+
+        assert response.media_type == BINARY_MEDIA_TYPE
+        assert len(response.body) == 1 + 3 * 8
+        assert encoder.decode_binary(response.body) == (1, [0.1, 0.7, 0.2])
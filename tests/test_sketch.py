@@ -0,0 +1,129 @@
+"""
+Tests for quantile sketches and SLO burn-rate evaluation
+"""
+
+import numpy as np
+import pytest
+
+from src.monitoring.sketch import DDSketch, QuantileTracker, SlidingWindowSketch
+from src.monitoring.slo import SLOBurnRateCollector, SLOEvaluator, SLOObjective
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDDSketch:
+
+    def test_quantiles_within_relative_accuracy(self):
+        """Sub-millisecond latencies are resolved to the configured relative error"""
+        values = np.random.default_rng(0).lognormal(
+            mean=np.log(2e-4), sigma=1.0, size=20000
+        )
+        sketch = DDSketch(relative_accuracy=0.01)
+        sketch.add_many(values[:10000])
+        for value in values[10000:]:
+            sketch.add(value)
+
+        for q in (0.5, 0.99, 0.999):
+            assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.02)
+        assert sketch.count == 20000
+
+    def test_merge_matches_single_sketch(self):
+        """Merging two halves gives the same quantiles as one sketch over everything"""
+        values = np.linspace(0.001, 1.0, 1000)
+        whole, left, right = DDSketch(), DDSketch(), DDSketch()
+        whole.add_many(values)
+        left.add_many(values[:500])
+        right.add_many(values[500:])
+        left.merge(right)
+
+        assert left.count == whole.count
+        assert left.quantile(0.99) == whole.quantile(0.99)
+
+    def test_bins_are_bounded(self):
+        """Collapsing keeps the bin count under max_bins and the top quantiles intact"""
+        sketch = DDSketch(relative_accuracy=0.01, max_bins=64)
+        values = np.logspace(-8, 2, 5000)
+        sketch.add_many(values)
+
+        assert len(sketch.bins) <= 64
+        assert sketch.quantile(0.999) == pytest.approx(
+            np.quantile(values, 0.999), rel=0.02
+        )
+
+
+class TestSlidingWindowSketch:
+
+    def test_old_intervals_drop_out_of_the_window(self):
+        """Values outside the window are excluded; the ring reuses expired intervals"""
+        clock = FakeClock()
+        sketch = SlidingWindowSketch(bucket_seconds=10, n_buckets=6, clock=clock)
+        sketch.add(1.0)
+        clock.now = 35
+        sketch.add(2.0)
+
+        assert sketch.window(10).count == 1
+        assert sketch.window().count == 2
+        clock.now = 65
+        assert sketch.window().count == 1
+
+    def test_tracker_summary_names_quantiles(self):
+        """Summaries report count and p50/p99/p999 per metric"""
+        tracker = QuantileTracker()
+        tracker.add_many("confidence", [0.9] * 10)
+
+        summary = tracker.summary()["confidence"]
+        assert summary["count"] == 10
+        assert summary["p999"] == pytest.approx(0.9)
+
+
+class TestSLOEvaluator:
+
+    def test_latency_burn_rate_alerts_on_both_windows(self):
+        """2% of requests over the threshold burns a 99.9% budget 20x"""
+        tracker = QuantileTracker(bucket_seconds=10, n_buckets=12)
+        tracker.add_many("request", [0.001] * 98 + [0.5] * 2)
+        evaluator = SLOEvaluator(
+            tracker,
+            [SLOObjective("latency", "request", 0.025, 0.999)],
+            burn_windows=[(60, 120, 14.4)],
+        )
+
+        result = evaluator.evaluate()["latency"]
+
+        assert result["windows"][0]["short_burn_rate"] == pytest.approx(20.0)
+        assert result["alerting"] is True
+
+    def test_burn_rate_gauge_is_computed_at_scrape_time(self):
+        """Scrapes see current burn rates without anyone calling evaluate()"""
+        from prometheus_client import CollectorRegistry
+
+        tracker = QuantileTracker(bucket_seconds=10, n_buckets=12)
+        evaluator = SLOEvaluator(
+            tracker,
+            [SLOObjective("latency", "request", 0.025, 0.999)],
+            burn_windows=[(60, 120, 14.4)],
+        )
+        registry = CollectorRegistry()
+        registry.register(SLOBurnRateCollector(evaluator))
+        labels = {"slo": "latency", "window": "60s"}
+        assert registry.get_sample_value("iris_slo_burn_rate", labels) is None
+
+        tracker.add_many("request", [0.001] * 98 + [0.5] * 2)
+        assert registry.get_sample_value("iris_slo_burn_rate", labels) == pytest.approx(
+            20.0
+        )
+
+    def test_confidence_objective_counts_low_values_as_bad(self):
+        """For a 'good above' objective values under the threshold spend the budget"""
+        objective = SLOObjective("confidence", "confidence", 0.6, 0.95, good="above")
+        sketch = DDSketch()
+        sketch.add_many([0.9] * 9 + [0.4])
+
+        assert objective.bad_fraction(sketch) == pytest.approx(0.1)
+        assert objective.burn_rate(DDSketch()) is None
@@ -0,0 +1,72 @@
+"""
+Tests for startup profiling and model warm-up
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from src.api.startup import StartupProfiler, WarmupRunner, load_warmup_rows
+
+
+class TestStartupProfiler:
+
+    def test_report_records_imports_and_phases(self):
+        """Imports and phases show up in the report once startup completes"""
+        profiler = StartupProfiler()
+        profiler.import_module("json")
+        with profiler.phase("model_load"):
+            pass
+        profiler.mark_complete()
+
+        report = profiler.report()
+
+        assert "json" in report["imports_ms"]
+        assert "model_load" in report["phases_ms"]
+        assert report["total_ms"] >= 0
+
+    def test_started_at_covers_earlier_imports(self):
+        """A start time taken before the caller's imports is part of the total"""
+        profiler = StartupProfiler(started_at=time.perf_counter() - 0.5)
+        profiler.mark_complete()
+
+        report = profiler.report()
+
+        assert report["phases_ms"]["module_imports"] >= 500
+        assert report["total_ms"] >= report["phases_ms"]["module_imports"]
+
+    def test_total_is_empty_until_complete(self):
+        """Total start-to-ready time is only reported after completion"""
+        assert StartupProfiler().report()["total_ms"] is None
+
+
+class TestWarmup:
+
+    def test_load_warmup_rows_includes_test_data(self, temp_dir, sample_iris_data):
+        """Rows from the warm-up file are appended to the probe rows"""
+        path = os.path.join(temp_dir, "warmup.json")
+        with open(path, "w") as f:
+            json.dump([sample_iris_data, sample_iris_data], f)
+
+        rows = load_warmup_rows(path)
+
+        assert rows.shape == (5, 4)
+        np.testing.assert_array_equal(rows[-1], [5.1, 3.5, 1.4, 0.2])
+
+    def test_runner_covers_every_batch_size(self):
+        """Each configured batch size is warmed up with a batch of that size"""
+        seen_sizes = set()
+
+        def predict_fn(batch):
+            seen_sizes.add(len(batch))
+
+        stats = WarmupRunner(batch_sizes=(1, 8), round_size=5, max_rounds=4).run(
+            predict_fn, np.ones((3, 4))
+        )
+
+        assert seen_sizes == {1, 8}
+        assert set(stats["batch_sizes"]) == {1, 8}
+        assert all(1 <= s["rounds"] <= 4 for s in stats["batch_sizes"].values())
+        assert stats["duration_seconds"] >= 0
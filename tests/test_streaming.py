@@ -0,0 +1,113 @@
+"""
+Tests for micro-batched prediction streams
+"""
+
+import asyncio
+
+import numpy as np
+
+from src.api.serialization import PredictionEncoder
+from src.api.streaming import PredictionStream, iter_ndjson_lines, parse_row
+
+TARGET_NAMES = ["setosa", "versicolor", "virginica"]
+
+
+async def _iterate(items):
+    for item in items:
+        yield item
+
+
+def _collect(stream, lines):
+    async def run():
+        return [batch async for batch in stream.iter_results(_iterate(lines))]
+
+    return asyncio.run(run())
+
+
+def _fake_scorer(calls):
+    def score_batch(X):
+        calls.append(len(X))
+        proba = np.tile([0.1, 0.2, 0.7], (len(X), 1))
+        return np.full(len(X), 2), proba
+
+    return score_batch
+
+
+class TestParsing:
+
+    def test_parse_row_accepts_objects_and_arrays(self):
+        """Rows can be keyed objects with an id or bare 4-number arrays"""
+        row_id, features, error = parse_row(
+            b'{"id": "a", "sepal_length": 5.1, "sepal_width": 3.5, '
+            b'"petal_length": 1.4, "petal_width": 0.2}'
+        )
+        assert (row_id, features, error) == ("a", [5.1, 3.5, 1.4, 0.2], None)
+        assert parse_row(b"[5.1, 3.5, 1.4, 0.2]") == (None, [5.1, 3.5, 1.4, 0.2], None)
+
+    def test_parse_row_reports_bad_rows(self):
+        """Malformed rows return an error instead of raising"""
+        assert parse_row(b"not json")[2] is not None
+        assert parse_row(b'{"sepal_length": 5.1}')[2] is not None
+        assert parse_row(b"[1, 2]")[2] is not None
+
+    def test_ndjson_lines_span_chunk_boundaries(self):
+        """Lines split across chunks are reassembled and blank lines skipped"""
+
+        async def run():
+            chunks = [b"[1,2,", b"3,4]\n\n[5,6", b",7,8]"]
+            return [line async for line in iter_ndjson_lines(_iterate(chunks))]
+
+        assert asyncio.run(run()) == [b"[1,2,3,4]", b"[5,6,7,8]"]
+
+
+class TestPredictionStream:
+
+    def test_results_keep_arrival_order_and_batch(self):
+        """Rows queued together are scored in one call and come back in order"""
+        calls, recorded = [], []
+
+        def log_batch(X, class_indices, proba, latency):
+            first = sum(recorded) + 1
+            recorded.append(len(X))
+            logged = asyncio.get_running_loop().create_future()
+            logged.set_result(np.arange(first, first + len(X)))
+            return logged
+
+        stream = PredictionStream(
+            _fake_scorer(calls),
+            log_batch,
+            PredictionEncoder(TARGET_NAMES),
+            max_batch=4,
+            max_delay=0.05,
+        )
+        lines = [b"[5.1, 3.5, 1.4, 0.2]"] * 10
+
+        results = [result for batch in _collect(stream, lines) for result in batch]
+
+        assert [result["seq"] for result in results] == list(range(10))
+        assert all(result["prediction"] == "virginica" for result in results)
+        assert results[0]["probability"] == 0.7
+        assert max(calls) <= 4 and sum(calls) == 10
+        assert recorded == calls
+        assert [result["prediction_id"] for result in results] == list(range(1, 11))
+
+    def test_bad_rows_get_errors_without_blocking_others(self):
+        """Unparseable and out-of-range rows are reported in place"""
+        calls = []
+        stream = PredictionStream(
+            _fake_scorer(calls), lambda *args: None, PredictionEncoder(TARGET_NAMES)
+        )
+        lines = [
+            b"[5.1, 3.5, 1.4, 0.2]",
+            b"garbage",
+            b"[50, 3.5, 1.4, 0.2]",
+            b'{"id": 7, "sepal_length": 6, '
+            b'"sepal_width": 3, "petal_length": 4, "petal_width": 1}',
+        ]
+
+        results = [result for batch in _collect(stream, lines) for result in batch]
+
+        assert [("error" in result) for result in results] == [False, True, True, False]
+        assert results[3]["id"] == 7
+        assert results[3]["prediction_id"] is None
+        assert sum(calls) == 2
@@ -0,0 +1,98 @@
+"""
+Tests for buffered MLflow tracking
+"""
+
+import time
+
+import mlflow
+import mlflow.pyfunc
+import pytest
+from mlflow import MlflowClient
+from sklearn.datasets import load_iris
+from sklearn.linear_model import LogisticRegression
+
+from src.models.tracking import RunTracker
+
+
+@pytest.fixture(scope="module")
+def tracking_store(tmp_path_factory):
+    """A throwaway sqlite tracking store, restoring the previous URI afterwards"""
+    store = tmp_path_factory.mktemp("mlflow")
+    previous = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri(f"sqlite:///{store}/mlflow.db")
+    client = MlflowClient()
+    client.create_experiment(
+        "tracking_test", artifact_location=(store / "artifacts").as_uri()
+    )
+    yield client
+    mlflow.set_tracking_uri(previous)
+
+
+@pytest.fixture(scope="module")
+def model():
+    X, y = load_iris(return_X_y=True)
+    return LogisticRegression(max_iter=1000).fit(X, y)
+
+
+class TestRunTracker:
+
+    def test_runs_are_written_in_the_background(self, tracking_store, model):
+        tracker = RunTracker("tracking_test")
+        with tracker.start_run("candidate") as run:
+            run.log_params({f"param_{i}": i for i in range(150)})
+            run.log_metrics({"accuracy": 0.9, "f1_score": 0.8})
+            run.log_dict({"a": 1}, "report.json")
+            model_info = run.log_model(
+                model, "candidate", pip_requirements=["scikit-learn"]
+            )
+        with tracker.start_run("best") as best_run:
+            best_run.log_metric("accuracy", 0.9)
+            tracker.register_model(model_info, "tracking_test_best")
+        overhead = tracker.close()
+
+        assert overhead["tracking_runs"] == 2 and overhead["tracking_failures"] == 0
+        # Buffering costs the caller next to nothing; the writer thread does the writes
+        assert (
+            overhead["tracking_foreground_seconds"]
+            < 0.1 * overhead["tracking_write_seconds"]
+        )
+        runs = {
+            r.info.run_name: r
+            for r in tracking_store.search_runs([tracker.experiment_id])
+        }
+        candidate = runs["candidate"]
+        assert candidate.info.status == "FINISHED"
+        assert len(candidate.data.params) == 150
+        assert candidate.data.metrics == {"accuracy": 0.9, "f1_score": 0.8}
+        assert "report.json" in [
+            a.path for a in tracking_store.list_artifacts(candidate.info.run_id)
+        ]
+
+        # Registered from the candidate's logged model, not serialized a second time
+        version = tracking_store.get_latest_versions("tracking_test_best")[0]
+        assert version.run_id == candidate.info.run_id
+        assert "candidate/MLmodel" in [
+            a.path
+            for a in tracking_store.list_artifacts(candidate.info.run_id, "candidate")
+        ]
+        assert mlflow.pyfunc.load_model(model_info.result().model_uri).predict(
+            load_iris().data[:1]
+        ).tolist() == [0]
+        assert tracker.pip_requirements is not None
+
+    def test_quiet_blocks_hold_the_writer(self, tracking_store):
+        tracker = RunTracker("tracking_test")
+        with tracker.quiet():
+            with tracker.start_run("held") as run:
+                run.log_metric("accuracy", 1.0)
+            time.sleep(0.2)
+            assert tracker.runs == 0
+        tracker.close()
+        assert tracker.runs == 1
+
+    def test_synchronous_mode_writes_inline(self, tracking_store):
+        tracker = RunTracker("tracking_test", asynchronous=False)
+        with tracker.start_run("inline") as run:
+            run.log_param("calibration_method", "sigmoid")
+        assert tracker.runs == 1
+        assert tracker.close()["tracking_wait_seconds"] < 0.01